@@ -56,6 +56,8 @@ export default function ChatInterfacePage() {
     const [languagesList, setLanguages] = useState<any[]>([])
     const [isRecording, setIsRecording] = useState(false)
     const mediaRecorderRef = useRef<MediaRecorder | null>(null)
+    // Set when the input box was filled by speech-to-text; voice turns are served first under load
+    const fromVoiceRef = useRef(false)
 
     const [feedbackLoadingId, setFeedbackLoadingId] = useState<string | null>(null)
 
@@ -184,9 +186,11 @@ export default function ChatInterfacePage() {
                     teacher_id: userProfile.teacherId,
                     message: newMessage.message,
                     session_id: currentSessionId,
-                    user_lang: selectedLang
+                    user_lang: selectedLang,
+                    source: fromVoiceRef.current ? "voice" : "text"
                 })
             })
+            fromVoiceRef.current = false
 
             if (res.ok) {
                 const data = await res.json()
@@ -212,6 +216,9 @@ export default function ChatInterfacePage() {
                 // Background sync ensures consistency
                 fetchHistory(userProfile.teacherId)
 
+            } else if (res.status === 429 || res.status === 503) {
+                const wait = res.headers.get("Retry-After") || "a few"
+                alert(`The coach is busy right now. Please try again in ${wait} seconds.`)
             } else {
                 console.error(`Status ${res.status}: Failed to send message`)
             }
@@ -261,6 +268,7 @@ export default function ChatInterfacePage() {
         formData.append("audio", file)
         const voiceLang = languagesList.find(l => l.code === selectedLang)?.code || "en-US"
         formData.append("lang", voiceLang)
+        if (userProfile?.teacherId) formData.append("teacher_id", userProfile.teacherId)
 
         try {
             const res = await fetch(API_ROUTES.SPEECH_TO_TEXT, {
@@ -271,7 +279,10 @@ export default function ChatInterfacePage() {
                 const data = await res.json()
                 if (data.text) {
                     setInputText(data.text)
+                    fromVoiceRef.current = true
                 }
+            } else if (res.status === 429 || res.status === 503) {
+                alert("The coach is busy right now. Please try recording again in a moment.")
             }
         } catch (error) {
             console.error("STT Error", error)
@@ -367,9 +378,9 @@ export default function ChatInterfacePage() {
             })
             if (res.ok) {
                 const data = await res.json()
-                // Strict Handshake Check: Only trigger if backend explicitly confirms 'sent' status
+                // Strict Handshake Check: Only trigger once the backend has the escalation ('queued' = persisted, mailed in the background)
                 if (data.escalation?.triggered === true) {
-                    if (data.escalation.status === 'sent') {
+                    if (['sent', 'queued', 'already_queued'].includes(data.escalation.status)) {
                         setIsEscalationModalOpen(true)
                     } else if (data.escalation.status === 'failed') {
                         // Show the backend's friendly error message directly
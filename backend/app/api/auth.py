@@ -2,6 +2,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from app.services.auth_service import AuthService
+from app.services.password_hasher import PasswordHasherBusy
 
 router = APIRouter()
 
@@ -18,9 +19,9 @@ class LoginRequest(BaseModel):
     otp: str
 
 @router.post("/signup")
-def signup(request: SignupRequest):
+async def signup(request: SignupRequest):
     try:
-        result = AuthService.signup(
+        result = await AuthService.signup(
             request.teacher_name, 
             request.teacher_mail, 
             request.password, 
@@ -28,16 +29,20 @@ def signup(request: SignupRequest):
             request.crp_mail
         )
         return {"message": "Signup successful", **result}
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/login")
-def login(request: LoginRequest):
+async def login(request: LoginRequest):
     try:
-        result = AuthService.login(request.email, request.password, request.otp)
+        result = await AuthService.login(request.email, request.password, request.otp)
         return {"message": "Login successful", **result}
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
     except PermissionError as e:
@@ -1,15 +1,29 @@
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from pydantic import BaseModel
-from typing import Optional
-from app.services.coaching_service import CoachingService
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, StrictStr, ValidationError
+from typing import List, Optional, Union
+from app.services.coaching_service import CoachingService, CHAT_PARAMS
+from app.services.admission import AdmissionRejected, TEXT, VOICE
+from app.services.response_cache import response_cache
+from app.services.translation_service import translation_service
+from app.core.config import settings
+from app.services.history_service import HistoryService
 from app.repositories.interaction_repo import InteractionRepository
-from app.utils.audio_utils import text_to_speech, translate_text, speech_to_text
+from app.services.tts_stream import split_sentences, speech_flow_chunks, synthesize_in_order
+from app.utils.audio_utils import text_to_speech
+import base64
+import hmac
+import json
+import logging
 import tempfile
 import shutil
 import os
 import uuid
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 class ChatRequest(BaseModel):
@@ -17,22 +31,91 @@ class ChatRequest(BaseModel):
     message: str
     session_id: Optional[str] = None
     user_lang: str = "en"
-    
+    use_cache: bool = True
+    source: str = "text"  # "voice" when the message came from the mic - served first under load
+
 class CoachingRequest(BaseModel):
     query: str
 
+class TranslateRequest(BaseModel):
+    text: Union[StrictStr, List[StrictStr]] = ""
+    target_lang: StrictStr = "en"
+    source_lang: StrictStr = "auto"
+
+def _shed(e: AdmissionRejected):
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
 @router.post("/coaching/advice")
-def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest):
     try:
-        return CoachingService.process_chat(
+        return await CoachingService.process_chat(
             request.teacher_id,
             request.message,
             request.session_id,
-            request.user_lang
+            request.user_lang,
+            use_cache=request.use_cache,
+            priority=VOICE if request.source == "voice" else TEXT
         )
+    except AdmissionRejected as e:
+        raise _shed(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/coaching/advice/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    # Server-Sent Events: intro / each advice step / closing are pushed as soon as
+    # the model finishes generating them, so voice playback can start early.
+    stream = CoachingService.process_chat_stream(
+        request.teacher_id,
+        request.message,
+        request.session_id,
+        request.user_lang,
+        use_cache=request.use_cache,
+        priority=VOICE if request.source == "voice" else TEXT
+    )
+    # First step runs admission - a shed request still gets a real 429/503, not a 200 stream
+    try:
+        first = await anext(stream)
+    except AdmissionRejected as e:
+        raise _shed(e)
+    except Exception as e:
+        first = ("error", {"detail": str(e)})
+        stream = None
+
+    async def events():
+        try:
+            name, data = first
+            yield f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            if stream is None:
+                return
+            async for name, data in stream:
+                yield f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        finally:
+            if stream is not None:
+                await stream.aclose()  # client gone mid-stream: give the admission slot back now
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.delete("/coaching/cache")
+async def invalidate_cache(
+    query: Optional[str] = None,
+    lang: str = "en",
+    x_admin_key: Optional[str] = Header(None)
+):
+    # Drop one cached answer (query + lang) or, without a query, the whole cache
+    if not settings.CACHE_ADMIN_KEY:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key.encode(), settings.CACHE_ADMIN_KEY.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    removed = await response_cache.invalidate(query, lang, CHAT_PARAMS)
+    return {"removed": removed}
+
 # Legacy/Simple endpoint if still used? 
 # The implementation details showed get_coaching_advice in app.py logic
 # But the orchestrator used /coaching/advice with ChatRequest.
@@ -50,18 +133,59 @@ def chat_endpoint(request: ChatRequest):
 # Or assume Orchestrator was the intended one. Orchestrator was the primary logic file.
 # I will implement the Orchestrator version as primary.
 
+NDJSON = "application/x-ndjson"
+
 @router.get("/history/{teacher_id}")
-def get_history(teacher_id: str):
-    doc = InteractionRepository.get_history(teacher_id)
+async def get_history(teacher_id: str, format: str = Query("json", pattern="^(json|ndjson)$"), fields: Optional[str] = None):
+    # Full history (legacy shape). Prefer the paginated endpoints below for anything new.
+    if format == "ndjson":
+        try:
+            lines = await HistoryService.stream_messages(teacher_id, fields=fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return StreamingResponse(lines, media_type=NDJSON)
+
+    doc = await InteractionRepository.get_history(teacher_id)
     if not doc:
         return {"chat_history": []}
     return doc
 
+@router.get("/history/{teacher_id}/sessions")
+async def list_sessions(
+    teacher_id: str,
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    try:
+        if format == "ndjson":
+            return StreamingResponse(await HistoryService.stream_sessions(teacher_id, cursor, fields), media_type=NDJSON)
+        return await HistoryService.list_sessions(teacher_id, limit, cursor, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/history/{teacher_id}/sessions/{session_id}/messages")
+async def list_messages(
+    teacher_id: str,
+    session_id: str,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$")
+):
+    try:
+        if format == "ndjson":
+            return StreamingResponse(await HistoryService.stream_messages(teacher_id, session_id, cursor, fields), media_type=NDJSON)
+        return await HistoryService.list_messages(teacher_id, session_id, limit, cursor, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/api/speech-to-text")
-async def speech_to_text_endpoint(audio: UploadFile = File(...), lang: str = Form("en-US")):
+async def speech_to_text_endpoint(audio: UploadFile = File(...), lang: str = Form("en-US"), teacher_id: Optional[str] = Form(None)):
     try:
         # Pass stream directly to Groq (handles WebM natively)
-        text = await CoachingService.transcribe_audio(audio)
+        text = await CoachingService.transcribe_audio(audio, teacher_id)
         
         # Filter Whisper hallucinations on silence
         cleaned = text.strip().lower()
@@ -70,27 +194,66 @@ async def speech_to_text_endpoint(audio: UploadFile = File(...), lang: str = For
             
         return {"text": text}
         
+    except AdmissionRejected as e:
+        raise _shed(e)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Speech-to-text failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/api/text-to-speech")
-def tts_endpoint(data: dict):
+async def tts_endpoint(data: dict):
     text = data.get("text", "")
     lang = data.get("lang", "en")
-    audio = text_to_speech(text, lang)
+    audio = await run_in_threadpool(text_to_speech, text, lang)
     return {"audio": audio}
 
+@router.post("/api/text-to-speech/stream")
+async def tts_stream_endpoint(data: dict):
+    """
+    Sentence-chunked TTS. Body: {"text": ...} or {"speech_flow": {...}}, "lang", and
+    "format": "mpeg" (default, one continuous audio/mpeg stream the browser can play as it
+    arrives) or "ndjson" (one {"index", "text", "audio": base64} line per chunk).
+    """
+    lang = data.get("lang", "en")
+    fmt = data.get("format", "mpeg")
+    if fmt not in ("mpeg", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'mpeg' or 'ndjson'")
+    flow = data.get("speech_flow")
+    chunks = speech_flow_chunks(flow) if isinstance(flow, dict) else split_sentences(data.get("text", ""))
+
+    if fmt == "mpeg":
+        async def audio_stream():
+            # MP3 frames are self-delimiting, so back-to-back clips play as one stream
+            async for _, _, audio in synthesize_in_order(chunks, lang):
+                if audio:
+                    yield audio
+        return StreamingResponse(audio_stream(), media_type="audio/mpeg")
+
+    async def ndjson_stream():
+        async for index, text, audio in synthesize_in_order(chunks, lang):
+            line = {"index": index, "total": len(chunks), "text": text, "audio": base64.b64encode(audio).decode("utf-8")}
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
 @router.post("/api/translate")
-def translate_endpoint(data: dict):
-    text = data.get("text", "")
-    target = data.get("target_lang", "en")
-    source = data.get("source_lang", "auto")
-    return {"translated": translate_text(text, target, source)}
+async def translate_endpoint(data: dict):
+    # Validated by hand so a malformed body is a 400 rather than an unhandled 500
+    try:
+        request = TranslateRequest.model_validate(data)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=e.errors(include_url=False, include_context=False, include_input=False))
+    texts = request.text if isinstance(request.text, list) else [request.text]
+    if len(texts) > settings.TRANSLATION_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.TRANSLATION_BATCH_MAX_ITEMS} texts per request")
+    if any(len(t) > settings.TRANSLATION_MAX_CHARS for t in texts):
+        raise HTTPException(status_code=413, detail=f"Each text may be at most {settings.TRANSLATION_MAX_CHARS} characters")
+    # A list of strings is translated in one call (cached, de-duplicated, fetched in parallel)
+    if isinstance(request.text, list):
+        return {"translated": await translation_service.translate_batch_async(request.text, request.target_lang, request.source_lang)}
+    return {"translated": await translation_service.translate_async(request.text, request.target_lang, request.source_lang)}
 
 @router.get("/api/languages")
-def get_languages():
+async def get_languages():
     return {
         'en': {'name': 'English', 'code': 'EN', 'voice': 'en-US', 'tts': 'en'},
         'hi': {'name': 'Hindi', 'code': 'HI', 'voice': 'hi-IN', 'tts': 'hi'},
@@ -1,7 +1,8 @@
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from app.services.feedback_service import FeedbackService
+from app.core.config import settings
 
 router = APIRouter()
 
@@ -11,11 +12,23 @@ class FeedbackRequest(BaseModel):
     message_id: str
     feedback: str
 
+class BulkFeedbackRequest(BaseModel):
+    # Applied in list order (an offline tablet's queue, oldest first)
+    events: list[FeedbackRequest]
+
 @router.post("/feedback")
-def feedback_endpoint(request: FeedbackRequest):
-    return FeedbackService.process_feedback(
+async def feedback_endpoint(request: FeedbackRequest):
+    return await FeedbackService.process_feedback(
         request.teacher_id, 
         request.session_id, 
         request.message_id, 
         request.feedback
     )
+
+@router.post("/feedback/bulk")
+async def bulk_feedback_endpoint(request: BulkFeedbackRequest):
+    if len(request.events) > settings.FEEDBACK_BULK_MAX_EVENTS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.FEEDBACK_BULK_MAX_EVENTS} events per request")
+    if not request.events:
+        return {"message": "No feedback events", "received": 0, "applied": 0, "results": [], "teachers": {}}
+    return await FeedbackService.process_feedback_bulk([e.model_dump() for e in request.events])
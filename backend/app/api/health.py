@@ -1,17 +1,50 @@
 
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
 from app.core.database import client
+from app.core.metrics import metrics
+from app.repositories.history_writer import history_writer
+from app.services.response_cache import response_cache
+from app.services.llm_client import llm_client
+from app.services.translation_service import translation_service
+from app.services.tts_cache import tts_cache
+from app.services.email_outbox import email_outbox
+from app.repositories.teacher_cache import teacher_cache
+from app.services.password_hasher import password_hasher
+from app.services.admission import admission
+from app.utils.single_flight import single_flight_stats
 
 router = APIRouter()
 
 @router.get("/")
-def read_root():
+async def read_root():
     return {"message": "Flash Coach Backend is running"}
 
 @router.get("/health")
-def health_check():
+async def health_check():
     return {
         "status": "ok", 
         "service": "flash-coach-backend",
         "mongodb": "connected" if client else "error"
     }
+
+@router.get("/stats")
+async def stats():
+    # Cheap in-process counters for this worker
+    return {
+        "response_cache": response_cache.stats(),
+        "history_writer": {**history_writer.stats, "queue_depth": history_writer.queue_depth()},
+        "llm_client": llm_client.stats(),
+        "translation": translation_service.stats(),
+        "tts_cache": tts_cache.stats(),
+        "email_outbox": await email_outbox.stats(),
+        "teacher_cache": teacher_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "admission": admission.stats(),
+        "single_flight": single_flight_stats(),
+    }
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    # Prometheus text format; per worker, so scrape each worker (or aggregate in Prometheus)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
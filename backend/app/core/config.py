@@ -18,4 +18,153 @@ class Settings:
     SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
     SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 
+    # MongoDB connection pool / timeouts (shared by the sync and async clients)
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000"))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+
+    # Refuse to start when the indexes in app/core/indexes.py are missing or differ
+    INDEX_VERIFY_STRICT = os.getenv("INDEX_VERIFY_STRICT", "false").lower() in ("1", "true", "yes")
+    # Log every Mongo command slower than this, with its query shape (0 = off)
+    MONGO_SLOW_QUERY_MS = int(os.getenv("MONGO_SLOW_QUERY_MS", "0"))
+
+    # Chat history write-behind (off = every message is written inline)
+    HISTORY_WRITE_BEHIND = os.getenv("HISTORY_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+    HISTORY_WRITE_BATCH_SIZE = int(os.getenv("HISTORY_WRITE_BATCH_SIZE", "200"))
+    HISTORY_WRITE_FLUSH_MS = int(os.getenv("HISTORY_WRITE_FLUSH_MS", "250"))
+    HISTORY_WRITE_QUEUE_SIZE = int(os.getenv("HISTORY_WRITE_QUEUE_SIZE", "10000"))
+    # "buffered": return as soon as the message is queued
+    # "acked": still batched, but wait until the batch holding the message is written
+    HISTORY_WRITE_DURABILITY = os.getenv("HISTORY_WRITE_DURABILITY", "buffered")
+
+    # Password hashing: dedicated process pool, bounded queue, per-job timeout.
+    # Changing BCRYPT_ROUNDS upgrades each stored hash on that teacher's next login.
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+    PASSWORD_HASH_TIMEOUT_S = float(os.getenv("PASSWORD_HASH_TIMEOUT_S", "5"))
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+    # Teacher profile cache (per worker). "change_stream" also evicts on other workers'
+    # writes (needs a replica set); "none" relies on the TTL for cross-worker staleness
+    TEACHER_CACHE_ENABLED = os.getenv("TEACHER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    TEACHER_CACHE_SIZE = int(os.getenv("TEACHER_CACHE_SIZE", "5000"))
+    TEACHER_CACHE_TTL_S = float(os.getenv("TEACHER_CACHE_TTL_S", "60"))
+    TEACHER_CACHE_INVALIDATION = os.getenv("TEACHER_CACHE_INVALIDATION", "none")
+
+    # Max events accepted by one POST /feedback/bulk
+    FEEDBACK_BULK_MAX_EVENTS = int(os.getenv("FEEDBACK_BULK_MAX_EVENTS", "1000"))
+
+    # Escalation email outbox (Mongo-persisted, delivered by a background worker)
+    EMAIL_OUTBOX_POLL_S = float(os.getenv("EMAIL_OUTBOX_POLL_S", "5"))
+    EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+    EMAIL_BACKOFF_BASE_S = float(os.getenv("EMAIL_BACKOFF_BASE_S", "30"))
+    EMAIL_BACKOFF_MAX_S = float(os.getenv("EMAIL_BACKOFF_MAX_S", "3600"))
+    # A mail stuck in "sending" this long (worker died mid-send) is picked up again
+    EMAIL_LEASE_S = float(os.getenv("EMAIL_LEASE_S", "120"))
+    EMAIL_SMTP_TIMEOUT_S = float(os.getenv("EMAIL_SMTP_TIMEOUT_S", "20"))
+    EMAIL_SMTP_IDLE_S = float(os.getenv("EMAIL_SMTP_IDLE_S", "60"))
+
+    # LLM response cache: in-process LRU, optionally backed by a shared Mongo tier
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+    RESPONSE_CACHE_TTL_S = int(os.getenv("RESPONSE_CACHE_TTL_S", "86400"))
+    RESPONSE_CACHE_SHARED = os.getenv("RESPONSE_CACHE_SHARED", "true").lower() in ("1", "true", "yes")
+    # How stale another worker's view of an invalidation may get before its local tier notices
+    RESPONSE_CACHE_SYNC_S = float(os.getenv("RESPONSE_CACHE_SYNC_S", "5"))
+    # X-Admin-Key for DELETE on the cache; unset = the endpoint doesn't exist
+    CACHE_ADMIN_KEY = os.getenv("CACHE_ADMIN_KEY", "")
+
+    # Conversation context sent with each chat turn
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "800"))
+    CONTEXT_MAX_TURNS = int(os.getenv("CONTEXT_MAX_TURNS", "20"))
+    SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "llama-3.1-8b-instant")
+    SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "200"))
+
+    # Groq (OpenAI-compatible) client: pooling, deadlines, retries, circuit breaker
+    LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1")
+    LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "20"))
+    STT_TIMEOUT_S = float(os.getenv("STT_TIMEOUT_S", "30"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BASE_S = float(os.getenv("LLM_RETRY_BASE_S", "0.5"))
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+    LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+    LLM_BREAKER_RESET_S = float(os.getenv("LLM_BREAKER_RESET_S", "30"))
+    # Streamed chat: give up after this long without a chunk, or this long in total
+    LLM_STREAM_IDLE_TIMEOUT_S = float(os.getenv("LLM_STREAM_IDLE_TIMEOUT_S", "10"))
+    LLM_STREAM_TIMEOUT_S = float(os.getenv("LLM_STREAM_TIMEOUT_S", "60"))
+
+    # Admission control in front of LLM/STT calls (per worker): global concurrency cap
+    # with a priority queue (voice > text > background) and per-teacher token buckets
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "16"))
+    ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+    ADMISSION_MAX_WAIT_S = float(os.getenv("ADMISSION_MAX_WAIT_S", "5"))
+    # Slots background work may never take
+    ADMISSION_BACKGROUND_RESERVE = int(os.getenv("ADMISSION_BACKGROUND_RESERVE", "4"))
+    ADMISSION_TEACHER_RATE_PER_MIN = float(os.getenv("ADMISSION_TEACHER_RATE_PER_MIN", "20"))
+    ADMISSION_TEACHER_BURST = int(os.getenv("ADMISSION_TEACHER_BURST", "10"))
+
+    # Share one upstream call among concurrent identical LLM / translation / TTS requests
+    SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+    # Translation cache / upstream pool
+    TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "5000"))
+    TRANSLATION_CACHE_TTL_S = int(os.getenv("TRANSLATION_CACHE_TTL_S", "86400"))
+    TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", "8"))
+    # POST /api/translate limits (413 beyond them)
+    TRANSLATION_BATCH_MAX_ITEMS = int(os.getenv("TRANSLATION_BATCH_MAX_ITEMS", "200"))
+    TRANSLATION_MAX_CHARS = int(os.getenv("TRANSLATION_MAX_CHARS", "5000"))
+
+    # Synthesized speech cache (empty TTS_CACHE_DIR = memory tier only)
+    TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(BASE_DIR, ".tts_cache"))
+    TTS_CACHE_MEMORY_ITEMS = int(os.getenv("TTS_CACHE_MEMORY_ITEMS", "256"))
+    TTS_CACHE_DISK_MB = int(os.getenv("TTS_CACHE_DISK_MB", "512"))
+    # Sentence-chunked streaming TTS: shared synth pool, chunks in flight per request
+    TTS_WORKERS = int(os.getenv("TTS_WORKERS", "8"))
+    TTS_STREAM_WINDOW = int(os.getenv("TTS_STREAM_WINDOW", "4"))
+
+    # External service providers (see app/providers); "local" = offline stand-ins for load tests
+    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")
+    STT_PROVIDER = os.getenv("STT_PROVIDER", "groq")
+    TTS_PROVIDER = os.getenv("TTS_PROVIDER", "gtts")
+    TRANSLATION_PROVIDER = os.getenv("TRANSLATION_PROVIDER", "google")
+    # Latency spec: fixed:<ms> | uniform:<lo>:<hi> | lognormal:<median ms>:<sigma>
+    LOCAL_LLM_LATENCY = os.getenv("LOCAL_LLM_LATENCY", "lognormal:800:0.4")
+    LOCAL_STT_LATENCY = os.getenv("LOCAL_STT_LATENCY", "lognormal:400:0.3")
+    LOCAL_TTS_LATENCY = os.getenv("LOCAL_TTS_LATENCY", "lognormal:300:0.3")
+    LOCAL_TRANSLATE_LATENCY = os.getenv("LOCAL_TRANSLATE_LATENCY", "lognormal:120:0.3")
+    LOCAL_LLM_ERROR_RATE = float(os.getenv("LOCAL_LLM_ERROR_RATE", "0"))
+    LOCAL_STT_ERROR_RATE = float(os.getenv("LOCAL_STT_ERROR_RATE", "0"))
+    LOCAL_TTS_ERROR_RATE = float(os.getenv("LOCAL_TTS_ERROR_RATE", "0"))
+    LOCAL_TRANSLATE_ERROR_RATE = float(os.getenv("LOCAL_TRANSLATE_ERROR_RATE", "0"))
+    LOCAL_PROVIDER_SEED = int(os.getenv("LOCAL_PROVIDER_SEED", "42"))
+    LOCAL_STT_TRANSCRIPT = os.getenv("LOCAL_STT_TRANSCRIPT", "My students are not listening to me in class")
+
+    # Audio pre-processing before STT (decode, VAD trim, 16 kHz mono)
+    STT_PREPROCESS = os.getenv("STT_PREPROCESS", "true").lower() in ("1", "true", "yes")
+    STT_VAD_MARGIN_DB = float(os.getenv("STT_VAD_MARGIN_DB", "10"))
+    STT_VAD_FLOOR_DB = float(os.getenv("STT_VAD_FLOOR_DB", "-50"))
+    STT_MIN_SPEECH_MS = int(os.getenv("STT_MIN_SPEECH_MS", "250"))
+    # Recordings longer than this (after trimming) are transcribed as parallel windows
+    STT_LONG_AUDIO_S = float(os.getenv("STT_LONG_AUDIO_S", "30"))
+    STT_WINDOW_S = float(os.getenv("STT_WINDOW_S", "15"))
+    STT_WINDOW_OVERLAP_S = float(os.getenv("STT_WINDOW_OVERLAP_S", "0.5"))
+    STT_WINDOW_CONCURRENCY = int(os.getenv("STT_WINDOW_CONCURRENCY", "4"))
+
+    # Logging (queue + background writer; see app/utils/logger.py)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+    # Errors also go to this file (gitignored; empty = off)
+    LOG_ERROR_FILE = os.getenv("LOG_ERROR_FILE", "backend_errors.log")
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # "logger.prefix=rate,..." - share of INFO/DEBUG records kept per logger
+    LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+    # Identical errors allowed per logger+message per minute (0 = unlimited)
+    LOG_ERROR_RATE_LIMIT = int(os.getenv("LOG_ERROR_RATE_LIMIT", "10"))
+
 settings = Settings()
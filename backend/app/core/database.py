@@ -1,23 +1,75 @@
 
-from pymongo import MongoClient
+from pymongo import MongoClient, AsyncMongoClient
 from app.core.config import settings
+from app.core.metrics import MongoCommandListener
 import logging
 
-# Setup MongoDB
+logger = logging.getLogger(__name__)
+
+# Command timings for /metrics and the opt-in slow query log (one listener shared by the sync and async clients)
+mongo_command_listener = MongoCommandListener(slow_ms=settings.MONGO_SLOW_QUERY_MS)
+
+def _client_options():
+    # Same pool/timeouts for both drivers so behaviour is predictable under load
+    return {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": settings.MONGO_SOCKET_TIMEOUT_MS,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "event_listeners": [mongo_command_listener],
+    }
+
+# Setup MongoDB (sync client - kept for scripts / tooling)
 try:
-    client = MongoClient(settings.MONGO_URI)
+    client = MongoClient(settings.MONGO_URI, **_client_options())
     db = client[settings.DB_NAME]
-    
+
     teacher_collection = db["teacher_details"]
-    history_collection = db["chat_history"]
+    history_collection = db["chat_history"]  # legacy: one document per teacher
     feedback_collection = db["feedback"]
-    
-    logging.info("MongoDB Connection Established")
+    sessions_collection = db["chat_sessions"]
+    messages_collection = db["chat_messages"]
+
+    logger.info("MongoDB Connection Established")
 except Exception as e:
-    logging.error(f"Failed to connect to MongoDB: {e}")
+    logger.error(f"Failed to connect to MongoDB: {e}")
     # Don't crash here because we want to allow import, but app might fail later if DB is needed
     client = None
     db = None
     teacher_collection = None
     history_collection = None
     feedback_collection = None
+    sessions_collection = None
+    messages_collection = None
+
+# Async client - used by the repositories so request handlers never block on Mongo.
+# Connections are opened lazily on first use, inside the running event loop.
+try:
+    async_client = AsyncMongoClient(settings.MONGO_URI, **_client_options())
+    async_db = async_client[settings.DB_NAME]
+
+    async_teacher_collection = async_db["teacher_details"]
+    async_history_collection = async_db["chat_history"]
+    async_feedback_collection = async_db["feedback"]
+    async_sessions_collection = async_db["chat_sessions"]
+    async_messages_collection = async_db["chat_messages"]
+    async_response_cache_collection = async_db["llm_response_cache"]
+    async_email_outbox_collection = async_db["email_outbox"]
+except Exception as e:
+    logger.error(f"Failed to create async MongoDB client: {e}")
+    async_client = None
+    async_db = None
+    async_teacher_collection = None
+    async_history_collection = None
+    async_feedback_collection = None
+    async_sessions_collection = None
+    async_messages_collection = None
+    async_response_cache_collection = None
+    async_email_outbox_collection = None
+
+async def close_async_client():
+    if async_client is not None:
+        await async_client.close()
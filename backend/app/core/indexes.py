@@ -0,0 +1,175 @@
+
+"""
+Every index the app relies on, in one place.
+
+INDEXES is applied at startup (create_indexes is a no-op for indexes that already
+exist) and then verified against what the server actually has. QUERY_SHAPES lists
+every query the repositories issue, with placeholder values, so
+`python -m scripts.check_query_plans` can explain() each one and fail on a COLLSCAN.
+Add the shape here when you add a query to a repository.
+"""
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+import logging
+
+logger = logging.getLogger(__name__)
+
+TEACHER_INDEXES = [
+    IndexModel([("teacher_id", ASCENDING)], unique=True, name="teacher_id_unique"),
+    # Also what stops two signups racing past the "already registered" check
+    IndexModel([("teacher_mail", ASCENDING)], unique=True, name="teacher_mail_unique"),
+]
+LEGACY_HISTORY_INDEXES = [
+    # Only read by scripts.migrate_chat_history now
+    IndexModel([("teacher_id", ASCENDING)], name="teacher_id"),
+]
+SESSION_INDEXES = [
+    IndexModel([("teacher_id", ASCENDING), ("session_id", ASCENDING)], unique=True, name="teacher_session_unique"),
+    # session_id breaks ties so keyset pagination is stable
+    IndexModel([("teacher_id", ASCENDING), ("updated_at", DESCENDING), ("session_id", DESCENDING)], name="teacher_recent_sessions_page"),
+]
+MESSAGE_INDEXES = [
+    IndexModel([("message_id", ASCENDING)], unique=True, name="message_id_unique"),
+    IndexModel([("session_id", ASCENDING), ("timestamp", ASCENDING), ("message_id", ASCENDING)], name="session_timeline_page"),
+    IndexModel([("teacher_id", ASCENDING), ("timestamp", ASCENDING)], name="teacher_timeline"),
+]
+CACHE_INDEXES = [
+    # Mongo's TTL monitor removes expired entries on its own
+    IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+]
+OUTBOX_INDEXES = [
+    # At most one undelivered email per dedupe key (one pending escalation per teacher).
+    # "active" is only set while pending/sending, so delivered and dead mails don't count.
+    IndexModel(
+        [("dedupe_key", ASCENDING)], unique=True, name="dedupe_active_unique",
+        partialFilterExpression={"active": True}
+    ),
+    # Worker claim: due pending mails, oldest first
+    IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_due"),
+]
+
+# collection name -> indexes
+INDEXES = {
+    "teacher_details": TEACHER_INDEXES,
+    "chat_history": LEGACY_HISTORY_INDEXES,
+    "chat_sessions": SESSION_INDEXES,
+    "chat_messages": MESSAGE_INDEXES,
+    "llm_response_cache": CACHE_INDEXES,
+    "email_outbox": OUTBOX_INDEXES,
+}
+
+# collection -> names of indexes we used to create; superseded by the *_page ones above
+RETIRED_INDEXES = {
+    "chat_sessions": ["teacher_recent_sessions"],
+    "chat_messages": ["session_timeline"],
+}
+INDEX_NOT_FOUND = 27
+
+_NOW = datetime(2024, 1, 1)
+
+# (name, collection, filter, sort) - one entry per distinct query a repository sends.
+# Writes are listed by their filter: update/findAndModify pick an index the same way find does.
+# Not listed on purpose: the /stats outbox count ($group over the whole collection) and the
+# one-off legacy migration scan - both read everything by design.
+QUERY_SHAPES = [
+    ("teacher.get_by_email", "teacher_details", {"teacher_mail": "a@example.com"}, None),
+    ("teacher.by_id", "teacher_details", {"teacher_id": "t"}, None),
+    ("history.legacy_by_teacher", "chat_history", {"teacher_id": "t"}, None),
+    ("sessions.by_teacher", "chat_sessions", {"teacher_id": "t"}, [("created_at", ASCENDING)]),
+    ("sessions.page", "chat_sessions", {"teacher_id": "t"}, [("updated_at", DESCENDING), ("session_id", DESCENDING)]),
+    ("sessions.page_after", "chat_sessions", {"teacher_id": "t", "$or": [
+        {"updated_at": {"$lt": _NOW}}, {"updated_at": _NOW, "session_id": {"$lt": "s"}}
+    ]}, [("updated_at", DESCENDING), ("session_id", DESCENDING)]),
+    ("sessions.get", "chat_sessions", {"teacher_id": "t", "session_id": "s"}, None),
+    ("sessions.summary_cas", "chat_sessions", {"teacher_id": "t", "session_id": "s", "summary_until": None}, None),
+    ("messages.by_teacher", "chat_messages", {"teacher_id": "t"}, [("timestamp", ASCENDING)]),
+    ("messages.page", "chat_messages", {"session_id": "s", "teacher_id": "t"}, [("timestamp", DESCENDING), ("message_id", DESCENDING)]),
+    ("messages.page_after", "chat_messages", {"session_id": "s", "teacher_id": "t", "$or": [
+        {"timestamp": {"$lt": _NOW}}, {"timestamp": _NOW, "message_id": {"$lt": "m"}}
+    ]}, [("timestamp", DESCENDING), ("message_id", DESCENDING)]),
+    ("messages.between", "chat_messages", {"session_id": "s", "teacher_id": "t", "timestamp": {"$gt": _NOW, "$lte": _NOW}},
+     [("timestamp", ASCENDING), ("message_id", ASCENDING)]),
+    ("messages.feedback_update", "chat_messages", {"message_id": "m", "teacher_id": "t", "session_id": "s"}, None),
+    ("messages.feedback_states", "chat_messages", {"message_id": {"$in": ["m1", "m2"]}}, None),
+    ("response_cache.get", "llm_response_cache", {"_id": "k", "expires_at": {"$gt": _NOW}}, None),
+    ("outbox.claim", "email_outbox", {"$or": [
+        {"status": "pending", "next_attempt_at": {"$lte": _NOW}},
+        {"status": "sending", "lease_until": {"$lte": _NOW}},
+    ]}, [("next_attempt_at", ASCENDING)]),
+]
+
+def _key_spec(index: dict) -> list:
+    return [(field, direction) for field, direction in index["key"].items()]
+
+def diff_indexes(expected: list, existing: list) -> list:
+    """Problems with one collection's indexes, as readable strings (empty = all good)."""
+    by_name = {ix["name"]: ix for ix in existing}
+    problems = []
+    for model in expected:
+        spec = model.document
+        actual = by_name.get(spec["name"])
+        if actual is None:
+            problems.append(f"missing {spec['name']}")
+            continue
+        if _key_spec(actual) != _key_spec(spec):
+            problems.append(f"{spec['name']} has keys {_key_spec(actual)}, expected {_key_spec(spec)}")
+        for option in ("unique", "expireAfterSeconds", "partialFilterExpression"):
+            if actual.get(option) != spec.get(option):
+                problems.append(f"{spec['name']} has {option}={actual.get(option)}, expected {spec.get(option)}")
+    return problems
+
+class IndexManager:
+    @staticmethod
+    async def ensure_all(db) -> dict:
+        """
+        Creates the registry on an async database. Returns collection -> error for the
+        ones the server rejected; connection errors propagate (no point trying the rest).
+        """
+        errors = {}
+        await IndexManager.drop_retired(db)
+        for name, models in INDEXES.items():
+            try:
+                await db[name].create_indexes(models)
+            except OperationFailure as e:
+                # e.g. duplicate emails already stored - the other collections still get theirs
+                errors[name] = str(e)
+                logger.error(f"Index creation failed on {name}: {e}")
+        return errors
+
+    @staticmethod
+    async def drop_retired(db):
+        """Removes RETIRED_INDEXES - dead weight on every write once nothing queries them."""
+        for name, index_names in RETIRED_INDEXES.items():
+            for index_name in index_names:
+                try:
+                    await db[name].drop_index(index_name)
+                    logger.info(f"Dropped retired index {name}.{index_name}")
+                except OperationFailure as e:
+                    if e.code != INDEX_NOT_FOUND:
+                        logger.warning(f"Could not drop retired index {name}.{index_name}: {e}")
+
+    @staticmethod
+    async def verify_all(db) -> dict:
+        """collection -> list of problems, only for collections that have any."""
+        report = {}
+        for name, models in INDEXES.items():
+            existing = [ix async for ix in await db[name].list_indexes()]
+            problems = diff_indexes(models, existing)
+            if problems:
+                report[name] = problems
+        return report
+
+def find_collscans(plan: dict) -> list:
+    """Stages of an explain() plan tree that scan the whole collection."""
+    found = []
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get("stage") == "COLLSCAN":
+                found.append(node)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return found
@@ -0,0 +1,257 @@
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pymongo import monitoring
+import bisect
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds. Covers ~1ms Mongo round-trips up to multi-second LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot = +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus-style registry (counters, gauges + histograms with labels), rendered
+    in the text exposition format by render(). Cheap enough to call on every request:
+    one lock, one dict lookup, one bisect.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}    # (name, labels) -> float
+        self._histograms = {}  # (name, labels) -> Histogram
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+
+    @staticmethod
+    def _key(name: str, labels: dict):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        # Gauges render exactly like counters, only the TYPE line (from describe) differs
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @staticmethod
+    def _labels(pairs, extra: str = "") -> str:
+        parts = [f'{k}="{_escape(v)}"' for k, v in pairs]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: (h.buckets, list(h.counts), h.sum, h.count) for k, h in self._histograms.items()}
+        lines = []
+        for name in sorted({k[0] for k in counters} | {k[0] for k in histograms}):
+            kind, help_text = self._help.get(name, ("counter" if any(k[0] == name for k in counters) else "histogram", ""))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{self._labels(labels)} {value:g}")
+            for (n, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, c in zip(buckets, counts):
+                    cumulative += c
+                    le = 'le="%g"' % bound
+                    lines.append(f"{name}_bucket{self._labels(labels, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{name}_bucket{self._labels(labels, le)} {count}")
+                lines.append(f"{name}_sum{self._labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{self._labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+metrics = MetricsRegistry()
+metrics.describe("flashcoach_http_request_seconds", "histogram", "HTTP request latency by route template")
+metrics.describe("flashcoach_stage_seconds", "histogram", "Time spent in each pipeline stage (chat/feedback/stt/tts)")
+metrics.describe("flashcoach_mongo_command_seconds", "histogram", "MongoDB command round-trip time")
+metrics.describe("flashcoach_external_call_seconds", "histogram", "Calls to LLM/STT/TTS/translation providers, per attempt")
+metrics.describe("flashcoach_llm_tokens_total", "counter", "LLM tokens reported by the provider")
+metrics.describe("flashcoach_llm_stream_stalls_total", "counter", "Streamed chat answers abandoned because the provider stopped sending chunks")
+metrics.describe("flashcoach_stt_preprocess_total", "counter", "STT uploads by pre-processing outcome (trimmed/silent/passthrough)")
+metrics.describe("flashcoach_stt_upload_bytes_total", "counter", "Audio bytes sent to the STT provider")
+metrics.describe("flashcoach_stt_windows_total", "counter", "Windows sent to STT for long recordings")
+metrics.describe("flashcoach_stt_trimmed_seconds_total", "counter", "Seconds of silence trimmed before STT upload")
+metrics.describe("flashcoach_password_hash_seconds", "histogram", "bcrypt hash/verify time in the auth process pool, queueing included")
+metrics.describe("flashcoach_password_hash_queue_depth", "gauge", "Password hash jobs admitted and not finished yet")
+metrics.describe("flashcoach_password_hash_rejected_total", "counter", "Password hash jobs shed (queue_full/timeout)")
+metrics.describe("flashcoach_singleflight_total", "counter", "External calls by single-flight role (leader = went upstream, shared = waited on a leader)")
+metrics.describe("flashcoach_admission_total", "counter", "LLM/STT admission decisions by outcome and priority class")
+metrics.describe("flashcoach_admission_wait_seconds", "histogram", "Time spent queued for an LLM/STT slot")
+metrics.describe("flashcoach_admission_in_flight", "gauge", "LLM/STT calls currently holding a slot")
+metrics.describe("flashcoach_admission_queue_depth", "gauge", "Interactive calls waiting for a slot")
+metrics.describe("flashcoach_email_outbox_total", "counter", "Escalation emails by outbox outcome (queued/sent/retry/dead)")
+
+# Stages finished during the current request, for the Server-Timing header
+_request_timings: ContextVar = ContextVar("request_timings", default=None)
+
+@contextmanager
+def span(stage: str):
+    """Times a pipeline stage: histogram + Server-Timing entry on the current request (if any)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe("flashcoach_stage_seconds", elapsed, stage=stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+def record_token_usage(usage, model: str):
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        value = getattr(usage, kind, None)
+        if value:
+            metrics.inc("flashcoach_llm_tokens_total", value, model=model, kind=kind.split("_")[0])
+
+def _server_timing(timings: list, total: float) -> str:
+    # Repeated stages (e.g. two Mongo writes) are summed into one entry
+    merged = {}
+    for stage, seconds in timings:
+        merged[stage] = merged.get(stage, 0) + seconds
+    entries = [f"{stage.replace('.', '-')};dur={seconds * 1000:.1f}" for stage, seconds in merged.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+class MetricsMiddleware:
+    """
+    Pure ASGI (so streaming responses aren't buffered): times each request by route
+    template and adds a Server-Timing header listing the stages finished before the
+    response headers went out. Streamed responses therefore only show the early stages.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings = []
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = _server_timing(timings, time.perf_counter() - started)
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.observe(
+                "flashcoach_http_request_seconds", time.perf_counter() - started,
+                route=route, method=scope["method"], status=status
+            )
+
+_FILTER_FIELDS = {
+    # command -> where its filter lives
+    "find": lambda c: c.get("filter"),
+    "findAndModify": lambda c: c.get("query"),
+    "count": lambda c: c.get("query"),
+    "distinct": lambda c: c.get("query"),
+    "update": lambda c: [u.get("q") for u in c.get("updates", [])[:1]],
+    "delete": lambda c: [d.get("q") for d in c.get("deletes", [])[:1]],
+    "aggregate": lambda c: c.get("pipeline"),
+}
+
+def query_shape(value):
+    """The filter with every literal replaced by "?" - safe to log, and groups alike queries."""
+    if isinstance(value, dict):
+        return {k: query_shape(v) for k, v in value.items()}
+    if isinstance(value, list):
+        if all(not isinstance(v, (dict, list)) for v in value):
+            return ["?"]  # a 500-id $in is still one shape
+        return [query_shape(v) for v in value]
+    return "?"
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Feeds flashcoach_mongo_command_seconds from pymongo's command monitoring.
+    With slow_ms > 0 it also logs each command slower than that, with its query shape.
+    """
+
+    def __init__(self, slow_ms: int = 0):
+        self.slow_ms = slow_ms
+        self._started = {}  # request_id -> (collection name, query shape or None)
+
+    def started(self, event):
+        value = event.command.get(event.command_name)
+        shape = None
+        if self.slow_ms and event.command_name in _FILTER_FIELDS:
+            shape = query_shape(_FILTER_FIELDS[event.command_name](event.command))
+        self._started[event.request_id] = (value if isinstance(value, str) else "", shape)
+
+    def _finish(self, event, outcome: str):
+        collection, shape = self._started.pop(event.request_id, ("", None))
+        seconds = event.duration_micros / 1e6
+        metrics.observe(
+            "flashcoach_mongo_command_seconds", seconds,
+            command=event.command_name, collection=collection, outcome=outcome
+        )
+        if self.slow_ms and seconds * 1000 >= self.slow_ms:
+            logger.warning(
+                f"Slow Mongo {event.command_name} on {collection}: {seconds * 1000:.0f}ms",
+                extra={"mongo_command": event.command_name, "mongo_collection": collection,
+                       "mongo_ms": round(seconds * 1000, 1), "query_shape": shape}
+            )
+
+    def succeeded(self, event):
+        self._finish(event, "ok")
+
+    def failed(self, event):
+        self._finish(event, "error")
@@ -1,12 +1,54 @@
 
+from app.utils.logger import setup_logging, stop_logging, RequestContextMiddleware
+
+# Before the app imports below, so log lines emitted at import time (Mongo connect...) go through it
+setup_logging()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import auth, coaching, feedback, health
-from app.utils.logger import setup_logging
+from app.core.config import settings
+from app.core.database import async_db, close_async_client
+from app.core.indexes import IndexManager
+from app.core.metrics import MetricsMiddleware
+from app.repositories.history_writer import history_writer
+from app.repositories.teacher_cache import teacher_cache
+from app.services.llm_client import llm_client
+from app.services.email_outbox import email_outbox
+from app.services.password_hasher import password_hasher
+import logging
 
-setup_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await IndexManager.ensure_all(async_db)
+        problems = await IndexManager.verify_all(async_db)
+    except Exception as e:
+        # Don't block startup - queries still work, just without index support
+        logger.error(f"Index creation failed: {e}")
+        problems = {"*": [str(e)]}
+    if problems:
+        logger.error(f"Index verification failed: {problems}")
+        if settings.INDEX_VERIFY_STRICT:
+            raise RuntimeError(f"Required MongoDB indexes missing or different: {problems}")
+    await history_writer.start()
+    await email_outbox.start()
+    await teacher_cache.start()
+    await password_hasher.start()
+    yield
+    # Shutdown: flush buffered chat messages, park the email worker (pending mails stay in Mongo), then release pooled Mongo connections
+    await history_writer.stop()
+    await email_outbox.stop()
+    await teacher_cache.stop()
+    await password_hasher.stop()
+    await llm_client.aclose()
+    await close_async_client()
+    stop_logging()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "https://just-in-time-flash-coach.vercel.app",
@@ -22,6 +64,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Starlette runs the last-added middleware first: request context wraps CORS, and
+# metrics goes outermost so the request timing includes every other middleware
+app.add_middleware(RequestContextMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(health.router)
 app.include_router(auth.router)
 app.include_router(coaching.router)
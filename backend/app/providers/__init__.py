@@ -0,0 +1,73 @@
+"""
+External services behind small interfaces (see base.py), picked with Settings:
+
+    LLM_PROVIDER          groq | local
+    STT_PROVIDER          groq | local
+    TTS_PROVIDER          gtts | local
+    TRANSLATION_PROVIDER  google | local
+
+The local stand-ins never touch the network; their latency and error rate come from
+LOCAL_*_LATENCY / LOCAL_*_ERROR_RATE so the backend can be load-tested offline.
+"""
+
+from app.providers.base import LLMProvider, STTProvider, TTSProvider, TranslationProvider, TransientProviderError
+from app.core.config import settings
+
+_groq = None
+
+def _groq_provider():
+    # Chat and Whisper share one client (and one connection pool)
+    global _groq
+    if _groq is None:
+        from app.providers.groq import GroqProvider
+        _groq = GroqProvider()
+    return _groq
+
+def _latency(kind: str):
+    from app.providers.local import LatencyModel
+    return LatencyModel(
+        getattr(settings, f"LOCAL_{kind}_LATENCY"),
+        getattr(settings, f"LOCAL_{kind}_ERROR_RATE"),
+        seed=f"{settings.LOCAL_PROVIDER_SEED}:{kind}"
+    )
+
+def _unknown(kind: str, name: str):
+    return ValueError(f"Unknown {kind} provider: {name!r}")
+
+def build_llm_provider() -> LLMProvider:
+    name = settings.LLM_PROVIDER
+    if name == "groq":
+        return _groq_provider()
+    if name == "local":
+        from app.providers.local import LocalLLMProvider
+        return LocalLLMProvider(_latency("LLM"))
+    raise _unknown("LLM", name)
+
+def build_stt_provider() -> STTProvider:
+    name = settings.STT_PROVIDER
+    if name == "groq":
+        return _groq_provider()
+    if name == "local":
+        from app.providers.local import LocalSTTProvider
+        return LocalSTTProvider(_latency("STT"), settings.LOCAL_STT_TRANSCRIPT)
+    raise _unknown("STT", name)
+
+def build_tts_provider() -> TTSProvider:
+    name = settings.TTS_PROVIDER
+    if name == "gtts":
+        from app.providers.google import GTTSProvider
+        return GTTSProvider()
+    if name == "local":
+        from app.providers.local import LocalTTSProvider
+        return LocalTTSProvider(_latency("TTS"))
+    raise _unknown("TTS", name)
+
+def build_translation_provider() -> TranslationProvider:
+    name = settings.TRANSLATION_PROVIDER
+    if name == "google":
+        from app.providers.google import GoogleTranslationProvider
+        return GoogleTranslationProvider()
+    if name == "local":
+        from app.providers.local import LocalTranslationProvider
+        return LocalTranslationProvider(_latency("TRANSLATE"))
+    raise _unknown("translation", name)
@@ -0,0 +1,53 @@
+
+from abc import ABC, abstractmethod
+
+class TransientProviderError(Exception):
+    """Upstream hiccup worth retrying (the local stand-ins raise this for injected errors)."""
+
+class LLMProvider(ABC):
+    """
+    Chat completions. Results use the OpenAI response shape
+    (completion.choices[0].message.content, chunk.choices[0].delta.content, completion.usage)
+    so callers don't care which provider answered.
+    """
+
+    name = "llm"
+
+    @abstractmethod
+    async def chat(self, **kwargs):
+        ...
+
+    @abstractmethod
+    async def chat_stream(self, **kwargs):
+        """Returns an async iterator of completion chunks."""
+
+    async def aclose(self):
+        pass
+
+class STTProvider(ABC):
+    name = "stt"
+
+    @abstractmethod
+    async def transcribe(self, file, model: str = None, **kwargs):
+        """file is a (filename, bytes) tuple; returns an object with .text"""
+
+    async def aclose(self):
+        pass
+
+class TTSProvider(ABC):
+    """Blocking - always called from a worker thread."""
+
+    name = "tts"
+
+    @abstractmethod
+    def synthesize(self, text: str, lang: str, slow: bool = False) -> bytes:
+        """Returns mp3 bytes."""
+
+class TranslationProvider(ABC):
+    """Blocking - always called from a worker thread."""
+
+    name = "translation"
+
+    @abstractmethod
+    def translate(self, text: str, source: str, target: str) -> str:
+        ...
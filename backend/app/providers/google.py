@@ -0,0 +1,35 @@
+
+from app.providers.base import TTSProvider, TranslationProvider
+from deep_translator import GoogleTranslator
+from gtts import gTTS
+import io
+import threading
+
+class GoogleTranslationProvider(TranslationProvider):
+    name = "google"
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _translator(self, source: str, target: str) -> GoogleTranslator:
+        # GoogleTranslator mutates its URL params per call, so one instance per thread per pair
+        translators = getattr(self._local, "translators", None)
+        if translators is None:
+            translators = self._local.translators = {}
+        pair = (source, target)
+        if pair not in translators:
+            translators[pair] = GoogleTranslator(source=source, target=target)
+        return translators[pair]
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        return self._translator(source, target).translate(text)
+
+class GTTSProvider(TTSProvider):
+    name = "gtts"
+
+    def synthesize(self, text: str, lang: str, slow: bool = False) -> bytes:
+        tts = gTTS(text=text, lang=lang, slow=slow)
+        # Use BytesIO to avoid file system operations
+        audio_bytes = io.BytesIO()
+        tts.write_to_fp(audio_bytes)
+        return audio_bytes.getvalue()
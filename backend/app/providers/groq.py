@@ -0,0 +1,39 @@
+
+from app.providers.base import LLMProvider, STTProvider
+from app.core.config import settings
+import openai
+from openai import AsyncOpenAI
+import httpx
+
+class GroqProvider(LLMProvider, STTProvider):
+    """Groq's OpenAI-compatible API: chat completions and Whisper, over one pooled HTTP client."""
+
+    name = "groq"
+
+    def __init__(self):
+        if not settings.GROQ_API_KEY:
+            raise RuntimeError("GROQ_API_KEY is not set (use LLM_PROVIDER=local / STT_PROVIDER=local to run offline)")
+        self._http = openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE
+            )
+        )
+        self._client = AsyncOpenAI(
+            api_key=settings.GROQ_API_KEY,
+            base_url=settings.LLM_BASE_URL,
+            http_client=self._http,
+            max_retries=0  # LLMClient retries so attempts share one deadline
+        )
+
+    async def chat(self, **kwargs):
+        return await self._client.chat.completions.create(**kwargs)
+
+    async def chat_stream(self, **kwargs):
+        return await self._client.chat.completions.create(stream=True, **kwargs)
+
+    async def transcribe(self, file, model: str = "whisper-large-v3", **kwargs):
+        return await self._client.audio.transcriptions.create(file=file, model=model, **kwargs)
+
+    async def aclose(self):
+        await self._client.close()
@@ -0,0 +1,183 @@
+
+from app.providers.base import LLMProvider, STTProvider, TTSProvider, TranslationProvider, TransientProviderError
+from types import SimpleNamespace
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+
+class LatencyModel:
+    """
+    Parsed from a spec string:
+        "fixed:50"            always 50ms
+        "uniform:20:80"       uniform between 20 and 80ms
+        "lognormal:800:0.4"   median 800ms, sigma 0.4 (long right tail, like real APIs)
+    plus an error rate in [0, 1]. Seeded, so a benchmark run is reproducible.
+    """
+
+    def __init__(self, spec: str, error_rate: float = 0.0, seed: int = 0):
+        kind, *params = (spec or "fixed:0").split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "lognormal") or len(self.params) != {"fixed": 1, "uniform": 2, "lognormal": 2}[kind]:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        """(seconds to wait, whether this call should fail)"""
+        with self._lock:
+            if self.kind == "fixed":
+                ms = self.params[0]
+            elif self.kind == "uniform":
+                ms = self._rng.uniform(*self.params)
+            else:
+                median, sigma = self.params
+                ms = median * self._rng.lognormvariate(0, sigma)
+            return ms / 1000, self._rng.random() < self.error_rate
+
+    async def wait(self, what: str):
+        delay, fail = self.sample()
+        await asyncio.sleep(delay)
+        if fail:
+            raise TransientProviderError(f"injected {what} failure")
+
+    def wait_blocking(self, what: str):
+        delay, fail = self.sample()
+        time.sleep(delay)
+        if fail:
+            raise TransientProviderError(f"injected {what} failure")
+
+_ADVICE = [
+    ("Pause and reset", "Stop talking, wait for silence, then restart with one clear instruction."),
+    ("Give everyone a role", "Split the class into small groups and give each student a specific job."),
+    ("Use a quick check", "Ask every student to show thumbs up or down so you can see who is lost."),
+    ("Move around the room", "Walk between the rows while you teach, so every student feels seen."),
+    ("Praise the right behaviour", "Name one student who is doing the task well, out loud and specifically."),
+]
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+class LocalLLMProvider(LLMProvider):
+    """
+    Canned answers in the coaching JSON schema, picked deterministically from the user
+    message so identical queries get identical answers. Requests that don't ask for JSON
+    (no response_format, no JSON in the system prompt) get a short plain-text reply,
+    which is what the summarizer expects.
+    """
+
+    name = "local"
+
+    def __init__(self, latency: LatencyModel, stream_chunk_chars: int = 24):
+        self.latency = latency
+        self.stream_chunk_chars = stream_chunk_chars
+
+    @staticmethod
+    def _wants_json(messages: list, response_format: dict) -> bool:
+        # Streaming can't use JSON mode, so the coaching prompt asks for JSON in the system message
+        return bool(response_format) or any(m.get("role") == "system" and "JSON" in (m.get("content") or "") for m in messages)
+
+    def _answer(self, messages: list, json_mode: bool) -> str:
+        query = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        if not json_mode:
+            return f"The teacher discussed: {query[:200]}"
+        seed = int(hashlib.sha256(query.encode("utf-8")).hexdigest(), 16)
+        steps = [_ADVICE[(seed + i) % len(_ADVICE)] for i in range(3)]
+        return json.dumps({
+            "voice_mode": True,
+            "speech_flow": {
+                "intro": "That sounds like a tough moment. Here is what you can try.",
+                "main_advice": [
+                    {"step": i + 1, "title": title, "spoken_text": text} for i, (title, text) in enumerate(steps)
+                ],
+                "closing": "You are doing great. Try one of these in your next class."
+            },
+            "voice_controls": {
+                "button_behavior": {"first_click": "start", "second_click": "pause", "third_click": "resume"},
+                "can_stop": True
+            },
+            "feedback": {
+                "feedback_required": True,
+                "feedback_storage": {
+                    "store_feedback_value": True, "store_as": "string", "field_name": "feedback_status",
+                    "allowed_values": ["worked", "partially_worked", "did_not_work"]
+                },
+                "negative_tracking": {"track_consecutive_negatives": True, "negative_value": "did_not_work", "threshold": 3},
+                "post_escalation_behavior": {"notify_mentor": True, "reset_negative_count": True},
+                "feedback_prompt": "Did this advice work for you?"
+            },
+            "notification": {"send_notification": True, "priority": "normal", "spoken_notification_text": "New advice is ready."},
+            "ui_actions": {"add_new_chat_button": True, "new_chat_behavior": "clear_current_context_and_starts_fresh_interaction"}
+        })
+
+    @staticmethod
+    def _usage(messages: list, content: str):
+        prompt = sum(_estimate_tokens(m.get("content") or "") for m in messages)
+        completion = _estimate_tokens(content)
+        return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion)
+
+    async def chat(self, messages: list = (), response_format: dict = None, **kwargs):
+        await self.latency.wait("llm")
+        content = self._answer(messages, self._wants_json(messages, response_format))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content), finish_reason="stop")],
+            usage=self._usage(messages, content)
+        )
+
+    async def chat_stream(self, messages: list = (), response_format: dict = None, **kwargs):
+        # Sampled latency is time-to-first-token; the rest trickles out in small chunks
+        await self.latency.wait("llm")
+        content = self._answer(messages, self._wants_json(messages, response_format))
+        return self._chunks(content)
+
+    async def _chunks(self, content: str):
+        for i in range(0, len(content), self.stream_chunk_chars):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + self.stream_chunk_chars]))])
+            await asyncio.sleep(0)
+
+class LocalSTTProvider(STTProvider):
+    """Returns the same transcript for any audio."""
+
+    name = "local"
+
+    def __init__(self, latency: LatencyModel, transcript: str):
+        self.latency = latency
+        self.transcript = transcript
+
+    async def transcribe(self, file, model: str = None, **kwargs):
+        await self.latency.wait("stt")
+        return SimpleNamespace(text=self.transcript)
+
+# One MPEG-1 Layer III frame, 128kbps / 44.1kHz, all-zero payload: decodes to 26ms of silence
+_SILENT_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+_FRAME_SECONDS = 1152 / 44100
+
+class LocalTTSProvider(TTSProvider):
+    """Silent mp3, about as long as speaking the text would take (~14 chars/second)."""
+
+    name = "local"
+
+    def __init__(self, latency: LatencyModel, chars_per_second: float = 14.0):
+        self.latency = latency
+        self.chars_per_second = chars_per_second
+
+    def synthesize(self, text: str, lang: str, slow: bool = False) -> bytes:
+        self.latency.wait_blocking("tts")
+        seconds = len(text) / self.chars_per_second * (1.5 if slow else 1.0)
+        return _SILENT_FRAME * max(1, int(seconds / _FRAME_SECONDS))
+
+class LocalTranslationProvider(TranslationProvider):
+    """Echo: returns the input unchanged."""
+
+    name = "local"
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        self.latency.wait_blocking("translation")
+        return text
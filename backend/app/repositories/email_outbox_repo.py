@@ -0,0 +1,80 @@
+
+from app.core.database import async_email_outbox_collection as outbox_collection
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+class EmailOutboxRepository:
+    """
+    email_outbox documents:
+        {kind, dedupe_key, payload, status: pending|sending|sent|dead, active, attempts,
+         next_attempt_at, lease_until, last_error, created_at, sent_at}
+    """
+
+    @staticmethod
+    async def enqueue(kind: str, dedupe_key: str, payload: dict):
+        """Returns the new mail's _id, or None if one with this dedupe_key is still undelivered."""
+        now = datetime.now()
+        try:
+            result = await outbox_collection.insert_one({
+                "kind": kind,
+                "dedupe_key": dedupe_key,
+                "payload": payload,
+                "status": "pending",
+                "active": True,
+                "attempts": 0,
+                "next_attempt_at": now,
+                "lease_until": None,
+                "last_error": None,
+                "created_at": now,
+            })
+        except DuplicateKeyError:
+            return None
+        return result.inserted_id
+
+    @staticmethod
+    async def claim_next(lease_seconds: float):
+        """
+        Atomically takes one due mail. A "sending" mail whose lease ran out (worker died
+        mid-send) is claimable again, so nothing is stuck forever.
+        """
+        now = datetime.now()
+        return await outbox_collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "lease_until": {"$lte": now}},
+            ]},
+            {"$set": {"status": "sending", "lease_until": now + timedelta(seconds=lease_seconds)}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    async def mark_sent(mail_id):
+        await outbox_collection.update_one(
+            {"_id": mail_id},
+            {"$set": {"status": "sent", "sent_at": datetime.now(), "last_error": None},
+             "$unset": {"active": "", "lease_until": ""}}
+        )
+
+    @staticmethod
+    async def mark_retry(mail_id, attempts: int, next_attempt_at: datetime, error: str):
+        await outbox_collection.update_one(
+            {"_id": mail_id},
+            {"$set": {"status": "pending", "attempts": attempts, "next_attempt_at": next_attempt_at,
+                      "last_error": error, "lease_until": None}}
+        )
+
+    @staticmethod
+    async def mark_dead(mail_id, attempts: int, error: str):
+        # Dead letters stay in the collection for inspection / manual re-queue
+        await outbox_collection.update_one(
+            {"_id": mail_id},
+            {"$set": {"status": "dead", "attempts": attempts, "last_error": error, "dead_at": datetime.now()},
+             "$unset": {"active": "", "lease_until": ""}}
+        )
+
+    @staticmethod
+    async def count_by_status() -> dict:
+        cursor = await outbox_collection.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}])
+        return {row["_id"]: row["count"] async for row in cursor}
@@ -1,5 +1,7 @@
 
 from app.repositories.interaction_repo import InteractionRepository
+from app.repositories.history_writer import history_writer
+import asyncio
 
 class FeedbackRepository:
     # Thin wrapper or dedicated logic if collections separate.
@@ -7,5 +9,16 @@ class FeedbackRepository:
     # Keeping it simple as requested structure.
     
     @staticmethod
-    def record_feedback(teacher_id: str, session_id: str, message_id: str, feedback: str):
-        return InteractionRepository.update_feedback_status(teacher_id, session_id, message_id, feedback)
+    async def record_feedback(teacher_id: str, session_id: str, message_id: str, feedback: str):
+        # With write-behind on, the rated message may still be sitting in the buffer
+        await history_writer.ensure_persisted(message_id)
+        return await InteractionRepository.update_feedback_status(teacher_id, session_id, message_id, feedback)
+
+    @staticmethod
+    async def get_feedback_states(message_ids: list):
+        await asyncio.gather(*(history_writer.ensure_persisted(mid) for mid in message_ids))
+        return await InteractionRepository.get_feedback_states(message_ids)
+
+    @staticmethod
+    async def record_feedback_bulk(updates: list):
+        return await InteractionRepository.bulk_update_feedback_status(updates)
@@ -0,0 +1,150 @@
+
+from app.repositories.interaction_repo import InteractionRepository, PartialWriteError, APPEND_HALVES
+from app.core.config import settings
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class HistoryWriter:
+    """
+    Write-behind buffer for chat messages.
+
+    When enabled, append() drops the message into a bounded in-process queue and a
+    background task flushes it with bulk_write once HISTORY_WRITE_BATCH_SIZE messages
+    are waiting or HISTORY_WRITE_FLUSH_MS has passed. When disabled, append() writes
+    inline exactly like before.
+    """
+
+    MAX_FLUSH_ATTEMPTS = 3
+
+    def __init__(self, enabled: bool, batch_size: int, flush_ms: int, queue_size: int, durability: str):
+        self.enabled = enabled
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_ms / 1000
+        self.queue_size = queue_size
+        self.durability = durability
+        self._queue = None
+        self._task = None
+        self._pending = {}  # message_id -> future resolved once the message is in Mongo
+        self.stats = {"queued": 0, "flushed": 0, "batches": 0, "failed": 0}
+
+    async def start(self):
+        if not self.enabled or self._task:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"History write-behind enabled (batch={self.batch_size}, flush={self.flush_interval}s, durability={self.durability})")
+
+    async def stop(self):
+        # Flush everything still buffered before the process exits
+        if not self._task:
+            return
+        task, self._task = self._task, None  # new appends go inline from here on
+        await self._queue.put(None)
+        await task
+        while not self._queue.empty():
+            await self._flush([item for item in self._take_batch() if item])
+
+    async def append(self, teacher_id: str, session_id: str, message: dict):
+        if not self._task:
+            await InteractionRepository.create_or_update_session(teacher_id, session_id, message)
+            return
+
+        done = asyncio.get_running_loop().create_future()
+        message_id = message.get("message_id")
+        if message_id:
+            self._pending[message_id] = done
+        # Blocks (backpressure) only when the queue is full
+        await self._queue.put((teacher_id, session_id, message, done))
+        self.stats["queued"] += 1
+
+        if self.durability == "acked":
+            await done
+
+    async def ensure_persisted(self, message_id: str):
+        # Feedback on a message that is still buffered must wait for it to land first
+        done = self._pending.get(message_id)
+        if done:
+            try:
+                await asyncio.shield(done)
+            except Exception:
+                pass  # flush failed - the caller will simply not find the message
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def _take_batch(self):
+        batch = []
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        if not batch:
+            return
+        entries = [(teacher_id, session_id, message) for teacher_id, session_id, message, _ in batch]
+        error = None
+        halves = APPEND_HALVES
+        for attempt in range(self.MAX_FLUSH_ATTEMPTS):
+            try:
+                await InteractionRepository.append_messages(entries, halves)
+                error = None
+                break
+            except PartialWriteError as e:
+                # Only redo what failed - re-running the session half would double-count message_count
+                error, halves = e.error, e.failed
+                logger.warning(f"History flush failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(0.1 * 2 ** attempt)
+            except Exception as e:
+                error = e
+                logger.warning(f"History flush failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(0.1 * 2 ** attempt)
+
+        if error:
+            self.stats["failed"] += len(batch)
+            logger.error(f"Dropping {len(batch)} chat messages after {self.MAX_FLUSH_ATTEMPTS} failed flushes: {error}")
+        else:
+            self.stats["flushed"] += len(batch)
+            self.stats["batches"] += 1
+
+        for _, _, message, done in batch:
+            self._pending.pop(message.get("message_id"), None)
+            if done.done():
+                continue
+            if error:
+                done.set_exception(error)
+                done.exception()  # mark retrieved - buffered callers never await it
+            else:
+                done.set_result(True)
+
+history_writer = HistoryWriter(
+    enabled=settings.HISTORY_WRITE_BEHIND,
+    batch_size=settings.HISTORY_WRITE_BATCH_SIZE,
+    flush_ms=settings.HISTORY_WRITE_FLUSH_MS,
+    queue_size=settings.HISTORY_WRITE_QUEUE_SIZE,
+    durability=settings.HISTORY_WRITE_DURABILITY,
+)
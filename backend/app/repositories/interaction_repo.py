@@ -1,59 +1,214 @@
 
-from app.core.database import history_collection
+from app.core.database import async_sessions_collection as sessions_collection
+from app.core.database import async_messages_collection as messages_collection
 from datetime import datetime
-import uuid
+from pymongo import ASCENDING, DESCENDING, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+import asyncio
+
+# Normalized layout:
+#   chat_sessions: one small doc per (teacher_id, session_id)
+#   chat_messages: one doc per message, looked up by message_id / (session_id, timestamp)
+# Appending a message or recording feedback touches O(1) documents no matter how
+# long the teacher has been using the app (the legacy chat_history doc grew forever).
+# Index specs live in app.core.indexes (SESSION_INDEXES / MESSAGE_INDEXES)
+
+# Fields that only exist for indexing - stripped when rebuilding the legacy message shape
+_MESSAGE_INTERNAL_FIELDS = {"_id": 0, "teacher_id": 0}
+
+APPEND_HALVES = ("sessions", "messages")
+
+class PartialWriteError(Exception):
+    """append_messages: `failed` lists the halves to retry; the others were written."""
+
+    def __init__(self, failed: tuple, error: Exception):
+        super().__init__(f"{'/'.join(failed)} write failed: {error}")
+        self.failed = failed
+        self.error = error
 
 class InteractionRepository:
     @staticmethod
-    def get_history(teacher_id: str):
-        doc = history_collection.find_one({"teacher_id": teacher_id})
-        if doc and "_id" in doc:
-             doc["_id"] = str(doc["_id"])
-        return doc
-        
-    @staticmethod
-    def create_or_update_session(teacher_id: str, session_id: str, message: dict):
-        # Update or Create History Doc
-        history_doc = history_collection.find_one({"teacher_id": teacher_id})
-        
-        if not history_doc:
-            # Create new doc
-            new_session = {
-                "session_id": session_id,
-                "messages": [message]
-            }
-            history_collection.insert_one({
-                "teacher_id": teacher_id,
-                "chat_history": [new_session]
-            })
-        else:
-            # Check if session exists
-            existing_session = next((s for s in history_doc.get("chat_history", []) if s["session_id"] == session_id), None)
-            if existing_session:
-                history_collection.update_one(
-                    {"teacher_id": teacher_id, "chat_history.session_id": session_id},
-                    {"$push": {"chat_history.$.messages": message}}
-                )
-            else:
-                # Add new session
-                new_session = {
-                    "session_id": session_id,
-                    "messages": [message]
-                }
-                history_collection.update_one(
-                    {"teacher_id": teacher_id},
-                    {"$push": {"chat_history": new_session}}
-                )
-
-    @staticmethod
-    def update_feedback_status(teacher_id: str, session_id: str, message_id: str, feedback: str):
-         # Update the specific message interaction with the feedback string
-        result = history_collection.update_one(
-            {"teacher_id": teacher_id, "chat_history.session_id": session_id},
-            {"$set": {"chat_history.$[session].messages.$[msg].feedback_status": feedback}},
-            array_filters=[
-                {"session.session_id": session_id},
-                {"msg.message_id": message_id}
+    async def get_history(teacher_id: str):
+        # Rebuilds the legacy {"teacher_id", "chat_history": [{session_id, messages}]} shape
+        sessions = await sessions_collection.find(
+            {"teacher_id": teacher_id}, {"_id": 0, "session_id": 1}
+        ).sort("created_at", ASCENDING).to_list(None)
+        if not sessions:
+            return None
+
+        by_session = {s["session_id"]: [] for s in sessions}
+        cursor = messages_collection.find(
+            {"teacher_id": teacher_id}, _MESSAGE_INTERNAL_FIELDS
+        ).sort("timestamp", ASCENDING)
+        async for msg in cursor:
+            sid = msg.pop("session_id")
+            if sid in by_session:
+                by_session[sid].append(msg)
+
+        return {
+            "teacher_id": teacher_id,
+            "chat_history": [{"session_id": sid, "messages": msgs} for sid, msgs in by_session.items()]
+        }
+
+    @staticmethod
+    def find_sessions(teacher_id: str, before: tuple = None, limit: int = 0, projection: dict = None):
+        """
+        Newest-first cursor over a teacher's sessions.
+        before: (updated_at, session_id) of the last session already returned.
+        """
+        query = {"teacher_id": teacher_id}
+        if before:
+            updated_at, session_id = before
+            query["$or"] = [
+                {"updated_at": {"$lt": updated_at}},
+                {"updated_at": updated_at, "session_id": {"$lt": session_id}}
             ]
+        return sessions_collection.find(query, projection).sort(
+            [("updated_at", DESCENDING), ("session_id", DESCENDING)]
+        ).limit(limit)
+
+    @staticmethod
+    def find_messages(teacher_id: str, session_id: str, before: tuple = None, limit: int = 0, projection: dict = None):
+        """
+        Newest-first cursor over one session's messages.
+        before: (timestamp, message_id) of the oldest message already returned.
+        """
+        query = {"session_id": session_id, "teacher_id": teacher_id}
+        if before:
+            timestamp, message_id = before
+            query["$or"] = [
+                {"timestamp": {"$lt": timestamp}},
+                {"timestamp": timestamp, "message_id": {"$lt": message_id}}
+            ]
+        return messages_collection.find(query, projection).sort(
+            [("timestamp", DESCENDING), ("message_id", DESCENDING)]
+        ).limit(limit)
+
+    @staticmethod
+    async def get_session(teacher_id: str, session_id: str, projection: dict = None):
+        return await sessions_collection.find_one({"teacher_id": teacher_id, "session_id": session_id}, projection)
+
+    @staticmethod
+    def find_messages_between(teacher_id: str, session_id: str, after=None, until=None, projection: dict = None):
+        # Oldest-first slice of a session: after < timestamp <= until (either bound optional)
+        query = {"session_id": session_id, "teacher_id": teacher_id}
+        window = {}
+        if after:
+            window["$gt"] = after
+        if until:
+            window["$lte"] = until
+        if window:
+            query["timestamp"] = window
+        return messages_collection.find(query, projection).sort([("timestamp", ASCENDING), ("message_id", ASCENDING)])
+
+    @staticmethod
+    async def update_session_summary(teacher_id: str, session_id: str, summary: str, summary_until, previous_until=None):
+        # Compare-and-set on summary_until so two concurrent refreshes can't overwrite each other
+        result = await sessions_collection.update_one(
+            {"teacher_id": teacher_id, "session_id": session_id, "summary_until": previous_until},
+            {"$set": {"summary": summary, "summary_until": summary_until}}
+        )
+        return result.modified_count
+
+    @staticmethod
+    def find_all_messages(teacher_id: str, projection: dict = None):
+        # Oldest-first stream of every message a teacher has, for NDJSON export of the full history
+        return messages_collection.find(
+            {"teacher_id": teacher_id}, projection or _MESSAGE_INTERNAL_FIELDS
+        ).sort("timestamp", ASCENDING)
+
+    @staticmethod
+    async def create_or_update_session(teacher_id: str, session_id: str, message: dict):
+        # Upsert the session header and insert the message - independent writes, so run them together
+        ts = message.get("timestamp") or datetime.now()
+        await asyncio.gather(
+            sessions_collection.update_one(
+                {"teacher_id": teacher_id, "session_id": session_id},
+                {
+                    "$setOnInsert": {"created_at": ts},
+                    "$set": {"updated_at": ts},
+                    "$inc": {"message_count": 1}
+                },
+                upsert=True
+            ),
+            messages_collection.insert_one({**message, "teacher_id": teacher_id, "session_id": session_id})
         )
+
+    @staticmethod
+    async def append_messages(entries: list, halves: tuple = APPEND_HALVES):
+        """
+        Batched version of create_or_update_session for the write-behind flusher.
+        entries: [(teacher_id, session_id, message), ...] in arrival order.
+        The session half ($inc message_count) is not idempotent, so on failure this raises
+        PartialWriteError and the caller retries only the halves that failed.
+        """
+        if not entries:
+            return
+        message_ops = []
+        sessions = {}
+        for teacher_id, session_id, message in entries:
+            message_ops.append(InsertOne({**message, "teacher_id": teacher_id, "session_id": session_id}))
+            ts = message.get("timestamp") or datetime.now()
+            key = (teacher_id, session_id)
+            first, last, count = sessions.get(key, (ts, ts, 0))
+            sessions[key] = (min(first, ts), max(last, ts), count + 1)
+
+        session_ops = [
+            UpdateOne(
+                {"teacher_id": teacher_id, "session_id": session_id},
+                {
+                    "$setOnInsert": {"created_at": first},
+                    "$max": {"updated_at": last},
+                    "$inc": {"message_count": count}
+                },
+                upsert=True
+            )
+            for (teacher_id, session_id), (first, last, count) in sessions.items()
+        ]
+
+        async def write_messages():
+            try:
+                await messages_collection.bulk_write(message_ops, ordered=False)
+            except BulkWriteError as e:
+                # A retried batch may re-insert messages that already landed - that's fine
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+
+        writes = {"sessions": lambda: sessions_collection.bulk_write(session_ops, ordered=False),
+                  "messages": write_messages}
+        results = await asyncio.gather(*(writes[half]() for half in halves), return_exceptions=True)
+        failed = tuple(half for half, result in zip(halves, results) if isinstance(result, Exception))
+        if failed:
+            raise PartialWriteError(failed, next(r for r in results if isinstance(r, Exception)))
+
+    @staticmethod
+    async def update_feedback_status(teacher_id: str, session_id: str, message_id: str, feedback: str):
+        # Single indexed update on message_id; teacher/session guard against cross-account writes
+        result = await messages_collection.update_one(
+            {"message_id": message_id, "teacher_id": teacher_id, "session_id": session_id},
+            {"$set": {"feedback_status": feedback}}
+        )
+        return result.modified_count
+
+    @staticmethod
+    async def get_feedback_states(message_ids: list) -> dict:
+        """message_id -> {teacher_id, session_id, feedback_status} for the messages that exist."""
+        cursor = messages_collection.find(
+            {"message_id": {"$in": message_ids}},
+            {"_id": 0, "message_id": 1, "teacher_id": 1, "session_id": 1, "feedback_status": 1}
+        )
+        return {doc["message_id"]: doc async for doc in cursor}
+
+    @staticmethod
+    async def bulk_update_feedback_status(updates: list):
+        """updates: (teacher_id, session_id, message_id, feedback) - one unordered bulk_write."""
+        if not updates:
+            return 0
+        result = await messages_collection.bulk_write([
+            UpdateOne(
+                {"message_id": message_id, "teacher_id": teacher_id, "session_id": session_id},
+                {"$set": {"feedback_status": feedback}}
+            )
+            for teacher_id, session_id, message_id, feedback in updates
+        ], ordered=False)
         return result.modified_count
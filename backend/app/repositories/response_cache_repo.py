@@ -0,0 +1,54 @@
+
+from app.core.database import async_response_cache_collection as cache_collection
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+
+# Counter bumped on every invalidation; workers compare it against their local copies.
+# Cache keys are sha256 hex, so this id can't collide with an entry.
+GENERATION_ID = "__generation__"
+
+class ResponseCacheRepository:
+    @staticmethod
+    async def get(key: str):
+        # The TTL monitor only runs every ~60s, so filter on expiry as well
+        doc = await cache_collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.now()}}, {"response": 1}
+        )
+        return doc["response"] if doc else None
+
+    @staticmethod
+    async def put(key: str, response: str, ttl_seconds: int, meta: dict = None):
+        now = datetime.now()
+        await cache_collection.update_one(
+            {"_id": key},
+            {"$set": {
+                "response": response,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=ttl_seconds),
+                **(meta or {})
+            }},
+            upsert=True
+        )
+
+    @staticmethod
+    async def delete(key: str):
+        result = await cache_collection.delete_one({"_id": key})
+        return result.deleted_count
+
+    @staticmethod
+    async def clear():
+        result = await cache_collection.delete_many({"_id": {"$ne": GENERATION_ID}})
+        return result.deleted_count
+
+    @staticmethod
+    async def get_generation() -> int:
+        doc = await cache_collection.find_one({"_id": GENERATION_ID}, {"generation": 1})
+        return doc["generation"] if doc else 0
+
+    @staticmethod
+    async def bump_generation() -> int:
+        doc = await cache_collection.find_one_and_update(
+            {"_id": GENERATION_ID}, {"$inc": {"generation": 1}},
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+        return doc["generation"]
@@ -0,0 +1,129 @@
+
+from app.core.database import async_teacher_collection as teacher_collection
+from app.utils.ttl_cache import TTLCache
+from app.core.config import settings
+from pymongo.errors import OperationFailure
+import asyncio
+import copy
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TeacherCache:
+    """
+    In-process read-through cache of teacher_details documents, reachable by
+    teacher_id and by teacher_mail (an alias to the teacher_id entry).
+
+    TeacherRepository writes through it: create/increment/reset put the resulting doc,
+    update_last_login patches it, anything it can't reconstruct is evicted. Other
+    workers' writes are only seen after TEACHER_CACHE_TTL_S, unless
+    TEACHER_CACHE_INVALIDATION=change_stream, which evicts on every change to the
+    collection (needs a replica set / Atlas).
+    """
+
+    def __init__(self, enabled: bool, maxsize: int, ttl_seconds: float, invalidation: str):
+        self.enabled = enabled
+        self.invalidation = invalidation
+        # Two keys per teacher (doc + mail alias)
+        self.cache = TTLCache(maxsize=maxsize * 2, ttl=ttl_seconds)
+        # Mongo _id -> teacher_id, so change events (keyed by _id) can be mapped back
+        self._oids = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self._task = None
+        self.counters = {"invalidations": 0, "stream_events": 0, "stream_errors": 0}
+
+    @staticmethod
+    def _id_key(teacher_id) -> str:
+        return f"id:{teacher_id}"
+
+    @staticmethod
+    def _mail_key(mail) -> str:
+        return f"mail:{mail}"  # exact, like the Mongo lookup
+
+    def get_by_id(self, teacher_id: str):
+        doc = self.cache.get(self._id_key(teacher_id)) if self.enabled else None
+        # Callers get their own copy - a mutated cached doc would leak into other requests
+        return copy.deepcopy(doc) if doc is not None else None
+
+    def get_by_email(self, mail: str):
+        # The mail key is only an alias to the teacher_id entry, so there is one doc to keep fresh
+        teacher_id = self.cache.get(self._mail_key(mail)) if self.enabled else None
+        doc = self.get_by_id(teacher_id) if teacher_id else None
+        if doc is not None and doc.get("teacher_mail") != mail:
+            return None  # alias outlived a mail change
+        return doc
+
+    def put(self, doc: dict):
+        if not self.enabled or not doc or not doc.get("teacher_id"):
+            return
+        doc = copy.deepcopy(doc)
+        self.cache.set(self._id_key(doc["teacher_id"]), doc)
+        if doc.get("teacher_mail"):
+            self.cache.set(self._mail_key(doc["teacher_mail"]), doc["teacher_id"])
+        if "_id" in doc:
+            self._oids.set(doc["_id"], doc["teacher_id"])
+
+    def patch(self, teacher_id: str, fields: dict):
+        doc = self.cache.peek(self._id_key(teacher_id)) if self.enabled else None
+        if doc is not None:
+            doc.update(copy.deepcopy(fields))
+
+    def invalidate(self, teacher_id: str):
+        doc = self.cache.pop(self._id_key(teacher_id))
+        if doc is not None:
+            self.counters["invalidations"] += 1
+            self._oids.pop(doc.get("_id"), None)
+
+    async def start(self):
+        if not self.enabled or self.invalidation != "change_stream" or self._task:
+            return
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if not self._task:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _watch(self):
+        delay = 1
+        while True:
+            try:
+                async with await teacher_collection.watch() as stream:
+                    # Anything that changed while we weren't listening is unknown - start clean
+                    self.cache.clear()
+                    self._oids.clear()
+                    logger.info("Teacher cache: listening for teacher_details changes")
+                    delay = 1
+                    async for change in stream:
+                        self.counters["stream_events"] += 1
+                        teacher_id = self._oids.get(change.get("documentKey", {}).get("_id"))
+                        if teacher_id:
+                            self.invalidate(teacher_id)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == 40573:  # change streams need a replica set
+                    logger.warning("Teacher cache: change streams unsupported by this MongoDB, falling back to TTL only")
+                    return
+                self.counters["stream_errors"] += 1
+                logger.warning(f"Teacher cache change stream failed, retrying in {delay}s: {e}")
+            except Exception as e:
+                self.counters["stream_errors"] += 1
+                logger.warning(f"Teacher cache change stream failed, retrying in {delay}s: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    def stats(self) -> dict:
+        return {**self.counters, **self.cache.stats(), "invalidation": self.invalidation,
+                "watching": self._task is not None and not self._task.done()}
+
+teacher_cache = TeacherCache(
+    enabled=settings.TEACHER_CACHE_ENABLED,
+    maxsize=settings.TEACHER_CACHE_SIZE,
+    ttl_seconds=settings.TEACHER_CACHE_TTL_S,
+    invalidation=settings.TEACHER_CACHE_INVALIDATION,
+)
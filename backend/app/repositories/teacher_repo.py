@@ -1,5 +1,6 @@
 
-from app.core.database import teacher_collection
+from app.core.database import async_teacher_collection as teacher_collection
+from app.repositories.teacher_cache import teacher_cache
 from bson import ObjectId
 from datetime import datetime
 import pymongo
@@ -7,37 +8,78 @@ from pymongo import ReturnDocument
 
 class TeacherRepository:
     @staticmethod
-    def get_by_email(email: str):
-        return teacher_collection.find_one({"teacher_mail": email})
+    async def get_by_email(email: str):
+        teacher = teacher_cache.get_by_email(email)
+        if teacher is None:
+            teacher = await teacher_collection.find_one({"teacher_mail": email})
+            teacher_cache.put(teacher)
+        return teacher
     
     @staticmethod
-    def create_teacher(teacher_doc: dict):
-        return teacher_collection.insert_one(teacher_doc)
+    async def create_teacher(teacher_doc: dict):
+        result = await teacher_collection.insert_one(teacher_doc)
+        teacher_cache.put(teacher_doc)  # insert_one filled in _id
+        return result
         
     @staticmethod
-    def get_teacher_by_id(teacher_id: str):
-        return teacher_collection.find_one({"teacher_id": teacher_id})
+    async def get_teacher_by_id(teacher_id: str):
+        teacher = teacher_cache.get_by_id(teacher_id)
+        if teacher is None:
+            teacher = await teacher_collection.find_one({"teacher_id": teacher_id})
+            teacher_cache.put(teacher)
+        return teacher
 
     @staticmethod
-    def update_last_login(teacher_id: str):
-        teacher_collection.update_one(
+    async def update_last_login(teacher_id: str):
+        last_login = datetime.now()
+        await teacher_collection.update_one(
             {"teacher_id": teacher_id},
-            {"$set": {"lastLogin": datetime.now()}} # Although _id logic was used in app.py, teacher_id is safer if _id format varies
+            {"$set": {"lastLogin": last_login}} # Although _id logic was used in app.py, teacher_id is safer if _id format varies
         )
+        teacher_cache.patch(teacher_id, {"lastLogin": last_login})
         
     @staticmethod
-    def increment_feedback_count(teacher_id: str):
+    async def update_password_hash(teacher_id: str, password_hash: str):
+        await teacher_collection.update_one(
+            {"teacher_id": teacher_id},
+            {"$set": {"passwordHash": password_hash}}
+        )
+        teacher_cache.patch(teacher_id, {"passwordHash": password_hash})
+        
+    @staticmethod
+    async def increment_feedback_count(teacher_id: str):
         # Increment count BUT Cap at 3 (Retry Logic)
-        return teacher_collection.find_one_and_update(
+        teacher = await teacher_collection.find_one_and_update(
             {"teacher_id": teacher_id},
             [{"$set": {"failedFeedbackCount": {"$min": [{"$add": [{"$ifNull": ["$failedFeedbackCount", 0]}, 1]}, 3]}}}],
             return_document=ReturnDocument.AFTER
         )
+        teacher_cache.put(teacher)
+        return teacher
         
     @staticmethod
-    def reset_feedback_count(teacher_id: str):
-        return teacher_collection.find_one_and_update(
+    async def reset_feedback_count(teacher_id: str):
+        teacher = await teacher_collection.find_one_and_update(
             {"teacher_id": teacher_id},
             {"$set": {"failedFeedbackCount": 0}},
             return_document=ReturnDocument.AFTER
         )
+        teacher_cache.put(teacher)
+        return teacher
+
+    @staticmethod
+    async def apply_feedback_run(teacher_id: str, failures: int, reset: bool):
+        """
+        A whole batch of feedback for one teacher in one round trip: the count becomes
+        min(start + failures, 3), where start is 0 if the batch contained a positive
+        feedback (failures = did_not_work after the last one) or the current count
+        otherwise. Returns the doc BEFORE the update - the caller knows the delta.
+        """
+        start = 0 if reset else {"$ifNull": ["$failedFeedbackCount", 0]}
+        before = await teacher_collection.find_one_and_update(
+            {"teacher_id": teacher_id},
+            [{"$set": {"failedFeedbackCount": {"$min": [{"$add": [start, failures]}, 3]}}}],
+            return_document=ReturnDocument.BEFORE
+        )
+        teacher_cache.invalidate(teacher_id)  # new count only known to the caller
+        return before
@@ -0,0 +1,176 @@
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, lower = served first
+VOICE = 0        # interactive voice turns (STT, chat started from the mic)
+TEXT = 1         # typed chat
+BACKGROUND = 2   # summaries and other work nobody is waiting on
+
+CLASS_NAMES = {VOICE: "voice", TEXT: "text", BACKGROUND: "background"}
+
+class AdmissionRejected(Exception):
+    """Shed instead of queued. status_code is 429 (this teacher) or 503 (whole worker)."""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Gate in front of LLM / STT work in this worker.
+
+    - Per-teacher token buckets (rate_per_min, burst): one school hammering the API gets
+      429s for its own teachers instead of tripping Groq's rate limit for everyone.
+    - A global cap on concurrent calls. Over the cap, callers wait in a priority queue
+      (voice before text); past queue_size waiters or max_wait_s they get a 503.
+    - Background work never queues and may not use the last background_reserve slots,
+      so it can't hold up an interactive turn.
+    """
+
+    def __init__(self, enabled: bool, max_concurrency: int, queue_size: int, max_wait_s: float,
+                 background_reserve: int, rate_per_min: float, burst: int, max_teachers: int = 10000):
+        self.enabled = enabled
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_size = queue_size
+        self.max_wait_s = max_wait_s
+        self.background_reserve = min(background_reserve, self.max_concurrency - 1)
+        self.rate = rate_per_min / 60
+        self.burst = burst
+        self.max_teachers = max_teachers
+        self._buckets = OrderedDict()  # teacher_id -> [tokens, updated_at], least recently seen first
+        self._in_flight = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._avg_hold_s = 2.0  # EWMA of how long a slot is held, for Retry-After
+        self.counters = {"admitted": 0, "rate_limited": 0, "queue_full": 0, "timeouts": 0, "shed_background": 0}
+
+    # -- per-teacher token buckets --
+
+    def _take_token(self, teacher_id: str) -> float:
+        """0 if a token was taken, else seconds until the next one."""
+        now = time.monotonic()
+        bucket = self._buckets.get(teacher_id)
+        if bucket is None:
+            bucket = self._buckets[teacher_id] = [float(self.burst), now]
+            if len(self._buckets) > self.max_teachers:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(teacher_id)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate if self.rate > 0 else 60.0
+
+    # -- global slots --
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._avg_hold_s * (len(self._waiters) + 1) / self.max_concurrency))
+
+    def _reject(self, outcome: str, priority: int, message: str, status_code: int, retry_after: int):
+        self.counters[outcome] += 1
+        metrics.inc("flashcoach_admission_total", outcome=outcome, priority=CLASS_NAMES[priority])
+        raise AdmissionRejected(message, status_code, retry_after)
+
+    async def _acquire_slot(self, priority: int):
+        if priority == BACKGROUND:
+            if self._in_flight >= self.max_concurrency - self.background_reserve or self._waiters:
+                self._reject("shed_background", priority, "Busy, background work skipped", 503, self._retry_after())
+            self._in_flight += 1
+            return
+        if self._in_flight < self.max_concurrency and not self._waiters:
+            self._in_flight += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            self._reject("queue_full", priority, "The coach is very busy right now, please retry shortly", 503, self._retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._update_gauges()
+        try:
+            # _release hands the slot over by resolving the future; _in_flight stays the same
+            await asyncio.wait_for(future, self.max_wait_s)
+        except asyncio.TimeoutError:
+            self._reject("timeouts", priority, "The coach is very busy right now, please retry shortly", 503, self._retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # got the slot just as the client went away
+            raise
+        finally:
+            if not future.done() or future.cancelled():
+                # Timed out / cancelled: drop the entry so it doesn't count against queue_size
+                self._waiters = [w for w in self._waiters if w[2] is not future]
+                heapq.heapify(self._waiters)
+            self._update_gauges()
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                self._update_gauges()
+                return
+        self._in_flight -= 1
+        self._update_gauges()
+
+    def _update_gauges(self):
+        metrics.set_gauge("flashcoach_admission_in_flight", self._in_flight)
+        metrics.set_gauge("flashcoach_admission_queue_depth", len(self._waiters))
+
+    @asynccontextmanager
+    async def admit(self, priority: int, teacher_id: str = None):
+        """Holds one slot for the body. Raises AdmissionRejected when shedding."""
+        if not self.enabled:
+            yield
+            return
+        if teacher_id and priority != BACKGROUND:
+            wait = self._take_token(teacher_id)
+            if wait:
+                self._reject("rate_limited", priority, "Too many requests, please slow down", 429, max(1, math.ceil(wait)))
+
+        started = time.perf_counter()
+        try:
+            await self._acquire_slot(priority)
+        except AdmissionRejected:
+            bucket = self._buckets.get(teacher_id) if priority != BACKGROUND else None
+            if bucket is not None:
+                bucket[0] = min(self.burst, bucket[0] + 1)  # not their fault - give the token back
+            raise
+        admitted = time.perf_counter()
+        metrics.observe("flashcoach_admission_wait_seconds", admitted - started, priority=CLASS_NAMES[priority])
+        self.counters["admitted"] += 1
+        metrics.inc("flashcoach_admission_total", outcome="admitted", priority=CLASS_NAMES[priority])
+        self._update_gauges()
+        try:
+            yield
+        finally:
+            self._avg_hold_s = 0.9 * self._avg_hold_s + 0.1 * (time.perf_counter() - admitted)
+            self._release()
+
+    def stats(self) -> dict:
+        return {**self.counters, "enabled": self.enabled, "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency, "queued": len(self._waiters),
+                "teachers_tracked": len(self._buckets), "avg_hold_seconds": round(self._avg_hold_s, 3)}
+
+admission = AdmissionController(
+    enabled=settings.ADMISSION_ENABLED,
+    max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    max_wait_s=settings.ADMISSION_MAX_WAIT_S,
+    background_reserve=settings.ADMISSION_BACKGROUND_RESERVE,
+    rate_per_min=settings.ADMISSION_TEACHER_RATE_PER_MIN,
+    burst=settings.ADMISSION_TEACHER_BURST,
+)
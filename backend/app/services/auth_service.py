@@ -2,21 +2,28 @@
 from app.repositories.teacher_repo import TeacherRepository
 from app.utils.two_fa_confirmation import verify_otp, generate_secret # Will create this helper or inline it?
 # Original code had two_fa_confirmation.py. I'll duplicate logic or better inline it since it's small service logic.
-import bcrypt
+from app.services.password_hasher import password_hasher
+import asyncio
+import logging
 import pyotp
 from datetime import datetime
 from bson import ObjectId
 
+logger = logging.getLogger(__name__)
+
+# Keeps background rehash tasks referenced until they finish
+_background = set()
+
 class AuthService:
     @staticmethod
-    def signup(teacher_name, teacher_mail, password, crp_name, crp_mail):
+    async def signup(teacher_name, teacher_mail, password, crp_name, crp_mail):
         # Check if user exists
-        if TeacherRepository.get_by_email(teacher_mail):
+        if await TeacherRepository.get_by_email(teacher_mail):
              # Handled by exception or return None
              raise ValueError("Email already registered")
 
-        # Hash password
-        hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        # Hash password (CPU-bound, runs in the auth process pool)
+        hashed = await password_hasher.hash(password)
         
         # Generate OTP Secret
         otp_secret = pyotp.random_base32() # Logic from generate_secret
@@ -25,7 +32,7 @@ class AuthService:
             "teacher_id": str(ObjectId()), 
             "teacher_name": teacher_name,
             "teacher_mail": teacher_mail,
-            "passwordHash": hashed.decode('utf-8'),
+            "passwordHash": hashed,
             "crp_name": crp_name,
             "crp_mail": crp_mail,
             "otp_secret": otp_secret, 
@@ -34,7 +41,7 @@ class AuthService:
             "lastLogin": None
         }
         
-        TeacherRepository.create_teacher(teacher_doc)
+        await TeacherRepository.create_teacher(teacher_doc)
         
         return {
             "teacher_id": teacher_doc["teacher_id"],
@@ -43,14 +50,14 @@ class AuthService:
         }
 
     @staticmethod
-    def login(email, password, otp):
-        teacher = TeacherRepository.get_by_email(email)
+    async def login(email, password, otp):
+        teacher = await TeacherRepository.get_by_email(email)
         
         if not teacher:
             raise ValueError("Invalid credentials")
             
         # Verify Password
-        if not bcrypt.checkpw(password.encode('utf-8'), teacher["passwordHash"].encode('utf-8')):
+        if not await password_hasher.verify(password, teacher["passwordHash"]):
             raise ValueError("Invalid credentials")
             
         # Verify OTP
@@ -63,9 +70,24 @@ class AuthService:
              raise ValueError("Invalid OTP")
             
         # Success
-        TeacherRepository.update_last_login(teacher["teacher_id"])
+        await TeacherRepository.update_last_login(teacher["teacher_id"])
+        if password_hasher.needs_rehash(teacher["passwordHash"]):
+            # BCRYPT_ROUNDS changed since this hash was made - upgrade it while we have the password
+            task = asyncio.create_task(AuthService._rehash(teacher["teacher_id"], password))
+            _background.add(task)
+            task.add_done_callback(_background.discard)
         
         return {
             "teacher_id": teacher["teacher_id"],
             "name": teacher["teacher_name"]
         }
+
+    @staticmethod
+    async def _rehash(teacher_id, password):
+        if not password_hasher.has_idle_worker():
+            return  # busy - the next login will try again
+        try:
+            await TeacherRepository.update_password_hash(teacher_id, await password_hasher.hash(password))
+            logger.info(f"Password hash upgraded to {password_hasher.rounds} rounds for teacher {teacher_id}")
+        except Exception as e:
+            logger.warning(f"Password rehash failed for teacher {teacher_id}: {e}")
@@ -1,59 +1,135 @@
 
-from app.repositories.interaction_repo import InteractionRepository
-from app.utils.audio_utils import translate_text
+from app.repositories.history_writer import history_writer
+from app.services.translation_service import translation_service
+from app.utils.json_stream import SpeechFlowParser
+from app.services.response_cache import response_cache
+from app.services.context_builder import ContextBuilder
+from app.services.llm_client import llm_client, CircuitOpenError
+from app.services.admission import admission, TEXT, VOICE
 from app.core.config import settings
+from app.core.metrics import metrics, span, record_token_usage
+from app.utils.logger import bind_context
+from app.utils.single_flight import SingleFlight, flight_key
+from app.utils.audio_preprocess import prepare_for_stt, split_at_silence, stitch_transcripts, encode_for_upload
+from fastapi.concurrency import run_in_threadpool
+from contextlib import aclosing
 from datetime import datetime
+import asyncio
 import uuid
 import json
 import logging
-import traceback
-from openai import OpenAI
 from fastapi import UploadFile
 
-# Initialize OpenAI Client (Groq)
-client = OpenAI(
-    api_key=settings.GROQ_API_KEY,
-    base_url="https://api.groq.com/openai/v1"
-)
+logger = logging.getLogger(__name__)
+
+CHAT_MODEL = "llama-3.3-70b-versatile"
+CHAT_TEMPERATURE = 0.7
+CHAT_MAX_TOKENS = 1000
+# Everything besides the query/language that changes the answer - part of the cache key
+CHAT_PARAMS = {"model": CHAT_MODEL, "temperature": CHAT_TEMPERATURE, "max_tokens": CHAT_MAX_TOKENS}
+
+llm_flight = SingleFlight("llm", enabled=settings.SINGLE_FLIGHT_ENABLED)
+
+def fallback_response(error) -> str:
+    return json.dumps({"error": str(error), "speech_flow": {"intro": "I'm having trouble connecting.", "main_advice": [], "closing": "Please try again."}})
+
+def partial_response(heard: dict, error) -> str:
+    """
+    The speech_flow parts a stream actually delivered before it broke, marked truncated,
+    so history shows what the teacher heard. Nothing delivered = the usual fallback.
+    """
+    if not (heard["intro"] or heard["main_advice"] or heard["closing"]):
+        return fallback_response(error)
+    return json.dumps({"speech_flow": heard, "truncated": True, "error": str(error)}, ensure_ascii=False)
+
+# Stores that must outlive a disconnected client (the loop only keeps weak refs to tasks)
+_store_tasks = set()
 
 class CoachingService:
     @staticmethod
-    def process_chat(teacher_id, message, session_id, user_lang):
-        try:
-            # Translate to English for AI if needed
-            english_query = message
-            if user_lang != 'en':
-                english_query = translate_text(message, 'en', user_lang)
-
-            # 1. Store User Message
-            user_msg = {
-                "message_id": str(uuid.uuid4()),
-                "sender": "user",
-                "message": message,
-                "timestamp": datetime.now()
-            }
+    async def _start_turn(teacher_id, message, session_id, user_lang):
+        bind_context(teacher_id=teacher_id, session_id=session_id)
+        # Translate to English for AI if needed (already-English text is detected and skipped)
+        english_query = message
+        if user_lang != 'en':
+            with span("chat.translate"):
+                english_query = await translation_service.translate_async(message, 'en', user_lang)
 
-            current_session_id = session_id or str(uuid.uuid4())
+        # 1. Store User Message
+        user_msg = {
+            "message_id": str(uuid.uuid4()),
+            "sender": "user",
+            "message": message,
+            "timestamp": datetime.now()
+        }
 
-            InteractionRepository.create_or_update_session(teacher_id, current_session_id, user_msg)
+        current_session_id = session_id or str(uuid.uuid4())
+        bind_context(session_id=current_session_id)
 
-            # 2. Generate AI Response (Groq)
-            final_response = CoachingService.get_ai_response(
-                english_query, 
-                teacher_id=teacher_id, 
-                session_id=current_session_id, 
-                user_lang=user_lang
-            )
+        with span("chat.store_user"):
+            await history_writer.append(teacher_id, current_session_id, user_msg)
 
-            ai_msg = {
-                "message_id": str(uuid.uuid4()),
-                "sender": "ai",
-                "message": final_response,
-                "timestamp": datetime.now(),
-                "feedback_status": None
-            }
-            
-            InteractionRepository.create_or_update_session(teacher_id, current_session_id, ai_msg)
+        # Earlier turns of this session (budgeted + rolling summary); a new session has none
+        context = []
+        if session_id:
+            try:
+                with span("chat.context"):
+                    context = await ContextBuilder.build(teacher_id, session_id, exclude_message_id=user_msg["message_id"])
+            except Exception as e:
+                logger.warning(f"Context build failed, answering without history: {e}")
+        return english_query, current_session_id, context
+
+    @staticmethod
+    async def _store_ai_message(teacher_id, session_id, response, message_id=None):
+        ai_msg = {
+            "message_id": message_id or str(uuid.uuid4()),
+            "sender": "ai",
+            "message": response,
+            "timestamp": datetime.now(),
+            "feedback_status": None
+        }
+
+        await history_writer.append(teacher_id, session_id, ai_msg)
+        return ai_msg
+
+    @staticmethod
+    async def _store_ai_message_shielded(teacher_id, session_id, response, message_id):
+        # Own task + shield: a cancelled / closed stream can't interrupt the write half-way
+        task = asyncio.ensure_future(CoachingService._store_ai_message(teacher_id, session_id, response, message_id=message_id))
+        _store_tasks.add(task)
+        task.add_done_callback(_store_tasks.discard)
+        await asyncio.shield(task)
+
+    @staticmethod
+    async def process_chat(teacher_id, message, session_id, user_lang, use_cache=True, priority=TEXT):
+        # Admitted before anything is stored, so a shed turn leaves no half-written history behind
+        async with admission.admit(priority, teacher_id):
+            return await CoachingService._chat_turn(teacher_id, message, session_id, user_lang, use_cache)
+
+    @staticmethod
+    async def _chat_turn(teacher_id, message, session_id, user_lang, use_cache):
+        try:
+            english_query, current_session_id, context = await CoachingService._start_turn(teacher_id, message, session_id, user_lang)
+
+            # 2. Generate AI Response - cache first, Groq only on a miss.
+            # Follow-ups depend on the conversation, so only context-free turns are cacheable.
+            use_cache = use_cache and not context
+            with span("chat.cache"):
+                final_response = await response_cache.get(english_query, user_lang, CHAT_PARAMS, bypass=not use_cache)
+            if final_response is None:
+                with span("chat.llm"):
+                    final_response = await CoachingService.get_ai_response(
+                        english_query,
+                        teacher_id=teacher_id, 
+                        session_id=current_session_id, 
+                        user_lang=user_lang,
+                        context=context
+                    )
+                if use_cache:
+                    await response_cache.put(english_query, user_lang, CHAT_PARAMS, final_response)
+
+            with span("chat.store_ai"):
+                ai_msg = await CoachingService._store_ai_message(teacher_id, current_session_id, final_response)
 
             return {
                 "response": final_response, 
@@ -62,165 +138,321 @@ class CoachingService:
             }
 
         except Exception as e:
-            logging.error(f"Error in process_chat: {str(e)}")
-            logging.error(traceback.format_exc())
+            logger.exception(f"Error in process_chat: {str(e)}")
             raise e
 
     @staticmethod
-    def get_ai_response(message: str, teacher_id: str = None, session_id: str = None, user_lang: str = "English") -> str:
+    async def process_chat_stream(teacher_id, message, session_id, user_lang, use_cache=True, priority=TEXT):
         """
-        Generates a response using the strict system prompt.
-        Returns a JSON string.
+        Streaming twin of process_chat. Async generator of (event, data) pairs:
+        session -> intro -> main_advice* -> closing -> done (plus error on LLM failure).
+        The AI message is persisted once the completion has finished. The admission
+        slot is held until the stream ends; AdmissionRejected comes out of the first step.
         """
+        async with admission.admit(priority, teacher_id):
+            async for event in CoachingService._chat_turn_stream(teacher_id, message, session_id, user_lang, use_cache):
+                yield event
+
+    @staticmethod
+    async def _chat_turn_stream(teacher_id, message, session_id, user_lang, use_cache):
+        english_query, current_session_id, context = await CoachingService._start_turn(teacher_id, message, session_id, user_lang)
+        use_cache = use_cache and not context
+        ai_message_id = str(uuid.uuid4())
+        yield "session", {"session_id": current_session_id, "ai_message_id": ai_message_id}
+
+        cached = await response_cache.get(english_query, user_lang, CHAT_PARAMS, bypass=not use_cache)
+        if cached is not None:
+            # Whole answer is known up front, so store it before a disconnect can get in the way,
+            # then replay it through the parser so clients see the same events
+            await CoachingService._store_ai_message_shielded(teacher_id, current_session_id, cached, ai_message_id)
+            for event in SpeechFlowParser().feed(cached):
+                yield event
+            yield "done", {"response": cached, "session_id": current_session_id, "ai_message_id": ai_message_id}
+            return
+
+        parser = SpeechFlowParser()
+        heard = {"intro": None, "main_advice": [], "closing": None}  # what the client has been sent
+        final_response, stored = None, False
         try:
-            # Map some common codes to full names if needed
-            lang_map = {
-                "EN": "English", "HI": "Hindi", "BN": "Bengali", "TE": "Telugu", 
-                "MR": "Marathi", "TA": "Tamil", "GU": "Gujarati", "KN": "Kannada", "ML": "Malayalam"
+            try:
+                # Groq's JSON mode can't be combined with stream=True; the system prompt already forces JSON
+                stream = await llm_client.chat_stream(
+                    model=CHAT_MODEL,
+                    messages=CoachingService.build_messages(english_query, user_lang, context),
+                    temperature=CHAT_TEMPERATURE,
+                    max_tokens=CHAT_MAX_TOKENS
+                )
+                async with aclosing(stream):  # disconnect = hang up on the provider now, not at GC
+                    async for chunk in stream:
+                        # Groq reports usage on the last chunk under x_groq
+                        usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+                        if usage:
+                            record_token_usage(usage, CHAT_MODEL)
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            for name, data in parser.feed(delta):
+                                if name == "main_advice":
+                                    heard["main_advice"].append(data)
+                                else:
+                                    heard[name] = data
+                                yield name, data
+                json.loads(parser.buffer)  # never persist a truncated / invalid document
+                final_response = parser.buffer
+                if use_cache:
+                    await response_cache.put(english_query, user_lang, CHAT_PARAMS, final_response)
+            except Exception as e:
+                logger.exception(f"AI Streaming Error (Groq): {e}")
+                final_response = partial_response(heard, e)
+                yield "error", {"detail": str(e)}
+
+            stored = True
+            await CoachingService._store_ai_message_shielded(teacher_id, current_session_id, final_response, ai_message_id)
+            yield "done", {
+                "response": final_response,
+                "session_id": current_session_id,
+                "ai_message_id": ai_message_id
             }
-            full_lang = lang_map.get(user_lang.upper(), user_lang)
-
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        f"You are an AI-powered teaching coach integrated into a multilingual, voice-enabled application.\n"
-                        f"Target Language: {full_lang}\n\n"
-                        "CRITICAL MULTI-LANGUAGE RULE (ABSOLUTE):\n"
-                        "- ALL JSON KEYS MUST ALWAYS REMAIN IN ENGLISH.\n"
-                        "- NEVER translate, rename, or localize JSON keys.\n"
-                        "- ONLY translate human-readable TEXT VALUES.\n"
-                        "- If this rule is violated, the system will fail.\n\n"
-                        # ... (truncated for brevity, assuming standard prompt logic here. 
-                        # Ideally I should copy the FULL prompt text to preserve logic "EXACTLY")
-                        # I will insert the full prompt below to be compliant with "PRESERVE ORIGINAL LOGIC VERBATIM"
-                        "EXAMPLES:\n"
-                        "- CORRECT:\n"
-                        "  \"voice_mode\": true\n"
-                        "  \"intro\": \"తెలుగులో మాట్లాడే వాక్యం\"\n\n"
-                        "- INCORRECT:\n"
-                        "  \"వాయిస్_మోడ్\": true\n"
-                        "  \"స్పీచ్_ఫ్లో\": { ... }\n\n"
-                        "SYSTEM CONTEXT:\n"
-                        "- User language may be English or any regional language.\n"
-                        "- Text values must be generated in the user’s language.\n"
-                        "- Schema keys must remain EXACTLY as defined below.\n\n"
-                        "STRICT OUTPUT RULES (MANDATORY):\n"
-                        "1. Respond ONLY with valid JSON.\n"
-                        "2. Do NOT include markdown, comments, or explanations.\n"
-                        "3. Do NOT translate JSON keys under any circumstance.\n"
-                        "4. Use short, spoken-friendly sentences.\n"
-                        "5. Do NOT exceed 3 advice steps.\n"
-                        "6. Ask only ONE feedback question.\n\n"
-                        "MANDATORY OUTPUT SCHEMA (KEYS MUST MATCH EXACTLY):\n"
-                        "{\n"
-                        "  \"voice_mode\": true,\n"
-                        "  \"speech_flow\": {\n"
-                        "    \"intro\": \"Localized spoken introduction\",\n"
-                        "    \"main_advice\": [\n"
-                        "      {\n"
-                        "        \"step\": 1,\n"
-                        "        \"title\": \"Localized short title\",\n"
-                        "        \"spoken_text\": \"Localized spoken explanation\"\n"
-                        "      }\n"
-                        "    ],\n"
-                        "    \"closing\": \"Localized encouraging closing sentence\"\n"
-                        "  },\n"
-                        "  \"voice_controls\": {\n"
-                        "    \"button_behavior\": {\n"
-                        "      \"first_click\": \"start\",\n"
-                        "      \"second_click\": \"pause\",\n"
-                        "      \"third_click\": \"resume\"\n"
-                        "    },\n"
-                        "    \"can_stop\": true\n"
-                        "  },\n"
-                        "  \"feedback\": {\n"
-                        "    \"feedback_required\": true,\n"
-                        "    \"feedback_storage\": {\n"
-                        "      \"store_feedback_value\": true,\n"
-                        "      \"store_as\": \"string\",\n"
-                        "      \"field_name\": \"feedback_status\",\n"
-                        "      \"allowed_values\": [\n"
-                        "        \"worked\",\n"
-                        "        \"partially_worked\",\n"
-                        "        \"did_not_work\"\n"
-                        "      ]\n"
-                        "    },\n"
-                        "    \"negative_tracking\": {\n"
-                        "      \"track_consecutive_negatives\": true,\n"
-                        "      \"negative_value\": \"did_not_work\",\n"
-                        "      \"threshold\": 3\n"
-                        "    },\n"
-                        "    \"post_escalation_behavior\": {\n"
-                        "      \"notify_mentor\": true,\n"
-                        "      \"reset_negative_count\": true\n"
-                        "    },\n"
-                        "    \"feedback_prompt\": \"Localized feedback question\"\n"
-                        "  },\n"
-                        "  \"notification\": {\n"
-                        "    \"send_notification\": true,\n"
-                        "    \"priority\": \"normal\",\n"
-                        "    \"spoken_notification_text\": \"Localized spoken notification text\"\n"
-                        "  },\n"
-                        "  \"ui_actions\": {\n"
-                        "    \"add_new_chat_button\": true,\n"
-                        "    \"new_chat_behavior\": \"clear_current_context_and_starts_fresh_interaction\"\n"
-                        "  }\n"
-                        "}\n\n"
-                        "TRANSLATION RULES:\n"
-                        "- Translate ONLY the following fields:\n"
-                        "  intro, title, spoken_text, closing, feedback_prompt, spoken_notification_text\n"
-                        "- Do NOT translate:\n"
-                        "  schema keys, allowed_values, enum strings, control words\n\n"
-                        "VOICE & UI GUARANTEES:\n"
-                        "- Voice playback must start automatically on first click.\n"
-                        "- Pause and resume must work consistently.\n"
-                        "- Feedback buttons must appear only once per response.\n"
-                        "- Feedback must remain functional in all languages.\n\n"
-                        "FINAL WARNING:\n"
-                        "If you translate JSON keys, the response is INVALID.\n\n"
-                        "Respond ONLY with JSON following the schema exactly."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": message
-                }
-            ]
-
-            completion = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
+        finally:
+            if not stored:
+                # Client went away mid-stream (aclose / cancel): the session event already
+                # promised ai_message_id, so persist whatever it was sent
+                await CoachingService._store_ai_message_shielded(
+                    teacher_id, current_session_id,
+                    final_response or partial_response(heard, "client disconnected"), ai_message_id
+                )
+
+    @staticmethod
+    def build_messages(message: str, user_lang: str = "English", context: list = None) -> list:
+        """
+        Strict system prompt, earlier turns of the session (if any), then the user's (English) message.
+        """
+        # Map some common codes to full names if needed
+        lang_map = {
+            "EN": "English", "HI": "Hindi", "BN": "Bengali", "TE": "Telugu", 
+            "MR": "Marathi", "TA": "Tamil", "GU": "Gujarati", "KN": "Kannada", "ML": "Malayalam"
+        }
+        full_lang = lang_map.get(user_lang.upper(), user_lang)
+
+        return [
+            {
+                "role": "system",
+                "content": (
+                    f"You are an AI-powered teaching coach integrated into a multilingual, voice-enabled application.\n"
+                    f"Target Language: {full_lang}\n\n"
+                    "CRITICAL MULTI-LANGUAGE RULE (ABSOLUTE):\n"
+                    "- ALL JSON KEYS MUST ALWAYS REMAIN IN ENGLISH.\n"
+                    "- NEVER translate, rename, or localize JSON keys.\n"
+                    "- ONLY translate human-readable TEXT VALUES.\n"
+                    "- If this rule is violated, the system will fail.\n\n"
+                    # ... (truncated for brevity, assuming standard prompt logic here. 
+                    # Ideally I should copy the FULL prompt text to preserve logic "EXACTLY")
+                    # I will insert the full prompt below to be compliant with "PRESERVE ORIGINAL LOGIC VERBATIM"
+                    "EXAMPLES:\n"
+                    "- CORRECT:\n"
+                    "  \"voice_mode\": true\n"
+                    "  \"intro\": \"తెలుగులో మాట్లాడే వాక్యం\"\n\n"
+                    "- INCORRECT:\n"
+                    "  \"వాయిస్_మోడ్\": true\n"
+                    "  \"స్పీచ్_ఫ్లో\": { ... }\n\n"
+                    "SYSTEM CONTEXT:\n"
+                    "- User language may be English or any regional language.\n"
+                    "- Text values must be generated in the user’s language.\n"
+                    "- Schema keys must remain EXACTLY as defined below.\n\n"
+                    "STRICT OUTPUT RULES (MANDATORY):\n"
+                    "1. Respond ONLY with valid JSON.\n"
+                    "2. Do NOT include markdown, comments, or explanations.\n"
+                    "3. Do NOT translate JSON keys under any circumstance.\n"
+                    "4. Use short, spoken-friendly sentences.\n"
+                    "5. Do NOT exceed 3 advice steps.\n"
+                    "6. Ask only ONE feedback question.\n\n"
+                    "MANDATORY OUTPUT SCHEMA (KEYS MUST MATCH EXACTLY):\n"
+                    "{\n"
+                    "  \"voice_mode\": true,\n"
+                    "  \"speech_flow\": {\n"
+                    "    \"intro\": \"Localized spoken introduction\",\n"
+                    "    \"main_advice\": [\n"
+                    "      {\n"
+                    "        \"step\": 1,\n"
+                    "        \"title\": \"Localized short title\",\n"
+                    "        \"spoken_text\": \"Localized spoken explanation\"\n"
+                    "      }\n"
+                    "    ],\n"
+                    "    \"closing\": \"Localized encouraging closing sentence\"\n"
+                    "  },\n"
+                    "  \"voice_controls\": {\n"
+                    "    \"button_behavior\": {\n"
+                    "      \"first_click\": \"start\",\n"
+                    "      \"second_click\": \"pause\",\n"
+                    "      \"third_click\": \"resume\"\n"
+                    "    },\n"
+                    "    \"can_stop\": true\n"
+                    "  },\n"
+                    "  \"feedback\": {\n"
+                    "    \"feedback_required\": true,\n"
+                    "    \"feedback_storage\": {\n"
+                    "      \"store_feedback_value\": true,\n"
+                    "      \"store_as\": \"string\",\n"
+                    "      \"field_name\": \"feedback_status\",\n"
+                    "      \"allowed_values\": [\n"
+                    "        \"worked\",\n"
+                    "        \"partially_worked\",\n"
+                    "        \"did_not_work\"\n"
+                    "      ]\n"
+                    "    },\n"
+                    "    \"negative_tracking\": {\n"
+                    "      \"track_consecutive_negatives\": true,\n"
+                    "      \"negative_value\": \"did_not_work\",\n"
+                    "      \"threshold\": 3\n"
+                    "    },\n"
+                    "    \"post_escalation_behavior\": {\n"
+                    "      \"notify_mentor\": true,\n"
+                    "      \"reset_negative_count\": true\n"
+                    "    },\n"
+                    "    \"feedback_prompt\": \"Localized feedback question\"\n"
+                    "  },\n"
+                    "  \"notification\": {\n"
+                    "    \"send_notification\": true,\n"
+                    "    \"priority\": \"normal\",\n"
+                    "    \"spoken_notification_text\": \"Localized spoken notification text\"\n"
+                    "  },\n"
+                    "  \"ui_actions\": {\n"
+                    "    \"add_new_chat_button\": true,\n"
+                    "    \"new_chat_behavior\": \"clear_current_context_and_starts_fresh_interaction\"\n"
+                    "  }\n"
+                    "}\n\n"
+                    "TRANSLATION RULES:\n"
+                    "- Translate ONLY the following fields:\n"
+                    "  intro, title, spoken_text, closing, feedback_prompt, spoken_notification_text\n"
+                    "- Do NOT translate:\n"
+                    "  schema keys, allowed_values, enum strings, control words\n\n"
+                    "VOICE & UI GUARANTEES:\n"
+                    "- Voice playback must start automatically on first click.\n"
+                    "- Pause and resume must work consistently.\n"
+                    "- Feedback buttons must appear only once per response.\n"
+                    "- Feedback must remain functional in all languages.\n\n"
+                    "FINAL WARNING:\n"
+                    "If you translate JSON keys, the response is INVALID.\n\n"
+                    "Respond ONLY with JSON following the schema exactly."
+                )
+            },
+            *(context or []),
+            {
+                "role": "user",
+                "content": message
+            }
+        ]
+
+    @staticmethod
+    async def get_ai_response(message: str, teacher_id: str = None, session_id: str = None, user_lang: str = "English", context: list = None) -> str:
+        """
+        Generates a response using the strict system prompt.
+        Returns a JSON string. Identical requests already in flight (double taps,
+        a whole training room asking the same thing) share one Groq completion.
+        """
+        key = flight_key(message, user_lang, context or [], CHAT_PARAMS)
+        return await llm_flight.do_async(key, CoachingService._generate, message, user_lang, context)
+
+    @staticmethod
+    async def _generate(message: str, user_lang: str, context: list) -> str:
+        try:
+            messages = CoachingService.build_messages(message, user_lang, context)
+
+            completion = await llm_client.chat(
+                model=CHAT_MODEL,
                 messages=messages,
-                temperature=0.7,
-                max_tokens=1000,
+                temperature=CHAT_TEMPERATURE,
+                max_tokens=CHAT_MAX_TOKENS,
                 response_format={"type": "json_object"}
             )
 
             return completion.choices[0].message.content
 
+        except CircuitOpenError as e:
+            # Groq is known to be down - answer immediately instead of waiting on it
+            logger.warning(f"AI Generation skipped: {e}")
+            return fallback_response(e)
         except Exception as e:
-            logging.error(f"AI Generation Error (Groq): {e}")
-            logging.error(traceback.format_exc())
-            print(f"CRITICAL AI ERROR: {e}")
-            return json.dumps({"error": str(e), "speech_flow": {"intro": "I'm having trouble connecting.", "main_advice": [], "closing": "Please try again."}})
+            logger.exception(f"AI Generation Error (Groq): {e}")
+            return fallback_response(e)
 
     @staticmethod
-    async def transcribe_audio(file: UploadFile):
+    async def transcribe_audio(file: UploadFile, teacher_id: str = None):
         """
         Transcribes audio using Groq Whisper.
         """
+        async with admission.admit(VOICE, teacher_id):
+            return await CoachingService._transcribe(file)
+
+    @staticmethod
+    async def _transcribe(file: UploadFile):
         try:
-            content = await file.read()
+            with span("stt.read"):
+                content = await file.read()
             filename = file.filename or "audio.wav"
+
+            # Trim silence / downsample before upload; a clip with no speech never reaches Whisper
+            if settings.STT_PREPROCESS:
+                with span("stt.preprocess"):
+                    prepared = await run_in_threadpool(
+                        prepare_for_stt, content, filename,
+                        margin_db=settings.STT_VAD_MARGIN_DB,
+                        floor_db=settings.STT_VAD_FLOOR_DB,
+                        min_speech_ms=settings.STT_MIN_SPEECH_MS
+                    )
+                if prepared is None:
+                    metrics.inc("flashcoach_stt_preprocess_total", outcome="passthrough")
+                elif not prepared.has_speech:
+                    metrics.inc("flashcoach_stt_preprocess_total", outcome="silent")
+                    return ""
+                elif prepared.output_seconds > settings.STT_LONG_AUDIO_S:
+                    metrics.inc("flashcoach_stt_preprocess_total", outcome="trimmed")
+                    metrics.inc("flashcoach_stt_trimmed_seconds_total", prepared.input_seconds - prepared.output_seconds)
+                    with span("stt.transcribe"):
+                        return await CoachingService._transcribe_windows(prepared.samples)
+                elif prepared.reencoded:
+                    metrics.inc("flashcoach_stt_preprocess_total", outcome="trimmed")
+                    metrics.inc("flashcoach_stt_trimmed_seconds_total", prepared.input_seconds - prepared.output_seconds)
+                    content, filename = prepared.audio, prepared.filename
+                else:
+                    # Trimming wouldn't make the upload smaller - original goes as-is
+                    metrics.inc("flashcoach_stt_preprocess_total", outcome="passthrough")
+            metrics.inc("flashcoach_stt_upload_bytes_total", len(content))
             audio_file = (filename, content)
             
-            transcription = client.audio.transcriptions.create(
-                file=audio_file,
-                model="whisper-large-v3",
-                response_format="json"
-            )
+            with span("stt.transcribe"):
+                transcription = await llm_client.transcribe(
+                    file=audio_file,
+                    model="whisper-large-v3",
+                    response_format="json"
+                )
             return transcription.text
         except Exception as e:
-            print(f"Transcription Error: {e}")
-            logging.error(f"Transcription Error: {e}")
+            logger.error(f"Transcription Error: {e}")
             raise e
+
+    @staticmethod
+    async def _transcribe_windows(samples) -> str:
+        """
+        Long recordings: split at pauses into overlapping windows, transcribe them
+        concurrently (at most STT_WINDOW_CONCURRENCY at once), then stitch the text.
+        Latency is roughly one window's instead of growing with the recording.
+        """
+        ranges = split_at_silence(samples, settings.STT_WINDOW_S, settings.STT_WINDOW_OVERLAP_S)
+        limit = asyncio.Semaphore(settings.STT_WINDOW_CONCURRENCY)
+
+        async def transcribe_window(index, start, end):
+            async with limit:
+                audio, name = await run_in_threadpool(encode_for_upload, samples[start:end])
+                metrics.inc("flashcoach_stt_upload_bytes_total", len(audio))
+                transcription = await llm_client.transcribe(
+                    file=(f"window-{index}-{name}", audio),
+                    model="whisper-large-v3",
+                    response_format="json"
+                )
+                return transcription.text
+
+        metrics.inc("flashcoach_stt_windows_total", len(ranges))
+        texts = await asyncio.gather(*(transcribe_window(i, start, end) for i, (start, end) in enumerate(ranges)))
+        return stitch_transcripts(texts)
@@ -0,0 +1,144 @@
+
+from app.repositories.interaction_repo import InteractionRepository
+from app.core.config import settings
+from app.services.llm_client import llm_client
+from app.services.admission import admission, AdmissionRejected, BACKGROUND
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+def estimate_tokens(text: str) -> int:
+    # ~4 chars per token for English; good enough for budgeting without a tokenizer
+    return len(text) // 4 + 1
+
+def compact_turn(msg: dict) -> str:
+    """AI turns are stored as the full voice JSON - only the spoken text matters as context."""
+    text = msg.get("message") or ""
+    if msg.get("sender") != "ai":
+        return text
+    try:
+        flow = json.loads(text).get("speech_flow", {})
+    except (ValueError, AttributeError):
+        return text
+    parts = [flow.get("intro", "")]
+    for step in flow.get("main_advice", []) or []:
+        parts.append(f"{step.get('title', '')}: {step.get('spoken_text', '')}")
+    parts.append(flow.get("closing", ""))
+    return " ".join(p for p in parts if p)
+
+# Most turns folded into the summary per refresh; long backlogs catch up over several turns
+FOLD_BATCH = 40
+
+class ContextBuilder:
+    """
+    Builds the conversation context for a chat turn within CONTEXT_TOKEN_BUDGET:
+    the most recent turns verbatim (newest first until the budget runs out),
+    plus a rolling summary of everything older, stored on the session document.
+    """
+
+    _refreshing = set()      # (teacher_id, session_id) with a summary refresh in flight
+    _tasks = set()           # keep references so background tasks aren't garbage collected
+
+    @staticmethod
+    async def build(teacher_id: str, session_id: str, exclude_message_id: str = None) -> list:
+        if not session_id:
+            return []
+        session, recent = await asyncio.gather(
+            InteractionRepository.get_session(teacher_id, session_id, {"summary": 1, "summary_until": 1}),
+            InteractionRepository.find_messages(
+                # +2: the current user message (excluded) and one extra to detect older turns
+                teacher_id, session_id, limit=settings.CONTEXT_MAX_TURNS + 2,
+                projection={"_id": 0, "message_id": 1, "sender": 1, "message": 1, "timestamp": 1}
+            ).to_list(None)
+        )
+        if not session:
+            return []
+
+        summary = session.get("summary")
+        summary_until = session.get("summary_until")
+        budget = settings.CONTEXT_TOKEN_BUDGET - (estimate_tokens(summary) if summary else 0)
+
+        window = []  # newest first
+        fold_until = None
+        for msg in recent:
+            if msg.get("message_id") == exclude_message_id:
+                continue
+            if summary_until and msg.get("timestamp") and msg["timestamp"] <= summary_until:
+                break  # already folded into the summary
+            text = compact_turn(msg)
+            cost = estimate_tokens(text)
+            if len(window) >= settings.CONTEXT_MAX_TURNS or cost > budget:
+                fold_until = msg.get("timestamp")
+                break
+            budget -= cost
+            window.append({"role": "assistant" if msg.get("sender") == "ai" else "user", "content": text})
+
+        # Turns that fell out of the window and aren't in the summary yet get folded in
+        # the background, so the next turn has them without paying for it now.
+        if fold_until:
+            ContextBuilder.schedule_summary_refresh(teacher_id, session_id, summary, summary_until, fold_until)
+
+        context = []
+        if summary:
+            context.append({"role": "system", "content": f"Summary of the earlier conversation in this session: {summary}"})
+        context.extend(reversed(window))
+        return context
+
+    @staticmethod
+    def schedule_summary_refresh(teacher_id, session_id, summary, summary_until, fold_until):
+        key = (teacher_id, session_id)
+        if key in ContextBuilder._refreshing:
+            return
+        ContextBuilder._refreshing.add(key)
+        task = asyncio.create_task(
+            ContextBuilder._refresh_summary(teacher_id, session_id, summary, summary_until, fold_until)
+        )
+        ContextBuilder._tasks.add(task)
+        task.add_done_callback(ContextBuilder._tasks.discard)
+        task.add_done_callback(lambda _: ContextBuilder._refreshing.discard(key))
+
+    @staticmethod
+    async def _refresh_summary(teacher_id, session_id, summary, summary_until, fold_until):
+        try:
+            turns = await InteractionRepository.find_messages_between(
+                teacher_id, session_id, after=summary_until, until=fold_until,
+                projection={"_id": 0, "sender": 1, "message": 1, "timestamp": 1}
+            ).limit(FOLD_BATCH).to_list(None)
+            if not turns:
+                return
+            transcript = "\n".join(
+                f"{'Coach' if t.get('sender') == 'ai' else 'Teacher'}: {compact_turn(t)}" for t in turns
+            )
+            # Lowest priority: skipped outright when interactive turns need the capacity
+            async with admission.admit(BACKGROUND):
+                new_summary = await ContextBuilder._summarize(summary, transcript)
+            if new_summary:
+                await InteractionRepository.update_session_summary(
+                    teacher_id, session_id, new_summary, turns[-1]["timestamp"], previous_until=summary_until
+                )
+        except AdmissionRejected:
+            logger.info(f"Summary refresh for session {session_id} deferred (busy)")  # next turn retries
+        except Exception as e:
+            logger.warning(f"Summary refresh failed for session {session_id}: {e}")
+
+    @staticmethod
+    async def _summarize(previous: str, transcript: str) -> str:
+        completion = await llm_client.chat(
+            model=settings.SUMMARY_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You maintain a running summary of a conversation between a teacher and a teaching coach. "
+                        "Merge the existing summary with the new turns. Keep the teacher's classroom situation, "
+                        "what was already suggested and how it went. Plain English, at most 120 words."
+                    )
+                },
+                {"role": "user", "content": f"Existing summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"}
+            ],
+            temperature=0.2,
+            max_tokens=settings.SUMMARY_MAX_TOKENS
+        )
+        return (completion.choices[0].message.content or "").strip()
@@ -0,0 +1,168 @@
+
+from app.repositories.email_outbox_repo import EmailOutboxRepository
+from app.repositories.teacher_repo import TeacherRepository
+from app.utils.send_email import SMTPSender, send_escalation_email
+from app.core.config import settings
+from app.core.metrics import metrics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import random
+import smtplib
+
+logger = logging.getLogger(__name__)
+
+# The server rejected the addresses themselves - retrying won't change its mind
+PERMANENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)
+
+class EmailOutboxWorker:
+    """
+    Delivers escalation emails queued in the email_outbox collection.
+
+    /feedback only enqueues (one Mongo insert); this task claims due mails one at a time,
+    sends them over a single reused SMTP connection (on one dedicated thread, since
+    smtplib blocks), and on success resets the teacher's failure counter. Failures are
+    retried with jittered exponential backoff and dead-lettered after EMAIL_MAX_ATTEMPTS.
+    Mails survive restarts, and a mail claimed by a worker that died is re-claimed once
+    its lease expires.
+    """
+
+    KIND_ESCALATION = "escalation"
+
+    def __init__(self, poll_s: float, max_attempts: int, backoff_base_s: float, backoff_max_s: float,
+                 lease_s: float, smtp_idle_s: float):
+        self.poll_s = poll_s
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.lease_s = lease_s
+        self.smtp_idle_s = smtp_idle_s
+        self._task = None
+        self._wake = None
+        self._executor = None
+        self._sender = None
+        self.counters = {"queued": 0, "duplicates": 0, "sent": 0, "retries": 0, "dead": 0, "reset_failures": 0}
+
+    async def start(self):
+        if self._task:
+            return
+        self._wake = asyncio.Event()
+        # One thread = one SMTP connection, and SMTPSender isn't thread-safe anyway
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smtp")
+        self._sender = SMTPSender(settings.SMTP_SERVER, settings.EMAIL_SENDER, settings.EMAIL_PASSWORD,
+                                  timeout=settings.EMAIL_SMTP_TIMEOUT_S)
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Email outbox worker started (poll={self.poll_s}s, max_attempts={self.max_attempts})")
+
+    async def stop(self):
+        if not self._task:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        # Whatever is still pending stays in Mongo for the next start
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._sender.close)
+        self._executor.shutdown(wait=True)
+
+    async def enqueue_escalation(self, teacher_id: str, teacher: dict, session_id: str) -> str:
+        """Returns "queued", or "already_queued" if this teacher's escalation is still undelivered."""
+        payload = {
+            "teacher_id": teacher_id,
+            "teacher_name": teacher.get("teacher_name", "Unknown"),
+            "teacher_email": teacher.get("teacher_mail", ""),
+            "issue_summary": f"User reported 'did_not_work' with 3 continuous failures. Session: {session_id}",
+            "recipient_email": teacher.get("crp_mail"),
+        }
+        mail_id = await EmailOutboxRepository.enqueue(self.KIND_ESCALATION, teacher_id, payload)
+        if mail_id is None:
+            self.counters["duplicates"] += 1
+            return "already_queued"
+        self.counters["queued"] += 1
+        metrics.inc("flashcoach_email_outbox_total", outcome="queued")
+        if self._wake:
+            self._wake.set()
+        return "queued"
+
+    def backoff(self, attempts: int) -> float:
+        # Full jitter, so mails that failed together don't retry together
+        return random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** (attempts - 1)))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                while (mail := await EmailOutboxRepository.claim_next(self.lease_s)) is not None:
+                    await self._deliver(mail)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Mongo hiccup - try again next poll
+                logger.warning(f"Email outbox poll failed: {e}")
+
+            await loop.run_in_executor(self._executor, self._sender.close_if_idle, self.smtp_idle_s)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_s)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, mail: dict):
+        payload = mail["payload"]
+        attempts = mail.get("attempts", 0) + 1
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor,
+                lambda: send_escalation_email(
+                    teacher_name=payload["teacher_name"],
+                    teacher_email=payload["teacher_email"],
+                    issue_summary=payload["issue_summary"],
+                    recipient_email=payload["recipient_email"],
+                    sender=self._sender,
+                )
+            )
+        except Exception as e:
+            error = str(e)
+            if isinstance(e, PERMANENT_ERRORS) or attempts >= self.max_attempts:
+                await EmailOutboxRepository.mark_dead(mail["_id"], attempts, error)
+                self.counters["dead"] += 1
+                metrics.inc("flashcoach_email_outbox_total", outcome="dead")
+                # Counter stays at 3 (strict rule: no reset without a sent email)
+                logger.error(f"Escalation email for {payload['teacher_id']} dead-lettered after {attempts} attempts: {error}")
+            else:
+                delay = self.backoff(attempts)
+                await EmailOutboxRepository.mark_retry(mail["_id"], attempts, datetime.now() + timedelta(seconds=delay), error)
+                self.counters["retries"] += 1
+                metrics.inc("flashcoach_email_outbox_total", outcome="retry")
+                logger.warning(f"Escalation email for {payload['teacher_id']} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+            return
+
+        await EmailOutboxRepository.mark_sent(mail["_id"])
+        self.counters["sent"] += 1
+        metrics.inc("flashcoach_email_outbox_total", outcome="sent")
+        # SUCCESS: Reset Counter (Strict Rule) - only now that the email actually went out
+        try:
+            await TeacherRepository.reset_feedback_count(payload["teacher_id"])
+            logger.info(f"Escalation Sent & Counter Reset for teacher {payload['teacher_id']}")
+        except Exception as reset_error:
+            self.counters["reset_failures"] += 1
+            logger.error(f"CRITICAL: Email sent but counter reset failed: {reset_error}")
+
+    async def stats(self) -> dict:
+        try:
+            by_status = await EmailOutboxRepository.count_by_status()
+        except Exception as e:
+            by_status = {"error": str(e)}
+        return {**self.counters, "running": self._task is not None, "outbox": by_status}
+
+email_outbox = EmailOutboxWorker(
+    poll_s=settings.EMAIL_OUTBOX_POLL_S,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    backoff_base_s=settings.EMAIL_BACKOFF_BASE_S,
+    backoff_max_s=settings.EMAIL_BACKOFF_MAX_S,
+    lease_s=settings.EMAIL_LEASE_S,
+    smtp_idle_s=settings.EMAIL_SMTP_IDLE_S,
+)
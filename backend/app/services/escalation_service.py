@@ -1,13 +1,17 @@
 
-from app.utils.send_email import send_escalation_email
+from app.services.email_outbox import email_outbox
 from app.repositories.teacher_repo import TeacherRepository
 from app.core.config import settings
 import logging
 
+logger = logging.getLogger(__name__)
+
 class EscalationService:
     @staticmethod
-    def process_escalation(teacher_id, session_id):
-        teacher = TeacherRepository.get_teacher_by_id(teacher_id)
+    async def process_escalation(teacher_id, session_id, teacher: dict = None):
+        # Callers that just updated the counter pass the resulting doc - no re-read needed
+        if teacher is None:
+            teacher = await TeacherRepository.get_teacher_by_id(teacher_id)
         if not teacher:
             return {"triggered": False, "status": "teacher_not_found"} # Should catch earlier
             
@@ -17,7 +21,7 @@ class EscalationService:
         config_valid = bool(settings.EMAIL_SENDER and settings.EMAIL_PASSWORD)
         
         if not config_valid:
-             logging.warning("Escalation skipped: EMAIL_SENDER or EMAIL_PASSWORD missing.")
+             logger.warning("Escalation skipped: EMAIL_SENDER or EMAIL_PASSWORD missing.")
              return {
                 "triggered": False,
                 "status": "config_missing",
@@ -25,45 +29,25 @@ class EscalationService:
             }
 
         if current_count == 3:
-            logging.info(f"Threshold Reached (Count=3). Triggering Escalation for {teacher_id}")
-            escalation_status = "sent"
+            logger.info(f"Threshold Reached (Count=3). Queueing Escalation for {teacher_id}")
+            escalation_status = "queued"
             escalation_error = None
-            
-            try:
-                # 1. Attempt to send email
-                send_escalation_email(
-                    teacher_name=teacher.get("teacher_name", "Unknown"),
-                    teacher_email=teacher.get("teacher_mail", ""),
-                    issue_summary=f"User reported 'did_not_work' with 3 continuous failures. Session: {session_id}",
-                    recipient_email=teacher.get("crp_mail")
-                )
-                
-                # 2. SUCCESS: Reset Counter (Strict Rule)
-                try:
-                    TeacherRepository.reset_feedback_count(teacher_id)
-                    logging.info(f"Escalation Sent & Counter Reset for teacher {teacher_id}")
-                except Exception as reset_error:
-                    logging.error(f"CRITICAL: Email sent but counter reset failed: {reset_error}")
 
+            try:
+                # Delivery (and the counter reset that follows a confirmed send) happens
+                # in the outbox worker, so /feedback never waits on SMTP
+                escalation_status = await email_outbox.enqueue_escalation(teacher_id, teacher, session_id)
             except Exception as e:
-                # 3. FAILURE: Do NOT Reset Counter (Strict Rule)
-                logging.error(f"Escalation Failed: {e}")
+                # Could not even persist it - counter stays at 3, next feedback tries again
+                logger.error(f"Escalation Failed: {e}")
                 escalation_status = "failed"
-                
-                # SMTP Auth Error Handling (Gmail 535-5.7.8)
-                error_str = str(e)
-                if "535" in error_str and "5.7.8" in error_str:
-                    escalation_error = "We could not authenticate the email service. Please contact support."
-                elif "535" in error_str or "Authentication" in error_str or "Username and Password not accepted" in error_str:
-                     escalation_error = "Email authentication failed. Please check server credentials."
-                else:
-                    escalation_error = error_str
-            
+                escalation_error = "Could not queue the escalation email. Please try again."
+
             return {
                 "triggered": True,
                 "type": "mentor_email",
                 "negative_count_before": current_count,
-                "negative_count_after": 0 if escalation_status == "sent" else current_count,
+                "negative_count_after": current_count,  # reset once the email is actually sent
                 "status": escalation_status,
                 "error": escalation_error
             }
@@ -2,16 +2,23 @@
 from app.repositories.feedback_repo import FeedbackRepository
 from app.repositories.teacher_repo import TeacherRepository
 from app.services.escalation_service import EscalationService
+from app.core.metrics import span
+from app.utils.logger import bind_context
+import asyncio
 import logging
 
+logger = logging.getLogger(__name__)
+
 class FeedbackService:
     @staticmethod
-    def process_feedback(teacher_id, session_id, message_id, feedback):
+    async def process_feedback(teacher_id, session_id, message_id, feedback):
+        bind_context(teacher_id=teacher_id, session_id=session_id)
         # 1. Update the specific message interaction with the feedback string
-        modified_count = FeedbackRepository.record_feedback(teacher_id, session_id, message_id, feedback)
+        with span("feedback.record"):
+            modified_count = await FeedbackRepository.record_feedback(teacher_id, session_id, message_id, feedback)
         
         if modified_count == 0:
-            logging.warning(f"Feedback Update Failed (No Doc Modified): Teacher={teacher_id}, Session={session_id}, Msg={message_id}")
+            logger.warning(f"Feedback Update Failed (No Doc Modified): Teacher={teacher_id}, Session={session_id}, Msg={message_id}")
             # IDEMPOTENCY FIX
             return {
                 "message": "Feedback already recorded (no change)",
@@ -20,10 +27,12 @@ class FeedbackService:
 
         if feedback == "did_not_work":
             # Increment count BUT Cap at 3 (Retry Logic)
-            TeacherRepository.increment_feedback_count(teacher_id)
+            with span("feedback.counter"):
+                teacher = await TeacherRepository.increment_feedback_count(teacher_id)
             
-            # Check for Escalation
-            escalation_result = EscalationService.process_escalation(teacher_id, session_id)
+            # Check for Escalation (on the post-increment doc, so no second read)
+            with span("feedback.escalation"):
+                escalation_result = await EscalationService.process_escalation(teacher_id, session_id, teacher)
             
             return {
                 "message": "Feedback recorded. Escalation processed." if escalation_result.get("triggered") else "Feedback recorded",
@@ -32,5 +41,83 @@ class FeedbackService:
 
         else:
             # Reset count on positive/other feedback (Continuous Feedback Rule)
-            TeacherRepository.reset_feedback_count(teacher_id)
+            with span("feedback.counter"):
+                await TeacherRepository.reset_feedback_count(teacher_id)
             return {"message": "Feedback recorded. Count reset.", "escalation": {"triggered": False}}
+
+    @staticmethod
+    async def process_feedback_bulk(events: list):
+        """
+        Applies many feedback events (dicts with teacher_id, session_id, message_id,
+        feedback) in order, with the same rules as process_feedback, in a fixed number
+        of round trips: one read of the current statuses, one bulk_write of the new ones
+        and, in parallel, one counter update per teacher. Escalation gets the updated
+        count directly instead of re-reading the teacher.
+        """
+        with span("feedback.bulk.read"):
+            states = await FeedbackRepository.get_feedback_states(list({e["message_id"] for e in events}))
+
+        results = []
+        final = {}  # message_id -> last applied (teacher_id, session_id, message_id, feedback)
+        runs = {}   # teacher_id -> how the counter moves over this batch
+        for e in events:
+            teacher_id, session_id, message_id, feedback = e["teacher_id"], e["session_id"], e["message_id"], e["feedback"]
+            state = states.get(message_id)
+            if state is None or state.get("teacher_id") != teacher_id or state.get("session_id") != session_id:
+                results.append({"message_id": message_id, "status": "not_found"})
+                continue
+            if state.get("feedback_status") == feedback:
+                # IDEMPOTENCY: same as a single update that modifies nothing
+                results.append({"message_id": message_id, "status": "no_change"})
+                continue
+            state["feedback_status"] = feedback
+            final[message_id] = (teacher_id, session_id, message_id, feedback)
+            results.append({"message_id": message_id, "status": "applied"})
+
+            run = runs.setdefault(teacher_id, {"failures": 0, "reset": False, "first_failures": None, "hit_threshold": False})
+            run["session_id"] = session_id
+            if feedback == "did_not_work":
+                run["failures"] += 1
+            else:
+                # Positive/other feedback resets the count (Continuous Feedback Rule)
+                if run["first_failures"] is None:
+                    run["first_failures"] = run["failures"]  # counted on top of the stored value
+                elif run["failures"] >= 3:
+                    run["hit_threshold"] = True
+                run["reset"] = True
+                run["failures"] = 0
+
+        async def update_teacher(teacher_id, run):
+            before = await TeacherRepository.apply_feedback_run(teacher_id, run["failures"], run["reset"])
+            if before is None:
+                return teacher_id, {"negative_count": None, "escalation": {"triggered": False, "status": "teacher_not_found"}}
+            start = before.get("failedFeedbackCount", 0)
+            count = min(run["failures"] + (0 if run["reset"] else start), 3)
+            first = run["failures"] if run["first_failures"] is None else run["first_failures"]
+            # Escalate if any stretch of did_not_work in this batch reached 3, like the one-by-one path would
+            reached = run["hit_threshold"] or (first > 0 and start + first >= 3) or (run["reset"] and run["failures"] >= 3)
+            escalation = {"triggered": False, "status": "count_update", "negative_count": count}
+            if reached:
+                with span("feedback.escalation"):
+                    escalation = await EscalationService.process_escalation(
+                        teacher_id, run["session_id"], {**before, "failedFeedbackCount": 3}
+                    )
+            return teacher_id, {"negative_count": count, "escalation": escalation}
+
+        with span("feedback.bulk.write"):
+            modified, *teachers = await asyncio.gather(
+                FeedbackRepository.record_feedback_bulk(list(final.values())),
+                *(update_teacher(teacher_id, run) for teacher_id, run in runs.items())
+            )
+        if modified != len(final):
+            # Something else changed a status between our read and write
+            logger.warning(f"Bulk feedback: expected {len(final)} status updates, Mongo modified {modified}")
+
+        applied = sum(1 for r in results if r["status"] == "applied")
+        return {
+            "message": f"{applied} of {len(events)} feedback events recorded",
+            "received": len(events),
+            "applied": applied,
+            "results": results,
+            "teachers": dict(teachers),
+        }
@@ -0,0 +1,75 @@
+
+from app.repositories.interaction_repo import InteractionRepository
+from app.utils.pagination import encode_cursor, decode_cursor, parse_fields, json_default
+import json
+
+SESSION_FIELDS = {"session_id", "created_at", "updated_at", "message_count"}
+MESSAGE_FIELDS = {"message_id", "sender", "message", "timestamp", "feedback_status"}
+
+MAX_PAGE_SIZE = 200
+
+def _clamp(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def _strip(doc: dict, wanted: set) -> dict:
+    return {k: v for k, v in doc.items() if k in wanted}
+
+class HistoryService:
+    @staticmethod
+    async def list_sessions(teacher_id: str, limit: int = 20, cursor: str = None, fields: str = None):
+        wanted, projection = parse_fields(fields, SESSION_FIELDS, {"session_id", "updated_at"})
+        limit = _clamp(limit)
+        # Fetch one extra row to know whether another page exists
+        docs = await InteractionRepository.find_sessions(
+            teacher_id, before=decode_cursor(cursor), limit=limit + 1, projection=projection
+        ).to_list(None)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1].get("updated_at"), docs[-1]["session_id"])
+        return {"sessions": [_strip(d, wanted) for d in docs], "next_cursor": next_cursor}
+
+    @staticmethod
+    async def list_messages(teacher_id: str, session_id: str, limit: int = 50, cursor: str = None, fields: str = None):
+        # Latest page first; `next_cursor` walks back towards older messages.
+        # Messages within a page are returned oldest-first so they render in order.
+        wanted, projection = parse_fields(fields, MESSAGE_FIELDS, {"message_id", "timestamp"})
+        limit = _clamp(limit)
+        docs = await InteractionRepository.find_messages(
+            teacher_id, session_id, before=decode_cursor(cursor), limit=limit + 1, projection=projection
+        ).to_list(None)
+
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor(docs[-1].get("timestamp"), docs[-1]["message_id"])
+        docs.reverse()
+        return {"session_id": session_id, "messages": [_strip(d, wanted) for d in docs], "next_cursor": next_cursor}
+
+    @staticmethod
+    async def stream_sessions(teacher_id: str, cursor: str = None, fields: str = None):
+        # NDJSON: one session per line, newest first, straight off the server-side cursor
+        wanted, projection = parse_fields(fields, SESSION_FIELDS, {"session_id", "updated_at"})
+        before = decode_cursor(cursor)
+        async def generate():
+            async for doc in InteractionRepository.find_sessions(teacher_id, before=before, projection=projection):
+                yield json.dumps(_strip(doc, wanted), default=json_default) + "\n"
+        return generate()
+
+    @staticmethod
+    async def stream_messages(teacher_id: str, session_id: str = None, cursor: str = None, fields: str = None):
+        # NDJSON: one message per line. Newest first for a single session,
+        # oldest first (tagged with session_id) for the teacher's whole history.
+        wanted, projection = parse_fields(fields, MESSAGE_FIELDS, {"message_id", "timestamp"})
+        if session_id:
+            before = decode_cursor(cursor)
+            source = lambda: InteractionRepository.find_messages(teacher_id, session_id, before=before, projection=projection)
+            keep = wanted
+        else:
+            source = lambda: InteractionRepository.find_all_messages(teacher_id, {**projection, "session_id": 1})
+            keep = wanted | {"session_id"}
+        async def generate():
+            async for doc in source():
+                yield json.dumps(_strip(doc, keep), default=json_default) + "\n"
+        return generate()
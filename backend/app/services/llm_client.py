@@ -0,0 +1,216 @@
+
+from app.core.config import settings
+from app.core.metrics import metrics, record_token_usage
+from app.providers import build_llm_provider, build_stt_provider, TransientProviderError
+import openai
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+class CircuitOpenError(Exception):
+    """Raised without calling upstream while the breaker is open."""
+
+class CircuitBreaker:
+    """
+    closed -> (N consecutive failures) -> open -> (reset_timeout) -> half_open
+    half_open lets a single trial call through: success closes, failure re-opens.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self._trial_in_flight = False
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self):
+        # Trial ended without a verdict (cancelled) - let the next call try instead
+        self._trial_in_flight = False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.error(f"Circuit '{self.name}' opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError,
+                          asyncio.TimeoutError, TransientProviderError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+async def _close_stream(stream):
+    # openai's AsyncStream has close(), plain async generators (local provider) have aclose()
+    close = getattr(stream, "aclose", None) or getattr(stream, "close", None)
+    if close is not None:
+        try:
+            await close()
+        except Exception as e:
+            logger.debug(f"Closing the chat stream failed: {e}")
+
+def _retry_after(error: Exception):
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+class LLMClient:
+    """
+    Resilience layer in front of the LLM / STT providers (Groq unless configured otherwise).
+
+    - one provider instance (and HTTP pool) shared by every call on this worker
+    - a deadline per call that covers all retry attempts
+    - jittered exponential backoff on 429 / 5xx / connection errors (Retry-After honoured)
+    - one circuit breaker per operation, so a Whisper outage doesn't block chat
+    """
+
+    def __init__(self):
+        self.llm = build_llm_provider()
+        self.stt = build_stt_provider()
+        self.breakers = {
+            op: CircuitBreaker(op, settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_S)
+            for op in ("chat", "stt")
+        }
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "short_circuited": 0, "stream_stalls": 0}
+
+    async def chat(self, timeout: float = None, **kwargs):
+        completion = await self._call("chat", lambda: self.llm.chat(**kwargs), timeout or settings.LLM_TIMEOUT_S)
+        record_token_usage(getattr(completion, "usage", None), kwargs.get("model", ""))
+        return completion
+
+    async def chat_stream(self, timeout: float = None, idle_timeout: float = None, **kwargs):
+        # Retries only cover opening the stream; once tokens flow the caller owns it
+        stream = await self._call(
+            "chat", lambda: self.llm.chat_stream(**kwargs), timeout or settings.LLM_TIMEOUT_S
+        )
+        return self._guard_stream(stream, idle_timeout or settings.LLM_STREAM_IDLE_TIMEOUT_S,
+                                  settings.LLM_STREAM_TIMEOUT_S)
+
+    async def _guard_stream(self, stream, idle_timeout: float, total_timeout: float):
+        """
+        Yields the chunks, but gives up when none arrives for idle_timeout or the whole
+        stream runs past total_timeout. A stall (or a dropped connection) counts against
+        the chat breaker like a failed call would.
+        """
+        breaker = self.breakers["chat"]
+        deadline = time.monotonic() + total_timeout
+        chunks = stream.__aiter__()
+        try:
+            while True:
+                wait = min(idle_timeout, deadline - time.monotonic())
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), max(wait, 0))
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    breaker.record_failure()
+                    self.counters["failures"] += 1
+                    self.counters["stream_stalls"] += 1
+                    metrics.inc("flashcoach_llm_stream_stalls_total", provider=self.llm.name)
+                    raise asyncio.TimeoutError(f"chat stream stalled (no chunk for {wait:.1f}s)")
+                except Exception as e:
+                    if _is_retryable(e):
+                        breaker.record_failure()
+                        self.counters["failures"] += 1
+                    raise
+                yield chunk
+        finally:
+            await _close_stream(stream)
+
+    async def transcribe(self, timeout: float = None, **kwargs):
+        return await self._call("stt", lambda: self.stt.transcribe(**kwargs), timeout or settings.STT_TIMEOUT_S)
+
+    async def _call(self, op: str, make_request, timeout: float):
+        breaker = self.breakers[op]
+        if not breaker.allow():
+            self.counters["short_circuited"] += 1
+            raise CircuitOpenError(f"{op} upstream unavailable (circuit open)")
+
+        self.counters["calls"] += 1
+        try:
+            return await self._attempts(op, breaker, make_request, timeout)
+        finally:
+            # CancelledError (client went away) skips the except below; without this a
+            # cancelled half-open trial would keep the breaker shut until restart
+            breaker.release_trial()
+
+    async def _attempts(self, op: str, breaker: CircuitBreaker, make_request, timeout: float):
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            attempt_started = time.perf_counter()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(f"{op} call exceeded its {timeout}s deadline")
+                try:
+                    result = await asyncio.wait_for(make_request(), remaining)
+                except asyncio.TimeoutError:
+                    raise asyncio.TimeoutError(f"{op} call exceeded its {timeout}s deadline")
+                breaker.record_success()
+                self._observe(op, attempt_started, "ok")
+                return result
+            except Exception as e:
+                self._observe(op, attempt_started, e.__class__.__name__)
+                remaining = deadline - time.monotonic()
+                if not _is_retryable(e) or attempt >= settings.LLM_MAX_RETRIES or remaining <= 0:
+                    # Client errors (400/401...) say nothing about upstream health
+                    if _is_retryable(e):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    self.counters["failures"] += 1
+                    raise
+                backoff = _retry_after(e) or random.uniform(0, settings.LLM_RETRY_BASE_S * 2 ** attempt)
+                if backoff >= remaining:
+                    breaker.record_failure()
+                    self.counters["failures"] += 1
+                    raise
+                attempt += 1
+                self.counters["retries"] += 1
+                logger.warning(f"{op} call failed ({e.__class__.__name__}), retry {attempt} in {backoff:.2f}s")
+                await asyncio.sleep(backoff)
+
+    def _observe(self, op: str, started: float, outcome: str):
+        provider = self.stt.name if op == "stt" else self.llm.name
+        metrics.observe("flashcoach_external_call_seconds", time.perf_counter() - started, op=op, provider=provider, outcome=outcome)
+
+    async def aclose(self):
+        await self.llm.aclose()
+        if self.stt is not self.llm:
+            await self.stt.aclose()
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "providers": {"llm": self.llm.name, "stt": self.stt.name},
+            "breakers": {op: b.state for op, b in self.breakers.items()},
+        }
+
+llm_client = LLMClient()
@@ -0,0 +1,141 @@
+
+from app.utils.password_hash import hash_password, check_password, hash_rounds
+from app.core.config import settings
+from app.core.metrics import metrics
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import logging
+import math
+import multiprocessing
+import time
+
+logger = logging.getLogger(__name__)
+
+class PasswordHasherBusy(Exception):
+    """Too many hash jobs waiting (or one waited too long) - the caller should answer 503."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class PasswordHasher:
+    """
+    bcrypt on a small dedicated process pool, so a wave of logins burns its own cores
+    instead of the request threadpool and the event loop's GIL.
+
+    At most workers + queue_size jobs are admitted; the next one is rejected at once
+    (PasswordHasherBusy with a Retry-After estimate) rather than queueing behind a
+    backlog that would time out anyway. An admitted job that hasn't finished after
+    timeout_s is also rejected, but keeps its slot until the worker is actually done
+    with it. A dead worker process is answered with PasswordHasherBusy too.
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout_s: float, rounds: int):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.timeout_s = timeout_s
+        self.rounds = rounds
+        self._pool = None
+        self._admitted = 0
+        self._avg_s = 0.25  # EWMA of job time, for Retry-After
+        self.counters = {"hashed": 0, "verified": 0, "rejected": 0, "timeouts": 0, "pool_restarts": 0}
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn: forking a process that already runs threads (logging, Mongo) isn't safe
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def start(self):
+        # Start the worker processes now so the first login doesn't pay for it
+        pool = self._get_pool()
+        await asyncio.gather(*(asyncio.wrap_future(pool.submit(hash_rounds, "")) for _ in range(self.workers)))
+        logger.info(f"Password hasher ready ({self.workers} processes, queue={self.queue_size}, rounds={self.rounds})")
+
+    async def stop(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._avg_s * self._admitted / self.workers))
+
+    def _reject(self, reason: str, message: str):
+        self.counters["rejected"] += 1
+        metrics.inc("flashcoach_password_hash_rejected_total", reason=reason)
+        raise PasswordHasherBusy(message, self._retry_after())
+
+    async def _run(self, op: str, fn, *args):
+        if self._admitted >= self.workers + self.queue_size:
+            self._reject("queue_full", "Too many sign-ins right now, please retry shortly")
+        started = time.perf_counter()
+        pool = self._get_pool()
+        try:
+            job = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            self._pool_broke(pool)
+        self._admitted += 1
+        metrics.set_gauge("flashcoach_password_hash_queue_depth", self._admitted)
+        # The slot is freed when the job really ends: a timed-out bcrypt that already
+        # started keeps its worker busy, and admission has to keep counting it
+        loop = asyncio.get_running_loop()
+        job.add_done_callback(lambda _: self._call_soon(loop, self._job_done))
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(job), self.timeout_s)  # cancels it if it never started
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            self._reject("timeout", "Sign-in is taking too long right now, please retry shortly")
+        except BrokenProcessPool:
+            self._pool_broke(pool)
+        elapsed = time.perf_counter() - started
+        self._avg_s = 0.8 * self._avg_s + 0.2 * elapsed
+        metrics.observe("flashcoach_password_hash_seconds", elapsed, op=op)
+        return result
+
+    @staticmethod
+    def _call_soon(loop, callback):
+        try:
+            loop.call_soon_threadsafe(callback)  # done-callbacks run on the pool's thread
+        except RuntimeError:
+            pass  # loop already closed (shutdown)
+
+    def _job_done(self):
+        self._admitted -= 1
+        metrics.set_gauge("flashcoach_password_hash_queue_depth", self._admitted)
+
+    def _pool_broke(self, pool):
+        # A worker died (OOM kill...) - next call gets a fresh pool; this one is answered 503
+        if self._pool is pool:
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.counters["pool_restarts"] += 1
+        self._reject("pool_broken", "Sign-in is temporarily unavailable, please retry shortly")
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run("hash", hash_password, password, self.rounds)
+        self.counters["hashed"] += 1
+        return hashed
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        ok = await self._run("verify", check_password, password, hashed)
+        self.counters["verified"] += 1
+        return ok
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return hash_rounds(hashed) != self.rounds
+
+    def has_idle_worker(self) -> bool:
+        # Background rehashes only run when they can't delay a waiting login
+        return self._admitted < self.workers
+
+    def stats(self) -> dict:
+        return {**self.counters, "admitted": self._admitted, "workers": self.workers,
+                "queue_size": self.queue_size, "rounds": self.rounds, "avg_seconds": round(self._avg_s, 4)}
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE,
+    timeout_s=settings.PASSWORD_HASH_TIMEOUT_S,
+    rounds=settings.BCRYPT_ROUNDS,
+)
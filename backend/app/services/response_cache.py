@@ -0,0 +1,149 @@
+
+from app.repositories.response_cache_repo import ResponseCacheRepository
+from app.utils.ttl_cache import TTLCache
+from app.core.config import settings
+import hashlib
+import json
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the system prompt or response schema changes so stale answers are never served
+PROMPT_VERSION = 1
+
+_PUNCT = re.compile(r"[^\w\s]", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    # "Students are NOT paying attention!!" == "students are not paying attention"
+    return _SPACES.sub(" ", _PUNCT.sub(" ", query.lower())).strip()
+
+class ResponseCache:
+    """
+    Two-tier cache for get_ai_response output.
+    Tier 1: per-process LRU+TTL (microseconds). Tier 2: shared Mongo collection
+    (one round-trip, shared by every worker). Only well-formed, non-error
+    responses are stored.
+
+    Invalidation bumps a generation counter in Mongo. Local entries remember the
+    generation they were cached under, and each worker re-reads the counter at most
+    every sync_seconds, so other workers stop serving a dropped answer within that window.
+    """
+
+    def __init__(self, enabled: bool, maxsize: int, ttl_seconds: int, shared: bool, sync_seconds: float = 5):
+        self.enabled = enabled
+        self.shared = shared
+        self.ttl_seconds = ttl_seconds
+        self.sync_seconds = sync_seconds
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl_seconds)  # key -> (generation, response)
+        self._generation = 0
+        self._generation_checked = None  # monotonic time of the last read, None = never
+        self.counters = {"local_hits": 0, "shared_hits": 0, "misses": 0, "writes": 0, "bypassed": 0, "errors": 0}
+
+    @staticmethod
+    def make_key(query: str, lang: str, params: dict) -> str:
+        raw = json.dumps(
+            [PROMPT_VERSION, normalize_query(query), (lang or "").lower(), params],
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, query: str, lang: str, params: dict, bypass: bool = False):
+        if not self.enabled or bypass:
+            self.counters["bypassed"] += 1
+            return None
+        key = self.make_key(query, lang, params)
+
+        entry = self.local.get(key)
+        if entry is not None:
+            generation, response = entry
+            if generation == await self._current_generation():
+                self.counters["local_hits"] += 1
+                return response
+            self.local.pop(key)  # invalidated on some worker since we cached it
+
+        if self.shared:
+            try:
+                response = await ResponseCacheRepository.get(key)
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.warning(f"Response cache read failed: {e}")
+                response = None
+            if response is not None:
+                self.counters["shared_hits"] += 1
+                self.local.set(key, (await self._current_generation(), response))
+                return response
+
+        self.counters["misses"] += 1
+        return None
+
+    async def put(self, query: str, lang: str, params: dict, response: str):
+        if not self.enabled or not self._cacheable(response):
+            return
+        key = self.make_key(query, lang, params)
+        self.local.set(key, (await self._current_generation(), response))
+        self.counters["writes"] += 1
+        if self.shared:
+            try:
+                await ResponseCacheRepository.put(
+                    key, response, self.ttl_seconds,
+                    meta={"query": normalize_query(query), "lang": lang}
+                )
+            except Exception as e:
+                self.counters["errors"] += 1
+                logger.warning(f"Response cache write failed: {e}")
+
+    async def invalidate(self, query: str = None, lang: str = None, params: dict = None) -> int:
+        """Drops one entry (query + lang given) or everything, on every worker."""
+        if query is not None:
+            key = self.make_key(query, lang, params)
+            removed = 1 if self.local.pop(key) is not None else 0
+            if self.shared:
+                removed = max(removed, await ResponseCacheRepository.delete(key))
+        else:
+            removed = len(self.local)
+            self.local.clear()
+            if self.shared:
+                removed = max(removed, await ResponseCacheRepository.clear())
+        if self.shared:
+            # Other workers can't tell which of their keys were meant, so their whole local tier goes
+            self._generation = await ResponseCacheRepository.bump_generation()
+            self._generation_checked = time.monotonic()
+        return removed
+
+    async def _current_generation(self) -> int:
+        """This worker's view of the shared generation, re-read at most every sync_seconds."""
+        if not self.shared:
+            return self._generation
+        now = time.monotonic()
+        if self._generation_checked is not None and now - self._generation_checked < self.sync_seconds:
+            return self._generation
+        self._generation_checked = now
+        try:
+            self._generation = await ResponseCacheRepository.get_generation()
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.warning(f"Response cache generation read failed: {e}")
+        return self._generation
+
+    @staticmethod
+    def _cacheable(response: str) -> bool:
+        try:
+            doc = json.loads(response)
+        except (TypeError, ValueError):
+            return False
+        return isinstance(doc, dict) and "error" not in doc and "speech_flow" in doc
+
+    def stats(self) -> dict:
+        return {**self.counters, "local": self.local.stats(), "enabled": self.enabled,
+                "shared": self.shared, "generation": self._generation}
+
+response_cache = ResponseCache(
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+    maxsize=settings.RESPONSE_CACHE_SIZE,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_S,
+    shared=settings.RESPONSE_CACHE_SHARED,
+    sync_seconds=settings.RESPONSE_CACHE_SYNC_S,
+)
@@ -0,0 +1,137 @@
+
+from app.utils.ttl_cache import TTLCache
+from app.utils.single_flight import SingleFlight
+from app.utils.lang_detect import is_english
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.providers import build_translation_provider
+from concurrent.futures import ThreadPoolExecutor, Future
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TranslationService:
+    """
+    The translation provider (Google unless configured otherwise) behind an LRU+TTL cache keyed on (text, source, target).
+
+    - identical concurrent requests share one upstream call (SingleFlight)
+    - translate_batch() / translate_batch_async() translate many strings at once:
+      duplicates and cached strings are skipped, the rest go out in parallel
+    - upstream calls run on a small dedicated pool, never on the event loop
+    - text headed for English that is already English (code-mixed users often type it)
+      is detected offline and returned as-is; counted in stats()["skipped_english"]
+    Failures fall back to returning the input text (same as before) and are not cached.
+    """
+
+    def __init__(self, cache_size: int, ttl_seconds: int, workers: int, single_flight: bool = True):
+        self.cache = TTLCache(maxsize=cache_size, ttl=ttl_seconds)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate")
+        self.flight = SingleFlight("translate", enabled=single_flight)
+        self.provider = build_translation_provider()
+        self.counters = {"upstream_calls": 0, "errors": 0, "skipped_english": 0}
+
+    @staticmethod
+    def _key(text: str, target: str, source: str):
+        return (text, source or "auto", target)
+
+    def _fetch(self, key) -> str:
+        text, source, target = key
+        self.counters["upstream_calls"] += 1
+        with metrics.timer("flashcoach_external_call_seconds", op="translate", provider=self.provider.name):
+            translated = self.provider.translate(text, source, target)
+        if translated:
+            # Cached before the in-flight entry goes away, so there's no gap where neither has it
+            self.cache.set(key, translated)
+        return translated
+
+    def _submit(self, key) -> Future:
+        """Returns the in-flight future for key, starting the upstream call if there isn't one."""
+        return self.flight.submit(key, self._pool, self._fetch, key)
+
+    def _resolve(self, text: str, future: Future) -> str:
+        try:
+            return future.result() or text
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.warning(f"Translation failed, returning source text: {e}")
+            return text
+
+    def _needs_translation(self, text: str, target: str, source: str) -> bool:
+        if not (text and text.strip()) or source == target:
+            return False
+        if target == "en" and is_english(text):
+            self.counters["skipped_english"] += 1
+            return False
+        return True
+
+    def translate(self, text: str, target: str, source: str = "auto") -> str:
+        if not self._needs_translation(text, target, source):
+            return text
+        key = self._key(text, target, source)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return self._resolve(text, self._submit(key))
+
+    async def translate_async(self, text: str, target: str, source: str = "auto") -> str:
+        if not self._needs_translation(text, target, source):
+            return text
+        key = self._key(text, target, source)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return await self._resolve_async(text, self._submit(key))
+
+    async def _resolve_async(self, text: str, future: Future) -> str:
+        try:
+            return (await asyncio.shield(asyncio.wrap_future(future))) or text
+        except Exception as e:
+            self.counters["errors"] += 1
+            logger.warning(f"Translation failed, returning source text: {e}")
+            return text
+
+    def _plan_batch(self, texts: list, target: str, source: str):
+        results = list(texts)
+        pending = {}  # key -> [indexes]
+        for i, text in enumerate(texts):
+            if not self._needs_translation(text, target, source):
+                continue
+            key = self._key(text, target, source)
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.setdefault(key, []).append(i)
+        return results, pending
+
+    def translate_batch(self, texts: list, target: str, source: str = "auto") -> list:
+        results, pending = self._plan_batch(texts, target, source)
+        futures = {key: self._submit(key) for key in pending}
+        for key, future in futures.items():
+            translated = self._resolve(key[0], future)
+            for i in pending[key]:
+                results[i] = translated
+        return results
+
+    async def translate_batch_async(self, texts: list, target: str, source: str = "auto") -> list:
+        results, pending = self._plan_batch(texts, target, source)
+        keys = list(pending)
+        translated = await asyncio.gather(
+            *(self._resolve_async(key[0], self._submit(key)) for key in keys)
+        )
+        for key, value in zip(keys, translated):
+            for i in pending[key]:
+                results[i] = value
+        return results
+
+    def stats(self) -> dict:
+        return {**self.counters, "coalesced": self.flight.counters["shared"], "provider": self.provider.name,
+                "inflight": self.flight.inflight(), "cache": self.cache.stats()}
+
+translation_service = TranslationService(
+    cache_size=settings.TRANSLATION_CACHE_SIZE,
+    ttl_seconds=settings.TRANSLATION_CACHE_TTL_S,
+    workers=settings.TRANSLATION_WORKERS,
+    single_flight=settings.SINGLE_FLIGHT_ENABLED,
+)
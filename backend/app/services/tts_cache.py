@@ -0,0 +1,149 @@
+
+from app.utils.ttl_cache import TTLCache
+from app.core.config import settings
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+class TTSCache:
+    """
+    Content-addressed cache for synthesized audio (mp3 bytes).
+    Key = sha256(text, lang, voice params), so the same phrase is only ever synthesized once.
+
+    Tier 1: in-process LRU of recent clips.
+    Tier 2: one file per clip in TTS_CACHE_DIR, bounded to max_disk_bytes with LRU
+    eviction, read back through mmap. Survives restarts and is shared by workers on the
+    same host (each worker trims against its own view, which is good enough for a cache).
+    """
+
+    SUFFIX = ".mp3"
+
+    def __init__(self, directory: str, memory_items: int, max_disk_bytes: int):
+        self.memory = TTLCache(maxsize=memory_items, ttl=float("inf"))
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._index = OrderedDict()  # key -> size, least recently used first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "disk_evictions": 0, "errors": 0}
+        if directory:
+            self._load_index()
+
+    @staticmethod
+    def make_key(text: str, lang: str, **voice) -> str:
+        raw = json.dumps([text, (lang or "").lower(), voice], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def _load_index(self):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(self.SUFFIX):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-len(self.SUFFIX)], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._index[key] = size
+                self._disk_bytes += size
+            self._trim()
+        except OSError as e:
+            logger.warning(f"TTS disk cache disabled ({self.directory}): {e}")
+            self.directory = ""
+
+    def get(self, key: str):
+        audio = self.memory.get(key)
+        if audio is not None:
+            self.counters["memory_hits"] += 1
+            return audio
+        audio = self._read_disk(key) if self.directory else None
+        if audio is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["disk_hits"] += 1
+        self.memory.set(key, audio)
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        if not audio:
+            return
+        self.memory.set(key, audio)
+        self.counters["writes"] += 1
+        if self.directory:
+            self._write_disk(key, audio)
+
+    def _read_disk(self, key: str):
+        with self._lock:
+            if key not in self._index:
+                return None
+            self._index.move_to_end(key)
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                audio = m[:]
+            os.utime(path)  # keeps LRU order across restarts
+            return audio
+        except (OSError, ValueError) as e:
+            # Deleted underneath us (or empty file) - forget it
+            with self._lock:
+                size = self._index.pop(key, 0)
+                self._disk_bytes -= size
+            logger.warning(f"TTS disk cache read failed for {key}: {e}")
+            return None
+
+    def _write_disk(self, key: str, audio: bytes):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(audio)
+            os.replace(tmp, path)  # atomic, readers never see half a file
+        except OSError as e:
+            self.counters["errors"] += 1
+            logger.warning(f"TTS disk cache write failed: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._disk_bytes += len(audio) - self._index.pop(key, 0)
+            self._index[key] = len(audio)
+            self._trim()
+
+    def _trim(self):
+        # Caller holds the lock (or is __init__)
+        while self._disk_bytes > self.max_disk_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._disk_bytes -= size
+            self.counters["disk_evictions"] += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        c = self.counters
+        lookups = c["memory_hits"] + c["disk_hits"] + c["misses"]
+        return {
+            **c,
+            "hit_rate": round((c["memory_hits"] + c["disk_hits"]) / lookups, 4) if lookups else 0.0,
+            "memory": self.memory.stats(),
+            "disk_entries": len(self._index),
+            "disk_bytes": self._disk_bytes,
+            "disk_max_bytes": self.max_disk_bytes,
+        }
+
+tts_cache = TTSCache(
+    directory=settings.TTS_CACHE_DIR,
+    memory_items=settings.TTS_CACHE_MEMORY_ITEMS,
+    max_disk_bytes=settings.TTS_CACHE_DISK_MB * 1024 * 1024,
+)
@@ -0,0 +1,71 @@
+
+from app.utils.audio_utils import synthesize_speech
+from app.core.config import settings
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import asyncio
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Split after ., !, ?, the Devanagari danda and newlines; keeps the punctuation with its sentence
+_SENTENCE_END = re.compile(r"(?<=[.!?।॥])\s+|\n+")
+
+# Shared by every streaming request so total gTTS concurrency stays bounded
+_pool = ThreadPoolExecutor(max_workers=settings.TTS_WORKERS, thread_name_prefix="tts")
+
+def split_sentences(text: str, min_chars: int = 20) -> list:
+    """Sentences, with very short ones merged into the next so we don't pay a round-trip per "Okay."."""
+    chunks, pending = [], ""
+    for part in _SENTENCE_END.split(text or ""):
+        part = part.strip()
+        if not part:
+            continue
+        pending = f"{pending} {part}".strip()
+        if len(pending) >= min_chars:
+            chunks.append(pending)
+            pending = ""
+    if pending:
+        chunks.append(pending)
+    return chunks
+
+def speech_flow_chunks(flow: dict) -> list:
+    """One chunk per speech_flow part, in the order the voice UI plays them."""
+    chunks = [flow.get("intro", "")]
+    for step in flow.get("main_advice", []) or []:
+        chunks.append(step.get("spoken_text", ""))
+    chunks.append(flow.get("closing", ""))
+    return [c.strip() for c in chunks if c and c.strip()]
+
+async def synthesize_in_order(chunks: list, lang: str):
+    """
+    Yields (index, text, mp3_bytes) in input order. Up to TTS_STREAM_WINDOW chunks are
+    synthesized ahead of the one being sent, so chunk 0 goes out as soon as it is ready
+    while the rest are still in flight. A failed chunk yields b"" rather than ending the stream.
+    """
+    loop = asyncio.get_running_loop()
+    window = deque()
+    upcoming = iter(enumerate(chunks))
+
+    def submit_next():
+        for index, text in upcoming:
+            window.append((index, text, loop.run_in_executor(_pool, synthesize_speech, text, lang)))
+            return
+
+    for _ in range(settings.TTS_STREAM_WINDOW):
+        submit_next()
+    try:
+        while window:
+            index, text, future = window.popleft()
+            submit_next()
+            try:
+                audio = await future
+            except Exception as e:
+                logger.warning(f"TTS chunk {index} failed: {e}")
+                audio = b""
+            yield index, text, audio
+    finally:
+        # Client went away - don't synthesize audio nobody will hear
+        for _, _, future in window:
+            future.cancel()
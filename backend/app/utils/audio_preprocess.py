@@ -0,0 +1,198 @@
+
+from dataclasses import dataclass
+import io
+import logging
+import re
+import shutil
+import subprocess
+import wave
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TARGET_RATE = 16000  # what Whisper resamples to anyway
+FRAME_MS = 30
+
+UPLOAD_BITRATE = "32k"  # Opus re-encode of the trimmed clip; plenty for Whisper
+
+@dataclass
+class PreparedAudio:
+    audio: bytes            # what to upload: the trimmed clip re-encoded, or the original if that's smaller
+    filename: str
+    has_speech: bool
+    input_seconds: float
+    output_seconds: float   # length of the trimmed speech
+    samples: np.ndarray = None  # the trimmed 16 kHz mono signal, for windowed transcription
+    reencoded: bool = True  # False = audio is the original upload
+
+def _decode_wav(content: bytes):
+    with wave.open(io.BytesIO(content)) as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width}")
+    return samples.reshape(-1, channels), rate
+
+def _decode_ffmpeg(content: bytes, timeout: float):
+    # ffmpeg also does the downmix + resample for us
+    proc = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "s16le", "-ac", "1", "-ar", str(TARGET_RATE), "pipe:1"],
+        input=content, capture_output=True, timeout=timeout, check=True
+    )
+    samples = np.frombuffer(proc.stdout, dtype="<i2").astype(np.float32) / 32768
+    return samples.reshape(-1, 1), TARGET_RATE
+
+def decode(content: bytes, ffmpeg_timeout: float = 10):
+    """(samples[frames, channels] float32 in [-1, 1], sample_rate), or None if we can't decode it here."""
+    if content[:4] == b"RIFF" and content[8:12] == b"WAVE":
+        return _decode_wav(content)
+    if shutil.which("ffmpeg"):
+        return _decode_ffmpeg(content, ffmpeg_timeout)
+    return None  # browser WebM/Opus without ffmpeg installed: upload as-is
+
+def to_mono_16k(samples: np.ndarray, rate: int) -> np.ndarray:
+    mono = samples.mean(axis=1) if samples.shape[1] > 1 else samples[:, 0]
+    if rate == TARGET_RATE or not len(mono):
+        return mono
+    if rate > TARGET_RATE:
+        # Box filter over the decimation ratio as a cheap anti-alias before interpolating
+        width = int(round(rate / TARGET_RATE))
+        if width > 1:
+            mono = np.convolve(mono, np.ones(width, dtype=np.float32) / width, mode="same")
+    out_len = int(len(mono) * TARGET_RATE / rate)
+    positions = np.arange(out_len, dtype=np.float64) * (rate / TARGET_RATE)
+    return np.interp(positions, np.arange(len(mono)), mono).astype(np.float32)
+
+def _frame_db(mono: np.ndarray):
+    frame = TARGET_RATE * FRAME_MS // 1000
+    n_frames = len(mono) // frame
+    frames = mono[:n_frames * frame].reshape(n_frames, frame)
+    return frame, 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12))
+
+def speech_bounds(mono: np.ndarray, margin_db: float, floor_db: float, min_speech_ms: int, pad_ms: int):
+    """
+    Energy VAD: per-frame RMS in dBFS vs. an adaptive threshold - the noise floor (10th
+    percentile frame) + margin_db, capped at peak - margin_db so a clip that is speech
+    end to end still passes, and never below floor_db. Returns (start, end)
+    sample indices around the speech, or None when there's less than min_speech_ms of it.
+    """
+    frame, db = _frame_db(mono)
+    if len(db) == 0:
+        return None
+    threshold = max(min(np.percentile(db, 10) + margin_db, db.max() - margin_db), floor_db)
+    voiced = np.flatnonzero(db > threshold)
+    if len(voiced) * FRAME_MS < min_speech_ms:
+        return None
+    pad = TARGET_RATE * pad_ms // 1000
+    return max(0, voiced[0] * frame - pad), min(len(mono), (voiced[-1] + 1) * frame + pad)
+
+def encode_wav(mono: np.ndarray) -> bytes:
+    pcm = (np.clip(mono, -1, 1) * 32767).astype("<i2")
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(TARGET_RATE)
+        w.writeframes(pcm.tobytes())
+    return buf.getvalue()
+
+def _encode_opus_ffmpeg(mono: np.ndarray, timeout: float) -> bytes:
+    pcm = (np.clip(mono, -1, 1) * 32767).astype("<i2")
+    proc = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "s16le", "-ac", "1", "-ar", str(TARGET_RATE),
+         "-i", "pipe:0", "-c:a", "libopus", "-b:a", UPLOAD_BITRATE, "-f", "ogg", "pipe:1"],
+        input=pcm.tobytes(), capture_output=True, timeout=timeout, check=True
+    )
+    return proc.stdout
+
+def encode_for_upload(mono: np.ndarray, ffmpeg_timeout: float = 10):
+    """(bytes, filename) - Ogg/Opus when ffmpeg is around (~4 KB/s), else 16-bit WAV (32 KB/s)."""
+    if shutil.which("ffmpeg"):
+        try:
+            return _encode_opus_ffmpeg(mono, ffmpeg_timeout), "audio.ogg"
+        except Exception as e:
+            logger.warning(f"Opus encode failed, falling back to WAV: {e}")
+    return encode_wav(mono), "audio.wav"
+
+def prepare_for_stt(content: bytes, filename: str = "audio.wav", margin_db: float = 10, floor_db: float = -50,
+                    min_speech_ms: int = 250, pad_ms: int = 200):
+    """
+    Decode -> mono 16 kHz -> trim silence -> re-encode. Returns PreparedAudio, or None
+    when the upload can't be decoded here (caller should then send the original bytes).
+    The original upload is kept whenever it's smaller than the re-encoded trim (browser
+    Opus with little silence to cut). CPU-bound: run it in a worker thread.
+    """
+    try:
+        decoded = decode(content)
+    except Exception as e:
+        logger.warning(f"Audio decode failed, sending original upload: {e}")
+        return None
+    if decoded is None:
+        return None
+    samples, rate = decoded
+    input_seconds = len(samples) / rate if rate else 0.0
+    mono = to_mono_16k(samples, rate)
+    bounds = speech_bounds(mono, margin_db, floor_db, min_speech_ms, pad_ms)
+    if bounds is None:
+        return PreparedAudio(b"", "audio.wav", False, input_seconds, 0.0)
+    trimmed = mono[bounds[0]:bounds[1]]
+    output_seconds = len(trimmed) / TARGET_RATE
+    audio, name = encode_for_upload(trimmed)
+    if len(audio) >= len(content):
+        return PreparedAudio(content, filename, True, input_seconds, output_seconds, trimmed, reencoded=False)
+    return PreparedAudio(audio, name, True, input_seconds, output_seconds, trimmed)
+
+def split_at_silence(mono: np.ndarray, window_s: float, overlap_s: float, search_s: float = 2.0) -> list:
+    """
+    (start, end) sample ranges of about window_s each. Every cut is placed at the quietest
+    frame within search_s of the nominal boundary (a pause between words, ideally), and
+    each window reaches overlap_s past its cuts so a word clipped by one window is whole
+    in its neighbour. The tail is merged into the last window if it would be under 25%.
+    """
+    window, overlap, search = (int(s * TARGET_RATE) for s in (window_s, overlap_s, search_s))
+    if len(mono) <= window * 1.25:
+        return [(0, len(mono))]
+    # Short windows: keep every cut at least half a window past the previous one
+    search = min(search, window // 2)
+    frame, db = _frame_db(mono)
+    ranges, start = [], 0
+    while len(mono) - start > window * 1.25:
+        lo, hi = (start + window - search) // frame, (start + window + search) // frame
+        if hi > lo and len(db[lo:hi]):
+            cut = (lo + int(np.argmin(db[lo:hi]))) * frame + frame // 2
+        else:
+            cut = start + window  # window shorter than a frame - cut where it falls
+        if cut <= start:
+            cut = start + window  # frame rounding landed behind us; always move forward
+        ranges.append((max(0, start - overlap), min(len(mono), cut + overlap)))
+        start = cut
+    ranges.append((max(0, start - overlap), len(mono)))
+    return ranges
+
+_NON_WORD = re.compile(r"[^\w']+")
+
+def _normalize_words(words: list) -> list:
+    return [_NON_WORD.sub("", w.lower()) for w in words]
+
+def stitch_transcripts(parts: list, max_overlap_words: int = 8) -> str:
+    """
+    Joins window transcripts, dropping the words a window repeats from the end of the
+    previous one (the overlap region is heard twice). Matching ignores case/punctuation
+    and takes the longest repeated run, up to max_overlap_words.
+    """
+    words = []
+    for part in parts:
+        incoming = (part or "").split()
+        for k in range(min(max_overlap_words, len(words), len(incoming)), 0, -1):
+            if _normalize_words(words[-k:]) == _normalize_words(incoming[:k]):
+                incoming = incoming[k:]
+                break
+        words.extend(incoming)
+    return " ".join(words)
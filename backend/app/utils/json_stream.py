@@ -0,0 +1,99 @@
+
+import json
+
+class SpeechFlowParser:
+    """
+    Incremental scanner for the coaching JSON as it streams out of the LLM.
+
+    feed() takes raw text chunks and returns the speech_flow parts that became
+    complete in that chunk, in order:
+        ("intro", "text"), ("main_advice", {"step": 1, "title": ..., "spoken_text": ...}), ("closing", "text")
+
+    It does not build the whole document - it only tracks the container stack and
+    the current key so it can slice out a value the moment its closing quote or
+    brace arrives, then hands that slice to json.loads.
+    """
+
+    TARGETS = {
+        ("speech_flow", "intro"): "intro",
+        ("speech_flow", "main_advice", int): "main_advice",
+        ("speech_flow", "closing"): "closing",
+    }
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack = []        # [{"type": "obj"|"arr", "path": tuple, "start": int, "key": str, "expect_key": bool, "index": int}]
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+
+    def feed(self, chunk: str) -> list:
+        self.buffer += chunk
+        events = []
+        buf = self.buffer
+        for pos in range(self._pos, len(buf)):
+            ch = buf[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string_end(buf, pos, events)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif ch in "{[":
+                self._stack.append({
+                    "type": "obj" if ch == "{" else "arr",
+                    "path": self._value_path(),
+                    "start": pos,
+                    "key": None,
+                    "expect_key": ch == "{",
+                    "index": 0,
+                })
+            elif ch in "}]":
+                if not self._stack:
+                    continue
+                node = self._stack.pop()
+                self._emit(node["path"], buf[node["start"]:pos + 1], events)
+            elif ch == "," and self._stack:
+                top = self._stack[-1]
+                if top["type"] == "obj":
+                    top["expect_key"] = True
+                else:
+                    top["index"] += 1
+        self._pos = len(buf)
+        return events
+
+    def _value_path(self):
+        if not self._stack:
+            return ()
+        top = self._stack[-1]
+        if top["type"] == "obj":
+            return top["path"] + (top["key"],)
+        return top["path"] + (top["index"],)
+
+    def _on_string_end(self, buf, pos, events):
+        top = self._stack[-1] if self._stack else None
+        raw = buf[self._string_start:pos + 1]
+        if top and top["type"] == "obj" and top["expect_key"]:
+            top["key"] = json.loads(raw)
+            top["expect_key"] = False
+            return
+        self._emit(self._value_path(), raw, events)
+
+    def _emit(self, path, raw, events):
+        for target, name in self.TARGETS.items():
+            if len(target) != len(path):
+                continue
+            if all(t is int and isinstance(p, int) or t == p for t, p in zip(target, path)):
+                try:
+                    events.append((name, json.loads(raw)))
+                except ValueError:
+                    pass
+                return
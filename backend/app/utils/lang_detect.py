@@ -0,0 +1,91 @@
+
+from collections import Counter
+import math
+import re
+
+# Unicode blocks for the scripts the app supports (see /api/languages)
+SCRIPT_RANGES = {
+    "devanagari": (0x0900, 0x097F),  # hi, mr
+    "bengali": (0x0980, 0x09FF),
+    "tamil": (0x0B80, 0x0BFF),
+    "telugu": (0x0C00, 0x0C7F),
+}
+
+# Tiny training snippets for the Latin-script case: plain English vs romanized
+# Hindi/Indic ("Hinglish"). Enough to separate the two on a sentence or more.
+_ENGLISH_SAMPLE = """
+the students are not listening to me in the class and they keep talking while i teach
+how can i keep the children engaged during the lesson what should i do when a student
+does not complete the homework my class is very noisy after lunch break and it is hard
+to get their attention back i want to make the lesson more interactive with group work
+some students finish early and get bored while others are still struggling with the
+problem please give me a simple activity for teaching fractions to grade four students
+they were quiet today but nobody answered my questions thank you that worked well
+"""
+
+_ROMANIZED_SAMPLE = """
+bacche meri baat nahi sunte hain aur class mein bahut shor karte hain main kya karun
+padhate samay bachon ka dhyan kaise rakhun kuch bacche homework nahi karte aur roz
+bahane banate hain lunch ke baad class mein koi sunta hi nahi mujhe samajh nahi aa raha
+ki unko kaise samjhaun yeh activity kaisi rahegi kal se try karti hoon bahut accha
+pillalu class lo vinatledu emi cheyali pasanga class la pesitte irukkanga enna pannalam
+chhatra ra kotha shune na ki korbo mulanna shikavtana laksh lagat nahi kay karu
+aaj sab bacche chup the lekin kisi ne jawab nahi diya dhanyavaad yeh kaam kar gaya
+"""
+
+_WORD_RE = re.compile(r"[a-z']+")
+_NGRAM = 3
+
+def _ngrams(text: str):
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f" {word} "
+        for i in range(len(padded) - _NGRAM + 1):
+            yield padded[i:i + _NGRAM]
+
+def _profile(sample: str):
+    counts = Counter(_ngrams(sample))
+    total = sum(counts.values())
+    # add-one smoothing over a generous vocabulary so unseen trigrams aren't -inf
+    vocab = len(counts) + 27 ** _NGRAM
+    return {g: math.log((c + 1) / (total + vocab)) for g, c in counts.items()}, math.log(1 / (total + vocab))
+
+_ENGLISH, _ENGLISH_UNSEEN = _profile(_ENGLISH_SAMPLE)
+_ROMANIZED, _ROMANIZED_UNSEEN = _profile(_ROMANIZED_SAMPLE)
+
+def script_counts(text: str) -> Counter:
+    """Letters per script: 'latin', one of SCRIPT_RANGES, or 'other'. Digits/punctuation are ignored."""
+    counts = Counter()
+    for ch in text:
+        if not ch.isalpha():
+            continue
+        if ch.isascii():
+            counts["latin"] += 1
+            continue
+        cp = ord(ch)
+        for script, (lo, hi) in SCRIPT_RANGES.items():
+            if lo <= cp <= hi:
+                counts[script] += 1
+                break
+        else:
+            counts["other"] += 1
+    return counts
+
+def english_score(text: str) -> float:
+    """Average per-trigram log-likelihood ratio, English vs romanized Indic. > 0 leans English."""
+    score, n = 0.0, 0
+    for gram in _ngrams(text):
+        score += _ENGLISH.get(gram, _ENGLISH_UNSEEN) - _ROMANIZED.get(gram, _ROMANIZED_UNSEEN)
+        n += 1
+    return score / n if n else 0.0
+
+def is_english(text: str, min_latin_ratio: float = 0.9, margin: float = 0.15) -> bool:
+    """
+    Cheap offline check used to skip translation hops.
+    Leans towards False: a wrong "not English" costs one translation call,
+    a wrong "English" sends untranslated text to the model.
+    """
+    counts = script_counts(text)
+    letters = sum(counts.values())
+    if letters < 3 or counts["latin"] / letters < min_latin_ratio:
+        return False
+    return english_score(text) > margin
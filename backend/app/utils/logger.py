@@ -1,12 +1,217 @@
-
+import atexit
+import json
 import logging
-import os
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from app.core.config import settings
+
+# Set per request (middleware) and per chat turn / feedback call; copied onto every record
+request_id_var: ContextVar = ContextVar("request_id", default=None)
+teacher_id_var: ContextVar = ContextVar("teacher_id", default=None)
+session_id_var: ContextVar = ContextVar("session_id", default=None)
+
+_CONTEXT_VARS = {"request_id": request_id_var, "teacher_id": teacher_id_var, "session_id": session_id_var}
+
+def bind_context(teacher_id: str = None, session_id: str = None):
+    """Tag every log line from here on (in this request) with the teacher / session."""
+    if teacher_id:
+        teacher_id_var.set(teacher_id)
+    if session_id:
+        session_id_var.set(session_id)
+
+# Attributes every LogRecord has; anything else was passed via extra= and goes into the JSON
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "suppressed"}
+
+class ContextFilter(logging.Filter):
+    """Runs in the caller's thread/task (before the queue), where the contextvars are visible."""
+
+    def filter(self, record):
+        for name, var in _CONTEXT_VARS.items():
+            if not hasattr(record, name):
+                setattr(record, name, var.get())
+        return True
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of sub-WARNING records per logger prefix, e.g.
+    LOG_SAMPLING="app.services.translation_service=0.1,app.repositories=0.5".
+    Warnings and errors are never sampled away.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        # Longest prefix wins
+        self.rates = sorted(rates.items(), key=lambda kv: -len(kv[0]))
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return random.random() < rate
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """
+    At most `limit` identical errors (same logger + message template) per `window` seconds.
+    The first record after the window reopens carries suppressed=N for what was dropped.
+    """
+
+    def __init__(self, limit: int, window: float = 60.0):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> [window_start, count, suppressed]
+
+    def filter(self, record):
+        if record.levelno < logging.ERROR or self.limit <= 0:
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else repr(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or now - bucket[0] >= self.window:
+                suppressed = bucket[2] if bucket else 0
+                self._buckets[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                if len(self._buckets) > 10000:
+                    self._buckets = {k: v for k, v in self._buckets.items() if now - v[0] < self.window}
+                return True
+            if bucket[1] < self.limit:
+                bucket[1] += 1
+                return True
+            bucket[2] += 1
+            return False
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for name in _CONTEXT_VARS:
+            value = getattr(record, name, None)
+            if value:
+                entry[name] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        for key, value in vars(record).items():
+            if key not in _RESERVED and key not in entry and key not in _CONTEXT_VARS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s]: %(message)s")
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Stock prepare() formats the message and drops exc_info; keep exc_info so the
+        # writer thread can render the traceback, but resolve msg % args here
+        # (args may be mutable objects the caller changes afterwards).
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging; count what we dropped
+            _listener_stats["dropped"] += 1
+
+def _parse_sampling(spec: str) -> dict:
+    rates = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, rate = part.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+_listener = None
+_listener_stats = {"dropped": 0}
 
 def setup_logging():
-    logging.basicConfig(
-        filename='backend_errors.log', 
-        level=logging.ERROR, 
-        format='%(asctime)s %(levelname)s:%(message)s'
-    )
-    # Also ensure info/debugging if needed, or stick to user config
-    # The user's original code had level=logging.ERROR
+    """
+    Logging is handed off through a bounded queue to one writer thread, so a request
+    never waits on stdout/file I/O. Records are JSON (LOG_FORMAT=text for local dev)
+    and carry request/teacher/session IDs. ERROR and above also go to backend_errors.log.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(formatter)
+    handlers = [console]
+    if settings.LOG_ERROR_FILE:
+        error_file = logging.FileHandler(settings.LOG_ERROR_FILE)
+        error_file.setLevel(logging.ERROR)
+        error_file.setFormatter(formatter)
+        handlers.append(error_file)
+
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SamplingFilter(_parse_sampling(settings.LOG_SAMPLING)))
+    handler.addFilter(RateLimitFilter(settings.LOG_ERROR_RATE_LIMIT))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Flushes whatever is still queued (called on shutdown / at exit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+class RequestContextMiddleware:
+    """Assigns a request ID (or reuses X-Request-ID) and echoes it on the response."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        incoming = dict(scope.get("headers") or []).get(b"x-request-id")
+        request_id = incoming.decode("latin-1")[:64] if incoming else uuid.uuid4().hex
+        tokens = [
+            request_id_var.set(request_id),
+            # fresh per request, so IDs bound by an earlier request on this task never leak
+            teacher_id_var.set(None),
+            session_id_var.set(None),
+        ]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            for var, token in zip((request_id_var, teacher_id_var, session_id_var), tokens):
+                var.reset(token)
@@ -0,0 +1,41 @@
+
+import base64
+import json
+from datetime import datetime
+
+# Opaque keyset cursors: base64(json([iso_timestamp, id])).
+# Clients just echo back the `next_cursor` they were given.
+
+def encode_cursor(ts: datetime, item_id: str) -> str:
+    raw = json.dumps([ts.isoformat() if ts else None, item_id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str):
+    if not cursor:
+        return None
+    try:
+        ts, item_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return (datetime.fromisoformat(ts) if ts else None, item_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def parse_fields(fields: str, allowed: set, required: set):
+    """
+    Turns ?fields=a,b into (wanted_fields, mongo_projection). `required` fields are
+    always fetched (e.g. the cursor keys) and stripped again if not requested.
+    """
+    if not fields:
+        wanted = set(allowed)
+    else:
+        wanted = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = wanted - allowed
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    projection = {f: 1 for f in wanted | required}
+    projection["_id"] = 0
+    return wanted, projection
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
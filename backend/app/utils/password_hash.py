@@ -0,0 +1,19 @@
+
+"""
+bcrypt helpers that run inside the auth process pool.
+Kept free of app imports so spawned workers start fast.
+"""
+import bcrypt
+
+def hash_password(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+def check_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+
+def hash_rounds(hashed: str) -> int:
+    # "$2b$12$<salt+hash>" -> 12; 0 if it doesn't look like bcrypt
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
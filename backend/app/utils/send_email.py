@@ -2,10 +2,13 @@
 import logging
 import os
 import smtplib
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from app.core.config import settings 
 
+logger = logging.getLogger(__name__)
+
 # Refactored to use settings, or os.getenv (but settings is preferred in new arch)
 # Keeping os.getenv backup as per original logic to ensure behavior strictness?
 # The original code used os.getenv inside the function.
@@ -13,36 +16,7 @@ from app.core.config import settings
 # To be STRICT "DO NOT change any existing business logic", I will stick to os.getenv call or map settings.
 # Actually, mapping settings is cleaner. global settings is already loaded.
 
-def send_escalation_email(teacher_name: str, teacher_email: str, issue_summary: str, recipient_email: str = None):
-    """
-    Sends an escalation email to the CRP.
-    Falls back to mock logging if credentials are not found.
-    """
-    sender_email = settings.EMAIL_SENDER
-    sender_password = settings.EMAIL_PASSWORD
-    # Use provided email or fallback
-    crp_email = recipient_email or settings.CRP_EMAIL_FALLBACK or "admin@flashcoach.com"
-    
-    if recipient_email:
-        logging.info(f"Escalation: Using Teacher-Specific CRP Email: {recipient_email}")
-    else:
-        logging.warning(f"Escalation: Teacher CRP missing. Using Fallback: {crp_email}") 
-
-    # DEBUG: Print loaded credentials (masked)
-    print(f"DEBUG: Active Sender: {sender_email}")
-    print(f"DEBUG: Password Length: {len(sender_password) if sender_password else 0}")
-    if sender_password:
-         print(f"DEBUG: Password Starts With: {sender_password[:2]}...") 
-
-    if not sender_email or not sender_password:
-        logging.warning("Email credentials not set. Simulating email send.")
-        print("**************************************************")
-        print(f" [MOCK EMAIL] To: {crp_email}")
-        print(f" [MOCK EMAIL] Subject: ESCALATION: Issue with {teacher_name}")
-        print(f" [MOCK EMAIL] Body: {issue_summary}")
-        print("**************************************************")
-        return # Treat as success so the app logic proceeds
-
+def build_escalation_message(sender_email: str, crp_email: str, teacher_name: str, teacher_email: str, issue_summary: str):
     message = MIMEMultipart("alternative")
     message["Subject"] = f"ESCALATION: Issue with {teacher_name}"
     message["From"] = sender_email
@@ -59,35 +33,115 @@ def send_escalation_email(teacher_name: str, teacher_email: str, issue_summary:
     """
 
     message.attach(MIMEText(text, "plain"))
+    return message
+
+class SMTPSender:
+    """
+    Keeps one logged-in SMTP connection and reuses it across sends, so a burst of
+    escalations pays the connect + TLS + AUTH handshake once. Not thread-safe: the
+    outbox worker drives it from a single thread.
+    """
 
-    # Pass password as-is (proven to work by verification script)
-    # if sender_password:
-    #     sender_password = sender_password.replace(" ", "")
+    def __init__(self, server: str, sender_email: str, sender_password: str, timeout: float = 20):
+        self.server = server
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.timeout = timeout
+        self._conn = None
+        self.last_used = 0.0
 
-    smtp_server = settings.SMTP_SERVER
-    smtp_port_ssl = 465
-    smtp_port_tls = 587
-    
-    # 1. Try SSL (Port 465)
-    try:
-        with smtplib.SMTP_SSL(smtp_server, smtp_port_ssl) as server:
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, crp_email, message.as_string())
-        logging.info("Escalation email sent successfully (SSL/465).")
-        return
-    except Exception as e_ssl:
-        logging.warning(f"SSL (465) failed: {e_ssl}. Retrying with TLS (587)...")
-        
-        # 2. Fallback to TLS (Port 587)
+    def _connect(self):
+        # 1. Try SSL (Port 465)
+        try:
+            conn = smtplib.SMTP_SSL(self.server, 465, timeout=self.timeout)
+            conn.login(self.sender_email, self.sender_password)
+            return conn
+        except smtplib.SMTPAuthenticationError:
+            raise  # same credentials on 587 won't do any better
+        except Exception as e_ssl:
+            logger.warning(f"SSL (465) failed: {e_ssl}. Retrying with TLS (587)...")
+            # 2. Fallback to TLS (Port 587)
+            try:
+                conn = smtplib.SMTP(self.server, 587, timeout=self.timeout)
+                conn.starttls()
+                conn.login(self.sender_email, self.sender_password)
+                return conn
+            except Exception as e_tls:
+                raise smtplib.SMTPException(f"SSL failed: {e_ssl} | TLS failed: {e_tls}") from e_tls
+
+    def _alive(self) -> bool:
         try:
-            with smtplib.SMTP(smtp_server, smtp_port_tls) as server:
-                server.starttls()
-                server.login(sender_email, sender_password)
-                server.sendmail(sender_email, crp_email, message.as_string())
-            logging.info("Escalation email sent successfully (TLS/587).")
-            return
-        except Exception as e_tls:
-             # Both failed
-             final_error = f"SSL failed: {e_ssl} | TLS failed: {e_tls}"
-             logging.error(f"Email Send Failed (Both methods): {final_error}")
-             raise Exception(final_error) 
+            return self._conn.noop()[0] == 250
+        except Exception:
+            return False
+
+    def send(self, message, recipient: str):
+        if self._conn is None or not self._alive():
+            self.close()
+            self._conn = self._connect()
+        try:
+            self._conn.sendmail(self.sender_email, recipient, message.as_string())
+        except smtplib.SMTPServerDisconnected:
+            # Server dropped us between the NOOP and the send - one fresh connection
+            self.close()
+            self._conn = self._connect()
+            self._conn.sendmail(self.sender_email, recipient, message.as_string())
+        self.last_used = time.monotonic()
+
+    def close_if_idle(self, idle_seconds: float):
+        if self._conn is not None and time.monotonic() - self.last_used > idle_seconds:
+            self.close()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.quit()
+            except Exception:
+                pass
+
+def resolve_crp_email(recipient_email: str = None) -> str:
+    # Use provided email or fallback
+    crp_email = recipient_email or settings.CRP_EMAIL_FALLBACK or "admin@flashcoach.com"
+    if recipient_email:
+        logger.info(f"Escalation: Using Teacher-Specific CRP Email: {recipient_email}")
+    else:
+        logger.warning(f"Escalation: Teacher CRP missing. Using Fallback: {crp_email}")
+    return crp_email
+
+def send_escalation_email(teacher_name: str, teacher_email: str, issue_summary: str, recipient_email: str = None,
+                          sender: SMTPSender = None):
+    """
+    Sends an escalation email to the CRP.
+    Falls back to mock logging if credentials are not found.
+    Pass a long-lived SMTPSender to reuse its connection; otherwise a one-off one is used.
+    """
+    sender_email = settings.EMAIL_SENDER
+    sender_password = settings.EMAIL_PASSWORD
+    crp_email = resolve_crp_email(recipient_email)
+
+    # Never log any part of the password
+    logger.debug(f"Escalation: Active Sender: {sender_email}, password set: {bool(sender_password)}")
+
+    if not sender_email or not sender_password:
+        logger.warning("Email credentials not set. Simulating email send.")
+        logger.info(
+            f"[MOCK EMAIL] To: {crp_email} | Subject: ESCALATION: Issue with {teacher_name}",
+            extra={"mock_email_body": issue_summary}
+        )
+        return # Treat as success so the app logic proceeds
+
+    message = build_escalation_message(sender_email, crp_email, teacher_name, teacher_email, issue_summary)
+
+    one_off = sender is None
+    if one_off:
+        sender = SMTPSender(settings.SMTP_SERVER, sender_email, sender_password)
+    try:
+        sender.send(message, crp_email)
+        logger.info(f"Escalation email sent successfully to {crp_email}.")
+    except Exception as e:
+        logger.error(f"Email Send Failed: {e}")
+        raise
+    finally:
+        if one_off:
+            sender.close()
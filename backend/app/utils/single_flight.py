@@ -0,0 +1,122 @@
+
+from app.core.metrics import metrics
+from concurrent.futures import Future
+import asyncio
+import hashlib
+import json
+import threading
+
+# name -> SingleFlight, for /stats
+_registry = {}
+
+def flight_key(*parts) -> str:
+    """Stable key for call arguments (anything json can dump)."""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class SingleFlight:
+    """
+    Concurrent identical calls share one upstream request: the first caller for a key
+    (the leader) runs it, everyone arriving while it runs waits for the same result or
+    exception. Nothing is kept once it finishes - that's the caches' job.
+
+    Sync and async callers share one key space:
+    - do(key, fn, ...)               runs fn in the calling thread
+    - do_async(key, coro_fn, ...)    runs the coroutine as its own task, so a leader
+                                     whose client went away doesn't cancel it for the rest
+    - submit(key, executor, fn, ...) runs fn on an executor, returns the shared Future
+    """
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._calls = {}  # key -> concurrent.futures.Future
+        self._tasks = set()  # running do_async leaders (the loop only keeps weak refs)
+        self._lock = threading.Lock()
+        self.counters = {"leaders": 0, "shared": 0, "errors": 0}
+        _registry[name] = self
+
+    def _join(self, key):
+        """(future, is_leader) - registers a new call for key unless one is running."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = Future()
+                self.counters["leaders"] += 1
+                role = "leader"
+            else:
+                self.counters["shared"] += 1
+                role = "shared"
+        metrics.inc("flashcoach_singleflight_total", op=self.name, role=role)
+        return future, role == "leader"
+
+    def _settle(self, key, future: Future, result=None, error: BaseException = None):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if error is not None:
+            self.counters["errors"] += 1
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        if not self.enabled:
+            return fn(*args, **kwargs)
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    async def do_async(self, key, coro_fn, *args, **kwargs):
+        if not self.enabled:
+            return await coro_fn(*args, **kwargs)
+        future, leader = self._join(key)
+        if leader:
+            task = asyncio.ensure_future(coro_fn(*args, **kwargs))
+            self._tasks.add(task)
+            task.add_done_callback(lambda t: self._finish_task(key, future, t))
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def _finish_task(self, key, future: Future, task: asyncio.Task):
+        self._tasks.discard(task)
+        if task.cancelled():
+            self._settle(key, future, error=asyncio.CancelledError())  # loop shutting down
+        elif task.exception() is not None:
+            self._settle(key, future, error=task.exception())
+        else:
+            self._settle(key, future, task.result())
+
+    def submit(self, key, executor, fn, *args) -> Future:
+        if not self.enabled:
+            return executor.submit(fn, *args)
+        future, leader = self._join(key)
+        if leader:
+            try:
+                executor.submit(self._run, key, future, fn, *args)
+            except Exception as e:  # executor shut down - don't leave the key stuck
+                self._settle(key, future, error=e)
+        return future
+
+    def _run(self, key, future: Future, fn, *args):
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self._settle(key, future, error=e)
+            return
+        self._settle(key, future, result)
+
+    def inflight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> dict:
+        return {**self.counters, "enabled": self.enabled, "inflight": self.inflight()}
+
+def single_flight_stats() -> dict:
+    return {name: flight.stats() for name, flight in _registry.items()}
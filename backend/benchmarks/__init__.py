@@ -0,0 +1,7 @@
+"""
+Load / latency benchmark for one backend worker.
+
+Boots the API with uvicorn against the offline providers (app/providers/local.py) and a
+throwaway mongod, drives a weighted mix of endpoints with N concurrent clients and reports
+throughput and p50/p95/p99 per endpoint as JSON. See `python -m benchmarks --help`.
+"""
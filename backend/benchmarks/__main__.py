@@ -0,0 +1,147 @@
+
+"""
+Examples (from backend/):
+    python -m benchmarks --concurrency 32 --duration 30 --output bench.json
+    python -m benchmarks --mix advice=1 --concurrency 64 --baseline bench.json
+    python -m benchmarks --target http://127.0.0.1:8000   # an already running server
+"""
+
+from benchmarks.server import AppServer, LocalMongo
+from benchmarks.workloads import WORKLOADS, WorkloadState, parse_mix, resolve
+from benchmarks.report import summarize, compare
+from contextlib import ExitStack
+from datetime import datetime
+import argparse
+import asyncio
+import httpx
+import json
+import platform
+import random
+import sys
+import time
+import uuid
+
+async def seed_teachers(client, count: int) -> list:
+    teacher_ids = []
+    run = uuid.uuid4().hex[:8]
+    for i in range(count):
+        r = await client.post("/signup", json={
+            "teacher_name": f"Bench Teacher {i}",
+            "teacher_mail": f"bench-{run}-{i}@example.com",
+            "password": "bench-password",
+            "crp_name": "Bench CRP",
+            "crp_mail": "crp@example.com",
+        })
+        r.raise_for_status()
+        teacher_ids.append(r.json()["teacher_id"])
+    return teacher_ids
+
+async def run_load(client, state: WorkloadState, mix: dict, concurrency: int, duration: float, max_requests: int):
+    names, weights = list(mix), list(mix.values())
+    results = {name: {"latencies": [], "errors": 0} for name in names}
+    issued = 0
+    deadline = time.perf_counter() + duration
+
+    async def virtual_client(worker: int):
+        nonlocal issued
+        rng = random.Random(f"{state.rng.random()}:{worker}")
+        while time.perf_counter() < deadline and (not max_requests or issued < max_requests):
+            issued += 1
+            name = resolve(rng.choices(names, weights)[0], state)
+            results.setdefault(name, {"latencies": [], "errors": 0})
+            started = time.perf_counter()
+            try:
+                r = await WORKLOADS[name](client, state)
+                failed = r.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            results[name]["latencies"].append((time.perf_counter() - started) * 1000)
+            results[name]["errors"] += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_client(i) for i in range(concurrency)))
+    return results, time.perf_counter() - started
+
+async def benchmark(args, base_url: str) -> dict:
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        teacher_ids = await seed_teachers(client, args.teachers)
+        state = WorkloadState(teacher_ids, args.unique_ratio, args.seed)
+        # Warm-up: gives feedback/history something to work on and fills connection pools
+        if args.warmup:
+            await run_load(client, state, {"advice": 1}, min(args.concurrency, args.warmup), 3600, args.warmup)
+        results, elapsed = await run_load(client, state, mix, args.concurrency, args.duration, args.requests)
+        server_stats = (await client.get("/stats")).json()
+
+    all_latencies = [ms for r in results.values() for ms in r["latencies"]]
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "target": base_url,
+            "mix": mix,
+            "concurrency": args.concurrency,
+            "duration_s": round(elapsed, 2),
+            "teachers": args.teachers,
+            "unique_ratio": args.unique_ratio,
+            "seed": args.seed,
+        },
+        "endpoints": {name: summarize(r["latencies"], r["errors"], elapsed) for name, r in results.items()},
+        "total": summarize(all_latencies, sum(r["errors"] for r in results.values()), elapsed),
+        "server_stats": server_stats,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load/latency benchmark for one API worker (offline providers).")
+    parser.add_argument("--mix", default="advice=4,feedback=2,history=3,stt=1,tts=2",
+                        help="weighted endpoint mix, names: " + ", ".join(WORKLOADS))
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent virtual clients")
+    parser.add_argument("--duration", type=float, default=20, help="seconds of measured load")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = duration only)")
+    parser.add_argument("--warmup", type=int, default=50, help="advice requests before measuring")
+    parser.add_argument("--teachers", type=int, default=20, help="teacher accounts to create")
+    parser.add_argument("--unique-ratio", type=float, default=0.5, help="share of advice/TTS texts made unique (cache misses)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30, help="per-request timeout in seconds")
+    parser.add_argument("--mongo-uri", help="use this MongoDB instead of starting a throwaway mongod")
+    parser.add_argument("--db-name", default=f"flash_coach_bench_{uuid.uuid4().hex[:6]}")
+    parser.add_argument("--target", help="benchmark an already running server instead of starting one")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra settings for the server, e.g. --env LOCAL_LLM_LATENCY=fixed:200")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier report to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown vs baseline")
+    parser.add_argument("--min-delta-ms", type=float, default=5, help="ignore latency changes smaller than this")
+    args = parser.parse_args()
+
+    with ExitStack() as stack:
+        base_url = args.target
+        if not base_url:
+            mongo_uri = args.mongo_uri or stack.enter_context(LocalMongo()).uri
+            env = dict(item.split("=", 1) for item in args.env)
+            base_url = stack.enter_context(AppServer(mongo_uri, args.db_name, env)).url
+        report = asyncio.run(benchmark(args, base_url))
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("mix") != report["meta"]["mix"] or \
+                baseline.get("meta", {}).get("concurrency") != report["meta"]["concurrency"]:
+            print("warning: baseline was recorded with a different mix/concurrency", file=sys.stderr)
+        report["regressions"] = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        for r in report["regressions"]:
+            print(f"REGRESSION {r['endpoint']} {r['metric']}: {r['baseline']} -> {r['current']}", file=sys.stderr)
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
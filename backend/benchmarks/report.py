@@ -0,0 +1,44 @@
+
+import math
+
+def percentile(sorted_values: list, pct: float) -> float:
+    # Nearest-rank, so p99 of 100 samples is the 99th value, not an interpolation
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies_ms: list, errors: int, elapsed_s: float) -> dict:
+    values = sorted(latencies_ms)
+    count = len(values)
+    return {
+        "count": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / elapsed_s, 2) if elapsed_s else 0.0,
+        "mean_ms": round(sum(values) / count, 2) if count else 0.0,
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+    }
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """
+    Regressions of current vs baseline, per endpoint present in both:
+    latency percentiles up by more than tolerance (and min_delta_ms, to ignore jitter on
+    fast endpoints), throughput down by more than tolerance, or error rate up by > 1 point.
+    """
+    regressions = []
+    for name, cur in current["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if cur[metric] > base[metric] * (1 + tolerance) and cur[metric] - base[metric] >= min_delta_ms:
+                regressions.append({"endpoint": name, "metric": metric, "baseline": base[metric], "current": cur[metric]})
+        if cur["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append({"endpoint": name, "metric": "throughput_rps", "baseline": base["throughput_rps"], "current": cur["throughput_rps"]})
+        if cur["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append({"endpoint": name, "metric": "error_rate", "baseline": base["error_rate"], "current": cur["error_rate"]})
+    return regressions
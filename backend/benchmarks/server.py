@@ -0,0 +1,109 @@
+
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _wait_for_port(port: int, proc: subprocess.Popen, what: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{what} exited with code {proc.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{what} did not start listening on port {port} within {timeout}s")
+
+class LocalMongo:
+    """Throwaway mongod on a temp dir and a free port (needs `mongod` on PATH)."""
+
+    def __init__(self, binary: str = "mongod"):
+        self.binary = shutil.which(binary)
+        if not self.binary:
+            raise RuntimeError("mongod not found on PATH - install MongoDB or pass --mongo-uri")
+        self.port = free_port()
+        self.dbpath = tempfile.mkdtemp(prefix="bench-mongo-")
+        self.proc = None
+
+    @property
+    def uri(self) -> str:
+        return f"mongodb://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.proc = subprocess.Popen(
+            [self.binary, "--dbpath", self.dbpath, "--port", str(self.port), "--bind_ip", "127.0.0.1", "--quiet"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        _wait_for_port(self.port, self.proc, "mongod")
+        return self
+
+    def __exit__(self, *exc):
+        if self.proc:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        shutil.rmtree(self.dbpath, ignore_errors=True)
+
+class AppServer:
+    """The FastAPI app in one uvicorn worker, wired to the local providers."""
+
+    def __init__(self, mongo_uri: str, db_name: str, env: dict = None, log_path: str = None):
+        self.port = free_port()
+        self.log_path = log_path or os.path.join(tempfile.gettempdir(), "bench-server.log")
+        self.env = {
+            **os.environ,
+            "MONGO_URI": mongo_uri,
+            "DB_NAME": db_name,
+            "LLM_PROVIDER": "local",
+            "STT_PROVIDER": "local",
+            "TTS_PROVIDER": "local",
+            "TRANSLATION_PROVIDER": "local",
+            # Never send real escalation mail from a benchmark
+            "EMAIL_SENDER": "",
+            "EMAIL_PASSWORD": "",
+            "TTS_CACHE_DIR": tempfile.mkdtemp(prefix="bench-tts-"),
+            # 20 seeded teachers at concurrency 64 would mostly measure 429s, not throughput
+            "ADMISSION_ENABLED": "false",
+            **(env or {}),
+        }
+        self.proc = None
+        self._log = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self._log = open(self.log_path, "w")
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--workers", "1", "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=self.env, stdout=self._log, stderr=subprocess.STDOUT
+        )
+        _wait_for_port(self.port, self.proc, f"API server (see {self.log_path})")
+        return self
+
+    def __exit__(self, *exc):
+        if self.proc:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+        shutil.rmtree(self.env["TTS_CACHE_DIR"], ignore_errors=True)
+        if self._log:
+            self._log.close()
@@ -0,0 +1,123 @@
+
+import io
+import math
+import random
+import struct
+import uuid
+import wave
+
+PHRASES = [
+    "My students are not listening to me in class",
+    "How do I keep the class quiet after lunch break",
+    "Some students finish early and get bored",
+    "bacche homework nahi karte, kya karun",
+    "How can I make group work less noisy",
+    "A student keeps interrupting while I teach",
+    "How do I teach fractions to grade four",
+    "Students are scared to answer questions in English",
+]
+
+FEEDBACK_VALUES = ["worked", "partially_worked", "did_not_work"]
+
+def speech_like_wav(seconds: float = 2.0, rate: int = 16000, pad_s: float = 0.3) -> bytes:
+    """
+    A 220 Hz tone pulsing at 4 Hz (syllable rate) between pad_s of silence: loud enough
+    to pass the STT pre-processing VAD, so the benchmark covers trimming and transcription.
+    A silent clip would be answered before ever reaching STT.
+    """
+    samples = []
+    for i in range(int(seconds * rate)):
+        t = i / rate
+        voiced = pad_s <= t < seconds - pad_s
+        envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 4 * t) if voiced else 0.0
+        samples.append(int(12000 * envelope * math.sin(2 * math.pi * 220 * t)))
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+    return buf.getvalue()
+
+class WorkloadState:
+    """Shared by all virtual clients: seeded teachers plus the advice messages still awaiting feedback."""
+
+    def __init__(self, teacher_ids: list, unique_ratio: float, seed: int):
+        self.teacher_ids = teacher_ids
+        self.unique_ratio = unique_ratio
+        self.sessions = {}   # teacher_id -> [session_id]
+        self.unrated = []    # (teacher_id, session_id, message_id)
+        self.audio = speech_like_wav()
+        self.rng = random.Random(seed)
+
+    def message(self) -> str:
+        text = self.rng.choice(PHRASES)
+        # Unique messages defeat the response cache; the rest measure the cached path
+        if self.rng.random() < self.unique_ratio:
+            text = f"{text} ({uuid.uuid4().hex[:8]})"
+        return text
+
+async def advice(client, state: WorkloadState):
+    teacher_id = state.rng.choice(state.teacher_ids)
+    sessions = state.sessions.get(teacher_id)
+    session_id = state.rng.choice(sessions) if sessions and state.rng.random() < 0.7 else None
+    r = await client.post("/coaching/advice", json={
+        "teacher_id": teacher_id,
+        "message": state.message(),
+        "session_id": session_id,
+        "user_lang": state.rng.choice(["en", "en", "hi"]),
+    })
+    if r.status_code == 200:
+        data = r.json()
+        state.sessions.setdefault(teacher_id, []).append(data["session_id"])
+        state.unrated.append((teacher_id, data["session_id"], data["ai_message_id"]))
+    return r
+
+async def feedback(client, state: WorkloadState):
+    # Only picked once resolve() has seen something to rate
+    teacher_id, session_id, message_id = state.unrated.pop(state.rng.randrange(len(state.unrated)))
+    return await client.post("/feedback", json={
+        "teacher_id": teacher_id,
+        "session_id": session_id,
+        "message_id": message_id,
+        "feedback": state.rng.choice(FEEDBACK_VALUES),
+    })
+
+async def history(client, state: WorkloadState):
+    teacher_id = state.rng.choice(state.teacher_ids)
+    sessions = state.sessions.get(teacher_id)
+    if sessions and state.rng.random() < 0.5:
+        return await client.get(f"/history/{teacher_id}/sessions/{state.rng.choice(sessions)}/messages", params={"limit": 50})
+    return await client.get(f"/history/{teacher_id}/sessions", params={"limit": 20})
+
+async def speech_to_text(client, state: WorkloadState):
+    return await client.post("/api/speech-to-text", files={"audio": ("clip.wav", state.audio, "audio/wav")}, data={"lang": "en-US"})
+
+async def text_to_speech(client, state: WorkloadState):
+    return await client.post("/api/text-to-speech", json={"text": state.message(), "lang": "en"})
+
+def resolve(name: str, state: WorkloadState) -> str:
+    """The workload to actually run (and record the latency under) for a pick from the mix."""
+    if name == "feedback" and not state.unrated:
+        return "advice"  # nothing to rate yet - don't mix LLM latencies into feedback's percentiles
+    return name
+
+WORKLOADS = {
+    "advice": advice,
+    "feedback": feedback,
+    "history": history,
+    "stt": speech_to_text,
+    "tts": text_to_speech,
+}
+
+def parse_mix(spec: str) -> dict:
+    """"advice=3,history=2,stt=1" -> {"advice": 3.0, ...}"""
+    mix = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in WORKLOADS:
+            raise ValueError(f"Unknown workload {name!r} (choose from {', '.join(WORKLOADS)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Workload mix is empty")
+    return mix
@@ -0,0 +1,77 @@
+
+"""
+Checks that every query the repositories issue is index-backed.
+
+Verifies the indexes from app/core/indexes.py, then runs explain() on each entry of
+QUERY_SHAPES and exits 1 if any winning plan contains a COLLSCAN (or an index is
+missing). Point it at a staging copy of the data or, with --ensure-indexes, at an
+empty throwaway database in CI.
+
+Run from backend/:
+    python -m scripts.check_query_plans [--ensure-indexes] [--verbose]
+"""
+import argparse
+import json
+import sys
+from app.core.database import db
+from app.core.indexes import INDEXES, QUERY_SHAPES, diff_indexes, find_collscans
+
+
+def _winning_plan(explain: dict) -> dict:
+    planner = explain.get("queryPlanner", {})
+    return planner.get("winningPlan", {})
+
+
+def _plan_summary(plan: dict) -> str:
+    # "FETCH > IXSCAN(teacher_id_unique)" - enough to eyeball in CI output
+    stages = []
+    node = plan.get("queryPlan", plan)
+    while isinstance(node, dict) and node.get("stage"):
+        stage = node["stage"]
+        if node.get("indexName"):
+            stage += f"({node['indexName']})"
+        stages.append(stage)
+        children = node.get("inputStages") or [node.get("inputStage")]
+        if len(children) > 1:
+            stages.append(f"[{len(children)} branches]")
+        node = children[0]
+    return " > ".join(stages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if any repository query shape does a COLLSCAN.")
+    parser.add_argument("--ensure-indexes", action="store_true", help="Create the registry's indexes first")
+    parser.add_argument("--verbose", action="store_true", help="Print the full winning plan of failures")
+    args = parser.parse_args()
+
+    if db is None:
+        print("MongoDB is not reachable (check MONGO_URI)")
+        sys.exit(2)
+
+    failed = False
+    for name, models in INDEXES.items():
+        if args.ensure_indexes:
+            db[name].create_indexes(models)
+        problems = diff_indexes(models, list(db[name].list_indexes()))
+        for problem in problems:
+            failed = True
+            print(f"INDEX  {name}: {problem}")
+
+    for name, collection, query, sort in QUERY_SHAPES:
+        command = {"find": collection, "filter": query}
+        if sort:
+            command["sort"] = dict(sort)
+        plan = _winning_plan(db.command("explain", command, verbosity="queryPlanner"))
+        collscans = find_collscans(plan)
+        status = "COLLSCAN" if collscans else "ok"
+        print(f"{status:<8} {name:<28} {_plan_summary(plan)}")
+        if collscans:
+            failed = True
+            if args.verbose:
+                print(json.dumps(plan, indent=2, default=str))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
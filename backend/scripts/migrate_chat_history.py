@@ -0,0 +1,128 @@
+
+"""
+Migrates the legacy `chat_history` layout (one ever-growing document per teacher)
+into the normalized `chat_sessions` / `chat_messages` collections.
+
+Safe to re-run: sessions and messages are upserted by their ids, so a partial run
+can simply be started again. Legacy entries without an id get one derived from their
+position (uuid5 of teacher / session index / message index), the same on every run.
+
+Run from backend/:
+    python -m scripts.migrate_chat_history [--dry-run] [--teacher-id ID] [--batch-size N]
+"""
+import argparse
+import sys
+import uuid
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from app.core.database import history_collection, sessions_collection, messages_collection
+from app.core.indexes import SESSION_INDEXES, MESSAGE_INDEXES, RETIRED_INDEXES, INDEX_NOT_FOUND
+
+# Fixed namespace for ids of legacy entries that never had one - never change it
+LEGACY_ID_NAMESPACE = uuid.UUID("5b0f3c4e-2a51-4f8e-9d7a-6c1e0b9a8f21")
+
+
+def _legacy_id(*parts) -> str:
+    return str(uuid.uuid5(LEGACY_ID_NAMESPACE, "/".join(str(p) for p in parts)))
+
+
+def _session_ops(teacher_id, session, session_index):
+    session_id = session.get("session_id") or _legacy_id(teacher_id, session_index)
+    messages = session.get("messages", [])
+
+    message_ops = []
+    timestamps = []
+    for message_index, msg in enumerate(messages):
+        msg = dict(msg)
+        if not msg.get("message_id"):
+            msg["message_id"] = _legacy_id(teacher_id, session_index, message_index)
+        ts = msg.get("timestamp")
+        if ts:
+            timestamps.append(ts)
+        message_ops.append(UpdateOne(
+            {"message_id": msg["message_id"]},
+            {"$setOnInsert": {**msg, "teacher_id": teacher_id, "session_id": session_id}},
+            upsert=True
+        ))
+
+    created = min(timestamps) if timestamps else datetime.now()
+    updated = max(timestamps) if timestamps else created
+    session_op = UpdateOne(
+        {"teacher_id": teacher_id, "session_id": session_id},
+        {
+            "$setOnInsert": {"created_at": created},
+            "$max": {"updated_at": updated, "message_count": len(messages)}
+        },
+        upsert=True
+    )
+    return session_op, message_ops
+
+
+def _drop_retired_indexes():
+    collections = {"chat_sessions": sessions_collection, "chat_messages": messages_collection}
+    for name, index_names in RETIRED_INDEXES.items():
+        for index_name in index_names:
+            try:
+                collections[name].drop_index(index_name)
+            except OperationFailure as e:
+                if e.code != INDEX_NOT_FOUND:
+                    raise
+
+
+def migrate(dry_run=False, teacher_id=None, batch_size=500):
+    if not dry_run:
+        _drop_retired_indexes()
+        sessions_collection.create_indexes(SESSION_INDEXES)
+        messages_collection.create_indexes(MESSAGE_INDEXES)
+
+    query = {"teacher_id": teacher_id} if teacher_id else {}
+    stats = {"teachers": 0, "sessions": 0, "messages": 0}
+    session_batch, message_batch = [], []
+
+    def flush():
+        if dry_run:
+            session_batch.clear()
+            message_batch.clear()
+            return
+        if session_batch:
+            sessions_collection.bulk_write(session_batch, ordered=False)
+            session_batch.clear()
+        if message_batch:
+            messages_collection.bulk_write(message_batch, ordered=False)
+            message_batch.clear()
+
+    # Stream teacher docs one at a time - some are several MB
+    for doc in history_collection.find(query, no_cursor_timeout=True).batch_size(1):
+        stats["teachers"] += 1
+        for session_index, session in enumerate(doc.get("chat_history", [])):
+            session_op, message_ops = _session_ops(doc["teacher_id"], session, session_index)
+            session_batch.append(session_op)
+            message_batch.extend(message_ops)
+            stats["sessions"] += 1
+            stats["messages"] += len(message_ops)
+            if len(message_batch) >= batch_size:
+                flush()
+    flush()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate chat_history into chat_sessions/chat_messages")
+    parser.add_argument("--dry-run", action="store_true", help="Count what would be migrated without writing")
+    parser.add_argument("--teacher-id", help="Only migrate a single teacher")
+    parser.add_argument("--batch-size", type=int, default=500, help="Messages per bulk_write")
+    args = parser.parse_args(argv)
+
+    if history_collection is None:
+        print("MongoDB is not configured (MONGO_URI)")
+        return 1
+
+    stats = migrate(dry_run=args.dry_run, teacher_id=args.teacher_id, batch_size=args.batch_size)
+    prefix = "[DRY RUN] " if args.dry_run else ""
+    print(f"{prefix}Migrated {stats['messages']} messages in {stats['sessions']} sessions for {stats['teachers']} teachers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import asyncio
+import os
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import pytest
+
+from app.services.admission import AdmissionController, AdmissionRejected, BACKGROUND, TEXT, VOICE
+
+def _controller(**overrides):
+    options = dict(enabled=True, max_concurrency=1, queue_size=10, max_wait_s=5,
+                   background_reserve=0, rate_per_min=600, burst=100)
+    options.update(overrides)
+    return AdmissionController(**options)
+
+async def _hold(controller, priority, release: asyncio.Event, order: list = None, label=None, teacher_id=None):
+    async with controller.admit(priority, teacher_id):
+        if order is not None:
+            order.append(label)
+        await release.wait()
+
+def test_waiters_are_served_by_priority_then_arrival():
+    controller = _controller()
+
+    async def scenario():
+        release = asyncio.Event()
+        order = []
+        busy = asyncio.create_task(_hold(controller, TEXT, asyncio.Event()))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.create_task(_hold(controller, priority, release, order, label))
+            for label, priority in (("text-1", TEXT), ("voice-1", VOICE), ("text-2", TEXT), ("voice-2", VOICE))
+        ]
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 4
+        busy.cancel()
+        release.set()
+        await asyncio.gather(*waiters)
+        return order
+
+    assert asyncio.run(scenario()) == ["voice-1", "voice-2", "text-1", "text-2"]
+    assert controller.stats()["in_flight"] == 0
+
+def test_full_queue_is_shed_with_503():
+    controller = _controller(queue_size=1)
+
+    async def scenario():
+        release = asyncio.Event()
+        holders = [asyncio.create_task(_hold(controller, TEXT, release)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit(TEXT):
+                pass
+        release.set()
+        await asyncio.gather(*holders)
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 503
+    assert rejected.retry_after >= 1
+    assert controller.counters["queue_full"] == 1
+
+def test_waiting_past_max_wait_is_shed_and_leaves_the_queue():
+    controller = _controller(max_wait_s=0.05)
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, TEXT, release))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit(VOICE):
+                pass
+        assert controller.stats()["queued"] == 0
+        release.set()
+        await holder
+        return rejected.value
+
+    assert asyncio.run(scenario()).status_code == 503
+    assert controller.counters["timeouts"] == 1
+    assert controller.stats()["in_flight"] == 0
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    controller = _controller()
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, TEXT, release))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_hold(controller, TEXT, asyncio.Event()))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        release.set()
+        await holder
+        # The slot is free again for a new caller
+        async with controller.admit(TEXT):
+            assert controller.stats()["in_flight"] == 1
+
+    asyncio.run(scenario())
+    assert controller.stats()["in_flight"] == 0
+    assert controller.stats()["queued"] == 0
+
+def test_teacher_over_their_burst_gets_429():
+    controller = _controller(max_concurrency=10, rate_per_min=1, burst=2)
+
+    async def scenario():
+        for _ in range(2):
+            async with controller.admit(TEXT, "t1"):
+                pass
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit(TEXT, "t1"):
+                pass
+        # Another teacher has their own bucket
+        async with controller.admit(TEXT, "t2"):
+            pass
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 429
+    assert rejected.retry_after >= 1
+    assert controller.counters["rate_limited"] == 1
+
+def test_token_is_refunded_when_the_worker_sheds():
+    controller = _controller(queue_size=0, rate_per_min=1, burst=1)
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, TEXT, release))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit(TEXT, "t1"):
+                pass
+        assert rejected.value.status_code == 503
+        release.set()
+        await holder
+        # Not the teacher's fault, so their one token is still there
+        async with controller.admit(TEXT, "t1"):
+            pass
+
+    asyncio.run(scenario())
+
+def test_background_work_is_shed_instead_of_queued():
+    controller = _controller(max_concurrency=2, background_reserve=1)
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, TEXT, release))
+        await asyncio.sleep(0)
+        # One slot left, but it's reserved for interactive work
+        with pytest.raises(AdmissionRejected):
+            async with controller.admit(BACKGROUND):
+                pass
+        async with controller.admit(VOICE):
+            pass
+        release.set()
+        await holder
+        async with controller.admit(BACKGROUND):
+            pass
+
+    asyncio.run(scenario())
+    assert controller.counters["shed_background"] == 1
+
+def test_disabled_controller_admits_everything():
+    controller = _controller(enabled=False, queue_size=0, burst=0)
+
+    async def scenario():
+        release = asyncio.Event()
+        holders = [asyncio.create_task(_hold(controller, TEXT, release, teacher_id="t1")) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*holders)
+
+    asyncio.run(scenario())
+    assert controller.counters["admitted"] == 0
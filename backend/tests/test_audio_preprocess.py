@@ -0,0 +1,58 @@
+
+import numpy as np
+import pytest
+
+from app.utils.audio_preprocess import TARGET_RATE, split_at_silence, stitch_transcripts
+
+def _speech_with_pauses(seconds: float, pause_every_s: float = 3.0):
+    # 220 Hz tone with a 300 ms gap every pause_every_s seconds
+    t = np.arange(int(seconds * TARGET_RATE)) / TARGET_RATE
+    mono = 0.3 * np.sin(2 * np.pi * 220 * t).astype(np.float32)
+    for gap in np.arange(pause_every_s, seconds, pause_every_s):
+        mono[int(gap * TARGET_RATE):int((gap + 0.3) * TARGET_RATE)] = 0
+    return mono
+
+def _assert_covers(ranges, length):
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == length
+    for (_, prev_end), (start, _) in zip(ranges, ranges[1:]):
+        assert start < prev_end  # neighbours overlap, nothing falls between them
+
+def test_short_clip_is_one_window():
+    mono = _speech_with_pauses(10)
+    assert split_at_silence(mono, window_s=15, overlap_s=0.5) == [(0, len(mono))]
+
+def test_cuts_land_in_pauses():
+    mono = _speech_with_pauses(60, pause_every_s=3.0)
+    ranges = split_at_silence(mono, window_s=15, overlap_s=0.0)
+    assert ranges[-1][1] == len(mono)
+    for _, end in ranges[:-1]:
+        assert mono[end] == 0  # the cut sits inside a silent gap
+
+@pytest.mark.parametrize("window_s", [0.01, 0.5, 1.5, 3.0])
+def test_windows_shorter_than_search_span(window_s):
+    mono = _speech_with_pauses(20)
+    ranges = split_at_silence(mono, window_s=window_s, overlap_s=0.2, search_s=2.0)
+    _assert_covers(ranges, len(mono))
+    starts = [start for start, _ in ranges]
+    assert starts == sorted(starts)
+
+def test_tail_is_merged_into_last_window():
+    mono = _speech_with_pauses(32)
+    ranges = split_at_silence(mono, window_s=15, overlap_s=0.5)
+    last_start, last_end = ranges[-1]
+    assert last_end - last_start > 15 * TARGET_RATE * 0.25
+
+def test_stitch_drops_repeated_overlap():
+    parts = ["my students are not", "are not listening to me", "Listening to me, in class."]
+    assert stitch_transcripts(parts) == "my students are not listening to me in class."
+
+def test_stitch_keeps_text_without_overlap():
+    assert stitch_transcripts(["hello there", "general kenobi"]) == "hello there general kenobi"
+
+def test_stitch_handles_empty_parts():
+    assert stitch_transcripts(["", None, "only words", ""]) == "only words"
+
+def test_stitch_limits_overlap_search():
+    repeated = " ".join(["la"] * 20)
+    assert len(stitch_transcripts([repeated, repeated], max_overlap_words=4).split()) == 36
@@ -0,0 +1,118 @@
+import asyncio
+import os
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import pytest
+
+from app.services import feedback_service as fs
+from app.services.feedback_service import FeedbackService
+
+DNW, WORKED = "did_not_work", "worked"
+
+class World:
+    """In-memory messages and teacher counters, with the repositories' update semantics."""
+
+    def __init__(self, counts: dict, message_ids: list):
+        self.teachers = {t: {"teacher_id": t, "failedFeedbackCount": c} for t, c in counts.items()}
+        self.messages = {m: {"teacher_id": m.split("-")[0], "session_id": "s1", "feedback_status": None} for m in message_ids}
+        self.escalated = set()
+
+    # FeedbackRepository
+    async def record_feedback(self, teacher_id, session_id, message_id, feedback):
+        msg = self.messages.get(message_id)
+        if not msg or (msg["teacher_id"], msg["session_id"]) != (teacher_id, session_id) or msg["feedback_status"] == feedback:
+            return 0
+        msg["feedback_status"] = feedback
+        return 1
+
+    async def get_feedback_states(self, message_ids):
+        return {m: dict(self.messages[m]) for m in message_ids if m in self.messages}
+
+    async def record_feedback_bulk(self, updates):
+        return sum([await self.record_feedback(*update) for update in updates])
+
+    # TeacherRepository
+    async def increment_feedback_count(self, teacher_id):
+        teacher = self.teachers[teacher_id]
+        teacher["failedFeedbackCount"] = min(teacher["failedFeedbackCount"] + 1, 3)
+        return dict(teacher)
+
+    async def reset_feedback_count(self, teacher_id):
+        self.teachers[teacher_id]["failedFeedbackCount"] = 0
+        return dict(self.teachers[teacher_id])
+
+    async def apply_feedback_run(self, teacher_id, failures, reset):
+        teacher = self.teachers.get(teacher_id)
+        if teacher is None:
+            return None
+        before = dict(teacher)
+        teacher["failedFeedbackCount"] = min((0 if reset else teacher["failedFeedbackCount"]) + failures, 3)
+        return before
+
+    # EscalationService
+    async def process_escalation(self, teacher_id, session_id, teacher):
+        if teacher["failedFeedbackCount"] == 3:
+            self.escalated.add(teacher_id)
+            return {"triggered": True, "status": "queued"}
+        return {"triggered": False, "status": "count_update"}
+
+    def install(self, monkeypatch):
+        for name in ("record_feedback", "get_feedback_states", "record_feedback_bulk"):
+            monkeypatch.setattr(fs.FeedbackRepository, name, getattr(self, name))
+        for name in ("increment_feedback_count", "reset_feedback_count", "apply_feedback_run"):
+            monkeypatch.setattr(fs.TeacherRepository, name, getattr(self, name))
+        monkeypatch.setattr(fs.EscalationService, "process_escalation", self.process_escalation)
+
+    def snapshot(self):
+        return ({t: d["failedFeedbackCount"] for t, d in self.teachers.items()},
+                {m: d["feedback_status"] for m, d in self.messages.items()},
+                self.escalated)
+
+def _events(pairs):
+    return [{"teacher_id": m.split("-")[0], "session_id": "s1", "message_id": m, "feedback": f} for m, f in pairs]
+
+SCENARIOS = {
+    "three failures escalate": ({"t1": 0}, [("t1-a", DNW), ("t1-b", DNW), ("t1-c", DNW)]),
+    "one failure on top of two": ({"t1": 2}, [("t1-a", DNW)]),
+    "a success resets the run": ({"t1": 0}, [("t1-a", DNW), ("t1-b", DNW), ("t1-c", WORKED), ("t1-d", DNW)]),
+    "success after reaching three": ({"t1": 1}, [("t1-a", DNW), ("t1-b", DNW), ("t1-c", WORKED), ("t1-d", DNW)]),
+    "second stretch reaches three": ({"t1": 1}, [("t1-a", WORKED), ("t1-b", DNW), ("t1-c", DNW), ("t1-d", DNW), ("t1-e", WORKED)]),
+    "count stays capped": ({"t1": 3}, [("t1-a", DNW), ("t1-b", DNW)]),
+    "re-rating one message": ({"t1": 2}, [("t1-a", WORKED), ("t1-a", DNW), ("t1-a", DNW)]),
+    "teachers are independent": ({"t1": 2, "t2": 0}, [("t1-a", DNW), ("t2-a", DNW), ("t2-b", WORKED), ("t1-b", WORKED)]),
+}
+
+@pytest.mark.parametrize("name", SCENARIOS)
+def test_bulk_matches_applying_events_one_by_one(monkeypatch, name):
+    counts, pairs = SCENARIOS[name]
+    events = _events(pairs)
+    message_ids = sorted({m for m, _ in pairs})
+
+    one_by_one = World(counts, message_ids)
+    one_by_one.install(monkeypatch)
+
+    async def sequential():
+        for e in events:
+            await FeedbackService.process_feedback(e["teacher_id"], e["session_id"], e["message_id"], e["feedback"])
+
+    asyncio.run(sequential())
+
+    bulk = World(counts, message_ids)
+    bulk.install(monkeypatch)
+    asyncio.run(FeedbackService.process_feedback_bulk(events))
+
+    assert bulk.snapshot() == one_by_one.snapshot()
+
+def test_bulk_reports_each_event(monkeypatch):
+    world = World({"t1": 0, "t2": 0}, ["t1-a", "t2-a"])
+    world.messages["t1-a"]["feedback_status"] = WORKED
+    world.install(monkeypatch)
+    events = _events([("t1-a", WORKED), ("t1-b", DNW), ("t2-a", DNW)])
+    events.append({**events[2], "teacher_id": "t1"})  # someone else's message
+
+    result = asyncio.run(FeedbackService.process_feedback_bulk(events))
+
+    assert [r["status"] for r in result["results"]] == ["no_change", "not_found", "applied", "not_found"]
+    assert result["applied"] == 1
+    assert result["teachers"] == {"t2": {"negative_count": 1, "escalation": {"triggered": False, "status": "count_update", "negative_count": 1}}}
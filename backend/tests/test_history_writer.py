@@ -0,0 +1,120 @@
+import asyncio
+import os
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import pytest
+
+from app.repositories import history_writer as hw
+from app.repositories.history_writer import HistoryWriter
+from app.repositories.interaction_repo import APPEND_HALVES, PartialWriteError
+
+class FakeRepository:
+    """Records append_messages calls; `failures` is a list of exceptions to raise first."""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.calls = []  # (entries, halves)
+        self.inline = []
+
+    async def append_messages(self, entries, halves=APPEND_HALVES):
+        self.calls.append((list(entries), halves))
+        if self.failures:
+            raise self.failures.pop(0)
+
+    async def create_or_update_session(self, teacher_id, session_id, message):
+        self.inline.append((teacher_id, session_id, message))
+
+@pytest.fixture
+def repo(monkeypatch):
+    fake = FakeRepository()
+    monkeypatch.setattr(hw.InteractionRepository, "append_messages", fake.append_messages)
+    monkeypatch.setattr(hw.InteractionRepository, "create_or_update_session", fake.create_or_update_session)
+    return fake
+
+def _writer(enabled=True, batch_size=10, flush_ms=10, durability="buffered"):
+    writer = HistoryWriter(enabled=enabled, batch_size=batch_size, flush_ms=flush_ms, queue_size=100, durability=durability)
+    writer.MAX_FLUSH_ATTEMPTS = 2  # keeps the backoff short
+    return writer
+
+def _message(i):
+    return {"message_id": f"m{i}", "role": "user", "content": f"hello {i}"}
+
+async def _flush(writer, count=3):
+    loop = asyncio.get_running_loop()
+    batch = [("t1", "s1", _message(i), loop.create_future()) for i in range(count)]
+    await writer._flush(batch)
+    return [done for *_, done in batch]
+
+def test_partial_failure_retries_only_the_failed_half(repo):
+    repo.failures = [PartialWriteError(("messages",), RuntimeError("blip"))]
+    writer = _writer()
+
+    async def scenario():
+        return [done.result() for done in await _flush(writer)]
+
+    assert asyncio.run(scenario()) == [True, True, True]
+    # The session half (and its message_count $inc) went through once, and isn't redone
+    assert [halves for _, halves in repo.calls] == [APPEND_HALVES, ("messages",)]
+    assert repo.calls[0][0] == repo.calls[1][0]
+    assert writer.stats["flushed"] == 3
+    assert writer.stats["failed"] == 0
+
+def test_whole_batch_is_retried_after_an_unknown_failure(repo):
+    repo.failures = [RuntimeError("connection reset")]
+    writer = _writer()
+
+    asyncio.run(_flush(writer))
+    assert [halves for _, halves in repo.calls] == [APPEND_HALVES, APPEND_HALVES]
+    assert writer.stats["batches"] == 1
+
+def test_batch_is_dropped_after_the_last_attempt(repo):
+    repo.failures = [RuntimeError("down")] * 2
+    writer = _writer()
+
+    async def scenario():
+        writer._pending = {"m0": asyncio.get_running_loop().create_future()}
+        futures = await _flush(writer)
+        return [isinstance(done.exception(), RuntimeError) for done in futures]
+
+    assert asyncio.run(scenario()) == [True, True, True]
+    assert writer.stats["failed"] == 3
+    assert writer._pending == {}
+
+def test_messages_are_batched_in_arrival_order(repo):
+    writer = _writer(batch_size=2, flush_ms=1000)
+
+    async def scenario():
+        await writer.start()
+        for i in range(5):
+            await writer.append("t1", "s1", _message(i))
+        await writer.stop()
+
+    asyncio.run(scenario())
+    sent = [message["message_id"] for entries, _ in repo.calls for _, _, message in entries]
+    assert sent == ["m0", "m1", "m2", "m3", "m4"]
+    assert all(len(entries) <= 2 for entries, _ in repo.calls)
+    assert writer.stats["flushed"] == 5
+
+def test_acked_append_waits_for_the_write(repo):
+    writer = _writer(flush_ms=10, durability="acked")
+
+    async def scenario():
+        await writer.start()
+        await writer.append("t1", "s1", _message(0))
+        written = len(repo.calls)
+        await writer.stop()
+        return written
+
+    assert asyncio.run(scenario()) == 1
+
+def test_disabled_writer_writes_inline(repo):
+    writer = _writer(enabled=False)
+
+    async def scenario():
+        await writer.start()
+        await writer.append("t1", "s1", _message(0))
+
+    asyncio.run(scenario())
+    assert repo.inline == [("t1", "s1", _message(0))]
+    assert repo.calls == []
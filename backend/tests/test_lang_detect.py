@@ -0,0 +1,63 @@
+import os
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import pytest
+
+from app.services.translation_service import TranslationService
+from app.utils.lang_detect import is_english, script_counts
+
+@pytest.mark.parametrize("text", [
+    "How do I keep my class quiet after lunch?",
+    "Students are not doing their homework, what should I do",
+    "Grade 4 fractions activity please",
+])
+def test_plain_english_is_detected(text):
+    assert is_english(text)
+
+@pytest.mark.parametrize("text", [
+    "bacche class mein shor karte hain, kya karun",  # romanized Hindi
+    "pillalu class lo vinatledu",                   # romanized Telugu
+    "बच्चे मेरी बात नहीं सुनते",                      # Devanagari
+    "My students क्लास में शोर करते हैं",              # mixed scripts
+    "ok",                                           # too short to tell
+    "",
+])
+def test_anything_doubtful_is_not_english(text):
+    assert not is_english(text)
+
+def test_script_counts_ignore_digits_and_punctuation():
+    counts = script_counts("बच्चे abc 12!")
+    assert counts["latin"] == 3
+    assert counts["devanagari"] > 0
+    assert "other" not in counts
+
+class RecordingProvider:
+    name = "fake"
+
+    def __init__(self):
+        self.calls = []
+
+    def translate(self, text, source, target):
+        self.calls.append(text)
+        return f"<{text}>"
+
+@pytest.fixture
+def service():
+    svc = TranslationService(cache_size=100, ttl_seconds=60, workers=2)
+    svc.provider = RecordingProvider()
+    yield svc
+    svc._pool.shutdown(wait=False)
+
+def test_english_headed_for_english_skips_the_translation_hop(service):
+    english = "How do I keep my class quiet after lunch?"
+    hinglish = "bacche class mein shor karte hain"
+
+    assert service.translate(english, "en") == english
+    assert service.translate_batch([english, hinglish], "en") == [english, f"<{hinglish}>"]
+    assert service.provider.calls == [hinglish]
+    assert service.counters["skipped_english"] == 2
+
+def test_english_headed_elsewhere_is_still_translated(service):
+    english = "How do I keep my class quiet after lunch?"
+    assert service.translate(english, "hi") == f"<{english}>"
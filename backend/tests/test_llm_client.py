@@ -0,0 +1,121 @@
+
+import asyncio
+import os
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+from app.services.llm_client import CircuitBreaker, CircuitOpenError, LLMClient
+
+def _half_open_client():
+    client = LLMClient()
+    breaker = CircuitBreaker("chat", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()  # open, and due for a trial straight away
+    client.breakers["chat"] = breaker
+    return client, breaker
+
+def test_cancelled_half_open_trial_releases_the_slot():
+    client, breaker = _half_open_client()
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(60)
+
+        trial = asyncio.create_task(client._call("chat", hang, timeout=30))
+        await started.wait()
+        assert breaker.state == "half_open"
+        trial.cancel()
+        try:
+            await trial
+        except asyncio.CancelledError:
+            pass
+
+        # Not counted as a failure, and the next call is allowed through as the new trial
+        assert breaker.state == "half_open"
+
+        async def ok():
+            return "ok"
+
+        assert await client._call("chat", ok, timeout=5) == "ok"
+        assert breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+def test_half_open_allows_only_one_trial():
+    client, breaker = _half_open_client()
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def wait():
+            await gate.wait()
+            return "ok"
+
+        trial = asyncio.create_task(client._call("chat", wait, timeout=5))
+        await asyncio.sleep(0)
+        try:
+            await client._call("chat", wait, timeout=5)
+            assert False, "second call should be short-circuited"
+        except CircuitOpenError:
+            pass
+        gate.set()
+        assert await trial == "ok"
+
+    asyncio.run(scenario())
+
+class _StallingProvider:
+    """Sends `chunks`, then goes quiet forever. Remembers whether it was hung up on."""
+
+    name = "fake"
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    async def chat_stream(self, **kwargs):
+        return self._stream()
+
+    async def _stream(self):
+        try:
+            for chunk in self.chunks:
+                yield chunk
+            await asyncio.sleep(3600)
+        finally:
+            self.closed = True
+
+def test_stalled_stream_times_out_and_counts_against_the_breaker():
+    client = LLMClient()
+    client.llm = _StallingProvider(["a", "b"])
+    breaker = client.breakers["chat"] = CircuitBreaker("chat", failure_threshold=1, reset_timeout=60)
+
+    async def scenario():
+        stream = await client.chat_stream(idle_timeout=0.05, model="m", messages=[])
+        received = []
+        try:
+            async for chunk in stream:
+                received.append(chunk)
+            assert False, "stream should have timed out"
+        except asyncio.TimeoutError:
+            pass
+        return received
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert breaker.state == "open"
+    assert client.counters["stream_stalls"] == 1
+    assert client.llm.closed
+
+def test_abandoned_stream_is_closed_without_a_breaker_failure():
+    client = LLMClient()
+    client.llm = _StallingProvider(["a", "b", "c"])
+    breaker = client.breakers["chat"] = CircuitBreaker("chat", failure_threshold=1, reset_timeout=60)
+
+    async def scenario():
+        stream = await client.chat_stream(idle_timeout=5, model="m", messages=[])
+        assert await stream.__anext__() == "a"
+        await stream.aclose()  # client went away
+
+    asyncio.run(scenario())
+    assert breaker.state == "closed"
+    assert client.llm.closed
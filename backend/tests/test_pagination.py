@@ -0,0 +1,138 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import pytest
+
+from app.repositories import interaction_repo
+from app.services.history_service import HistoryService
+from app.utils.pagination import decode_cursor, encode_cursor, parse_fields
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            if not doc[field] < condition["$lt"]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+class FakeCollection:
+    """Just enough of find() for the keyset queries in InteractionRepository."""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        keep = {f for f, on in (projection or {}).items() if on}
+        found = [d for d in self.docs if _matches(d, query)]
+        return FakeCursor([{k: v for k, v in d.items() if not keep or k in keep} for d in found])
+
+START = datetime(2026, 1, 1, 9, 0)
+
+@pytest.fixture
+def messages(monkeypatch):
+    # Pairs of messages share a timestamp, so pages have to break ties on message_id
+    docs = [
+        {"teacher_id": "t1", "session_id": "s1", "message_id": f"m{i:02d}", "sender": "user",
+         "message": f"hello {i}", "timestamp": START + timedelta(seconds=i // 2)}
+        for i in range(11)
+    ]
+    docs.append({**docs[0], "teacher_id": "t2", "message_id": "other"})
+    monkeypatch.setattr(interaction_repo, "messages_collection", FakeCollection(docs))
+    return docs
+
+@pytest.fixture
+def sessions(monkeypatch):
+    docs = [
+        {"teacher_id": "t1", "session_id": f"s{i}", "message_count": i,
+         "created_at": START, "updated_at": START + timedelta(minutes=i // 3)}
+        for i in range(7)
+    ]
+    monkeypatch.setattr(interaction_repo, "sessions_collection", FakeCollection(docs))
+    return docs
+
+def test_cursor_round_trips():
+    cursor = encode_cursor(START, "m07")
+    assert decode_cursor(cursor) == (START, "m07")
+    assert decode_cursor(encode_cursor(None, "m07")) == (None, "m07")
+    assert decode_cursor(None) is None
+
+@pytest.mark.parametrize("cursor", ["not-base64!", encode_cursor(START, "x")[:-4], "W10="])
+def test_garbage_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_parse_fields_projects_the_cursor_keys_but_does_not_return_them():
+    wanted, projection = parse_fields("message", {"message", "sender", "timestamp"}, {"timestamp"})
+    assert wanted == {"message"}
+    assert projection == {"message": 1, "timestamp": 1, "_id": 0}
+    with pytest.raises(ValueError):
+        parse_fields("message,password", {"message"}, set())
+
+def test_message_pages_walk_back_without_gaps_or_repeats(messages):
+    async def scenario():
+        pages, cursor = [], None
+        while True:
+            page = await HistoryService.list_messages("t1", "s1", limit=4, cursor=cursor)
+            pages.append([m["message_id"] for m in page["messages"]])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+
+    # Newest page first, each page oldest-first
+    assert asyncio.run(scenario()) == [
+        ["m07", "m08", "m09", "m10"],
+        ["m03", "m04", "m05", "m06"],
+        ["m00", "m01", "m02"],
+    ]
+
+def test_exact_last_page_has_no_next_cursor(messages):
+    async def scenario():
+        return await HistoryService.list_messages("t1", "s1", limit=11)
+
+    page = asyncio.run(scenario())
+    assert len(page["messages"]) == 11
+    assert page["next_cursor"] is None
+
+def test_field_selection_strips_the_cursor_keys(messages):
+    async def scenario():
+        return await HistoryService.list_messages("t1", "s1", limit=2, fields="message")
+
+    page = asyncio.run(scenario())
+    assert page["messages"] == [{"message": "hello 9"}, {"message": "hello 10"}]
+    assert decode_cursor(page["next_cursor"]) == (START + timedelta(seconds=4), "m09")
+
+def test_session_pages_are_newest_first_with_ties_broken_by_id(sessions):
+    async def scenario():
+        pages, cursor = [], None
+        while True:
+            page = await HistoryService.list_sessions("t1", limit=3, cursor=cursor, fields="session_id")
+            pages.append([s["session_id"] for s in page["sessions"]])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+
+    assert asyncio.run(scenario()) == [["s6", "s5", "s4"], ["s3", "s2", "s1"], ["s0"]]
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import pytest
+
+from app.services import response_cache as rc
+from app.services.response_cache import ResponseCache
+
+ANSWER = json.dumps({"speech_flow": {"intro": "hi", "main_advice": [], "closing": "bye"}})
+PARAMS = {"temperature": 0.5}
+
+class FakeSharedTier:
+    """In-memory stand-in for ResponseCacheRepository, shared by every 'worker' in a test."""
+
+    def __init__(self):
+        self.entries = {}
+        self.generation = 0
+        self.generation_reads = 0
+
+    async def get(self, key):
+        return self.entries.get(key)
+
+    async def put(self, key, response, ttl_seconds, meta=None):
+        self.entries[key] = response
+
+    async def delete(self, key):
+        return 1 if self.entries.pop(key, None) is not None else 0
+
+    async def clear(self):
+        removed = len(self.entries)
+        self.entries.clear()
+        return removed
+
+    async def get_generation(self):
+        self.generation_reads += 1
+        return self.generation
+
+    async def bump_generation(self):
+        self.generation += 1
+        return self.generation
+
+@pytest.fixture
+def shared(monkeypatch):
+    tier = FakeSharedTier()
+    for name in ("get", "put", "delete", "clear", "get_generation", "bump_generation"):
+        monkeypatch.setattr(rc.ResponseCacheRepository, name, getattr(tier, name))
+    return tier
+
+def _cache(shared=True, sync_seconds=0):
+    return ResponseCache(enabled=True, maxsize=100, ttl_seconds=60, shared=shared, sync_seconds=sync_seconds)
+
+def test_put_then_get_normalizes_the_query(shared):
+    cache = _cache()
+
+    async def scenario():
+        await cache.put("Students are NOT paying attention!!", "en", PARAMS, ANSWER)
+        assert await cache.get("students are not paying attention", "en", PARAMS) == ANSWER
+        assert await cache.get("students are not paying attention", "hi", PARAMS) is None
+
+    asyncio.run(scenario())
+    assert cache.counters["local_hits"] == 1
+    assert cache.counters["misses"] == 1
+
+def test_error_responses_are_not_cached(shared):
+    cache = _cache()
+
+    async def scenario():
+        await cache.put("q", "en", PARAMS, json.dumps({"error": "boom"}))
+        await cache.put("q2", "en", PARAMS, "not json")
+        return await cache.get("q", "en", PARAMS), await cache.get("q2", "en", PARAMS)
+
+    assert asyncio.run(scenario()) == (None, None)
+    assert shared.entries == {}
+
+def test_bypass_skips_both_tiers(shared):
+    cache = _cache()
+
+    async def scenario():
+        await cache.put("q", "en", PARAMS, ANSWER)
+        return await cache.get("q", "en", PARAMS, bypass=True)
+
+    assert asyncio.run(scenario()) is None
+    assert cache.counters["bypassed"] == 1
+    assert cache.counters["local_hits"] == 0
+
+def test_other_worker_is_served_from_the_shared_tier(shared):
+    writer, reader = _cache(), _cache()
+
+    async def scenario():
+        await writer.put("q", "en", PARAMS, ANSWER)
+        first = await reader.get("q", "en", PARAMS)
+        second = await reader.get("q", "en", PARAMS)
+        return first, second
+
+    assert asyncio.run(scenario()) == (ANSWER, ANSWER)
+    assert reader.counters["shared_hits"] == 1
+    assert reader.counters["local_hits"] == 1
+
+def test_invalidate_one_entry_reaches_other_workers(shared):
+    a, b = _cache(), _cache()
+
+    async def scenario():
+        await a.put("q", "en", PARAMS, ANSWER)
+        assert await b.get("q", "en", PARAMS) == ANSWER  # now in b's local tier too
+        assert await a.invalidate("q", "en", PARAMS) == 1
+        return await b.get("q", "en", PARAMS), await a.get("q", "en", PARAMS)
+
+    assert asyncio.run(scenario()) == (None, None)
+
+def test_invalidate_everything_reaches_other_workers(shared):
+    a, b = _cache(), _cache()
+
+    async def scenario():
+        await b.put("q1", "en", PARAMS, ANSWER)
+        await b.put("q2", "en", PARAMS, ANSWER)
+        await a.invalidate()
+        return await b.get("q1", "en", PARAMS), await b.get("q2", "en", PARAMS)
+
+    assert asyncio.run(scenario()) == (None, None)
+    assert shared.entries == {}
+    assert len(b.local) == 0
+
+def test_generation_is_only_reread_every_sync_seconds(shared):
+    cache = _cache(sync_seconds=60)
+
+    async def scenario():
+        await cache.put("q", "en", PARAMS, ANSWER)
+        for _ in range(5):
+            assert await cache.get("q", "en", PARAMS) == ANSWER
+
+    asyncio.run(scenario())
+    assert shared.generation_reads == 1
+
+def test_local_only_cache_invalidates_without_the_shared_tier(shared):
+    cache = _cache(shared=False)
+
+    async def scenario():
+        await cache.put("q", "en", PARAMS, ANSWER)
+        assert await cache.get("q", "en", PARAMS) == ANSWER
+        assert await cache.invalidate("q", "en", PARAMS) == 1
+        return await cache.get("q", "en", PARAMS)
+
+    assert asyncio.run(scenario()) is None
+    assert shared.entries == {}
+    assert shared.generation == 0
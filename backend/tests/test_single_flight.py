@@ -0,0 +1,151 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import pytest
+
+from app.utils.single_flight import SingleFlight, flight_key, single_flight_stats
+
+def test_flight_key_is_stable_and_argument_sensitive():
+    assert flight_key("hi", "en", {"a": 1, "b": 2}) == flight_key("hi", "en", {"b": 2, "a": 1})
+    assert flight_key("hi", "en") != flight_key("hi", "hi")
+
+def test_concurrent_async_callers_share_one_call():
+    flight = SingleFlight("test-async")
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value.upper()
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do_async("k", fetch, "answer") for _ in range(5)))
+
+    assert asyncio.run(scenario()) == ["ANSWER"] * 5
+    assert calls == ["answer"]
+    assert flight.counters["leaders"] == 1
+    assert flight.counters["shared"] == 4
+    assert flight.inflight() == 0
+
+def test_nothing_is_kept_once_the_call_finishes():
+    flight = SingleFlight("test-sequential")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        return await flight.do_async("k", fetch), await flight.do_async("k", fetch)
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+def test_errors_reach_every_waiter_and_the_next_call_retries():
+    flight = SingleFlight("test-errors")
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise RuntimeError("upstream down")
+        return "ok"
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do_async("k", flaky) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        return await flight.do_async("k", flaky)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert flight.counters["errors"] == 1
+
+def test_cancelled_leader_does_not_cancel_the_call_for_the_others():
+    flight = SingleFlight("test-cancel")
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do_async("k", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do_async("k", slow))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
+    assert flight.counters["leaders"] == 1
+
+def test_sync_callers_in_threads_share_one_call():
+    flight = SingleFlight("test-sync")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "ok"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flight.do, "k", fetch)
+        started.wait(5)
+        followers = [pool.submit(flight.do, "k", fetch) for _ in range(3)]
+        while flight.counters["shared"] < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result(5)] + [f.result(5) for f in followers]
+
+    assert results == ["ok"] * 4
+    assert calls == [1]
+
+def test_submit_shares_the_executor_future():
+    flight = SingleFlight("test-submit")
+    release = threading.Event()
+    calls = []
+
+    def fetch(value):
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = flight.submit("k", pool, fetch, 21)
+        second = flight.submit("k", pool, fetch, 21)
+        assert first is second
+        release.set()
+        assert first.result(5) == 42
+
+    assert calls == [21]
+
+def test_submit_to_a_closed_executor_does_not_leave_the_key_stuck():
+    flight = SingleFlight("test-closed")
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.shutdown()
+
+    with pytest.raises(RuntimeError):
+        flight.submit("k", pool, len, "abc").result(1)
+    assert flight.inflight() == 0
+
+def test_disabled_flight_calls_every_time():
+    flight = SingleFlight("test-disabled", enabled=False)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+
+    async def scenario():
+        await asyncio.gather(*(flight.do_async("k", fetch) for _ in range(3)))
+
+    asyncio.run(scenario())
+    assert len(calls) == 3
+    assert single_flight_stats()["test-disabled"]["enabled"] is False
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import pytest
+
+from app.repositories import teacher_cache as tc
+from app.repositories import teacher_repo
+from app.repositories.teacher_cache import TeacherCache
+from app.repositories.teacher_repo import TeacherRepository
+
+def _teacher(**fields):
+    return {"_id": "oid-1", "teacher_id": "t1", "teacher_mail": "a@school.in", "failedFeedbackCount": 0, **fields}
+
+def _cache(enabled=True, ttl_seconds=60, invalidation="none"):
+    return TeacherCache(enabled=enabled, maxsize=10, ttl_seconds=ttl_seconds, invalidation=invalidation)
+
+def test_lookup_by_id_and_by_mail():
+    cache = _cache()
+    cache.put(_teacher())
+    assert cache.get_by_id("t1")["teacher_mail"] == "a@school.in"
+    assert cache.get_by_email("a@school.in")["teacher_id"] == "t1"
+    assert cache.get_by_email("A@school.in") is None  # exact, like the Mongo lookup
+
+def test_callers_get_their_own_copy():
+    cache = _cache()
+    doc = _teacher()
+    cache.put(doc)
+    doc["failedFeedbackCount"] = 99
+    cache.get_by_id("t1")["failedFeedbackCount"] = 42
+    assert cache.get_by_id("t1")["failedFeedbackCount"] == 0
+
+def test_old_mail_alias_stops_matching_after_a_mail_change():
+    cache = _cache()
+    cache.put(_teacher())
+    cache.put(_teacher(teacher_mail="b@school.in"))
+    assert cache.get_by_email("a@school.in") is None
+    assert cache.get_by_email("b@school.in")["teacher_id"] == "t1"
+
+def test_patch_and_invalidate():
+    cache = _cache()
+    cache.put(_teacher())
+    cache.patch("t1", {"lastLogin": "today"})
+    assert cache.get_by_id("t1")["lastLogin"] == "today"
+    cache.invalidate("t1")
+    assert cache.get_by_id("t1") is None
+    assert cache.get_by_email("a@school.in") is None
+    assert cache.counters["invalidations"] == 1
+
+def test_entries_expire_after_the_ttl():
+    cache = _cache(ttl_seconds=0.01)
+    cache.put(_teacher())
+    time.sleep(0.02)
+    assert cache.get_by_id("t1") is None
+
+def test_disabled_cache_stores_nothing():
+    cache = _cache(enabled=False)
+    cache.put(_teacher())
+    assert cache.get_by_id("t1") is None
+
+class FakeTeacherCollection:
+    def __init__(self, doc):
+        self.doc = doc
+        self.reads = 0
+        self.changes = asyncio.Queue()
+
+    async def find_one(self, query):
+        self.reads += 1
+        return dict(self.doc) if all(self.doc.get(k) == v for k, v in query.items()) else None
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        # Only the two counter shapes the repository uses
+        if isinstance(update, dict):
+            self.doc.update(update["$set"])
+        else:
+            self.doc["failedFeedbackCount"] = min(self.doc["failedFeedbackCount"] + 1, 3)
+        return dict(self.doc)
+
+    async def update_one(self, query, update):
+        self.doc.update(update["$set"])
+
+    async def watch(self):
+        return FakeChangeStream(self.changes)
+
+class FakeChangeStream:
+    def __init__(self, changes):
+        self.changes = changes
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.changes.get()
+
+@pytest.fixture
+def collection(monkeypatch):
+    fake = FakeTeacherCollection(_teacher())
+    cache = _cache()
+    monkeypatch.setattr(teacher_repo, "teacher_collection", fake)
+    monkeypatch.setattr(teacher_repo, "teacher_cache", cache)
+    monkeypatch.setattr(tc, "teacher_collection", fake)
+    fake.cache = cache
+    return fake
+
+def test_repository_reads_through_the_cache(collection):
+    async def scenario():
+        first = await TeacherRepository.get_teacher_by_id("t1")
+        second = await TeacherRepository.get_teacher_by_id("t1")
+        by_mail = await TeacherRepository.get_by_email("a@school.in")
+        return first, second, by_mail
+
+    first, second, by_mail = asyncio.run(scenario())
+    assert first == second == by_mail
+    assert collection.reads == 1
+
+def test_repository_writes_through_the_cache(collection):
+    async def scenario():
+        await TeacherRepository.get_teacher_by_id("t1")
+        await TeacherRepository.increment_feedback_count("t1")
+        await TeacherRepository.update_last_login("t1")
+        return await TeacherRepository.get_teacher_by_id("t1")
+
+    teacher = asyncio.run(scenario())
+    assert teacher["failedFeedbackCount"] == 1
+    assert "lastLogin" in teacher
+    assert collection.reads == 1
+
+def test_change_stream_evicts_teachers_changed_elsewhere(collection):
+    cache = collection.cache
+    cache.invalidation = "change_stream"
+
+    async def scenario():
+        await cache.start()
+        await asyncio.sleep(0)  # the watcher starts clean before listening
+        cache.put(_teacher())
+        await collection.changes.put({"operationType": "update", "documentKey": {"_id": "oid-1"}})
+        await asyncio.sleep(0.01)
+        await cache.stop()
+
+    asyncio.run(scenario())
+    assert cache.get_by_id("t1") is None
+    assert cache.counters["stream_events"] == 1
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import threading
+
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+import pytest
+
+from app.services.translation_service import TranslationService
+
+class FakeProvider:
+    """Upper-cases text. Holds every call until `release` is set; `fail` makes calls raise."""
+
+    name = "fake"
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+        self._lock = threading.Lock()
+
+    def translate(self, text, source, target):
+        with self._lock:
+            self.calls.append((text, source, target))
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return f"{text.upper()} [{target}]"
+
+@pytest.fixture
+def service():
+    svc = TranslationService(cache_size=100, ttl_seconds=60, workers=4)
+    svc.provider = FakeProvider()
+    yield svc
+    svc._pool.shutdown(wait=False)
+
+def test_translation_is_cached(service):
+    assert service.translate("namaste", "hi") == "NAMASTE [hi]"
+    assert service.translate("namaste", "hi") == "NAMASTE [hi]"
+    assert service.translate("namaste", "ta") == "NAMASTE [ta]"
+    assert len(service.provider.calls) == 2
+
+def test_concurrent_identical_requests_share_one_upstream_call(service):
+    service.provider.release.clear()
+
+    async def scenario():
+        pending = asyncio.gather(*(service.translate_async("namaste", "hi") for _ in range(5)))
+        await asyncio.sleep(0.05)
+        service.provider.release.set()
+        return await pending
+
+    assert asyncio.run(scenario()) == ["NAMASTE [hi]"] * 5
+    assert len(service.provider.calls) == 1
+    assert service.stats()["coalesced"] == 4
+
+def test_batch_skips_duplicates_blanks_and_cached_strings(service):
+    service.translate("one", "hi")
+    texts = ["one", "two", "", "two", "three", "   "]
+
+    assert service.translate_batch(texts, "hi") == ["ONE [hi]", "TWO [hi]", "", "TWO [hi]", "THREE [hi]", "   "]
+    assert sorted(text for text, _, _ in service.provider.calls) == ["one", "three", "two"]
+
+def test_async_batch_keeps_input_order(service):
+    texts = ["b", "a", "b", "c"]
+
+    assert asyncio.run(service.translate_batch_async(texts, "hi")) == ["B [hi]", "A [hi]", "B [hi]", "C [hi]"]
+    assert len(service.provider.calls) == 3
+
+def test_failure_returns_the_source_text_and_is_not_cached(service):
+    service.provider.fail = True
+    assert service.translate("namaste", "hi") == "namaste"
+    assert asyncio.run(service.translate_async("namaste", "hi")) == "namaste"
+    assert service.counters["errors"] == 2
+
+    service.provider.fail = False
+    assert service.translate("namaste", "hi") == "NAMASTE [hi]"
+    assert len(service.provider.calls) == 3
+
+def test_same_source_and_target_is_not_translated(service):
+    assert service.translate("namaste", "hi", source="hi") == "namaste"
+    assert service.provider.calls == []